@@ -1,10 +1,28 @@
 # backend_alternative.py
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Dict, Any
+import hashlib
 import json
+import os
+import secrets
+import threading
+import time
+from catalog_snapshot import CatalogWatcher
+from diversity import DEFAULT_DIVERSITY_LAMBDA
 from matching_engine import AlternativeMatchingEngine
+from pipeline_metrics import metrics
+from scoring_executor import ExecutorSaturated, ScoringExecutor
+from result_cache import ResultCache, profile_fingerprint, rationale_fingerprint
+
+try:
+    import orjson
+except ImportError:
+    # Responses fall back to the standard library encoder
+    orjson = None
 
 app = FastAPI(title="Smart Career AI Recommender")
 
@@ -17,7 +35,62 @@ app.add_middleware(
 )
 
 
+class RecommendTimingMiddleware:
+    """Time /recommend end to end and the response serialization after its handler"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != '/recommend':
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe('request', elapsed)
+            handler_seconds = scope.get('state', {}).get('handler_seconds')
+            if handler_seconds is not None:
+                metrics.observe('serialization', elapsed - handler_seconds)
+
+
+if metrics.enabled:
+    app.add_middleware(RecommendTimingMiddleware)
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson when it is installed.
+
+    Content must already be plain JSON data: it is encoded as is, without
+    FastAPI's response_model validation or jsonable_encoder pass.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps_json(content)
+
+
+def dumps_json(content):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
 # Pydantic models
+class RecommendationConstraints(BaseModel):
+    # Hard filters applied before scoring; list values match case-insensitively
+    max_duration_weeks: Optional[float] = Field(None, gt=0)
+    costs: Optional[List[str]] = None
+    levels: Optional[List[str]] = None
+    providers: Optional[List[str]] = None
+    # Courses the user already finished
+    exclude_titles: Optional[List[str]] = None
+
+
 class UserProfile(BaseModel):
     education: str
     major: str
@@ -28,6 +101,7 @@ class UserProfile(BaseModel):
     career_goals: Optional[str] = None
     level: Optional[str] = "beginner"
     preferred_duration: Optional[str] = None
+    constraints: Optional[RecommendationConstraints] = None
 
 
 class CourseRecommendation(BaseModel):
@@ -48,69 +122,454 @@ class RecommendationResponse(BaseModel):
     user_profile: Dict[str, Any]
 
 
-# Initialize matching engine
-matching_engine = AlternativeMatchingEngine()
+class IndexedRecommendationResponse(BaseModel):
+    recommendations: List[CourseRecommendation]
+    # Positions in recommendations
+    timeline: Dict[str, List[int]]
+    user_profile: Dict[str, Any]
+
+
+class BatchRecommendationRequest(BaseModel):
+    profiles: List[UserProfile]
+    top_k: int = 10
+    # Stream one JSON line per profile (NDJSON) instead of a single JSON body
+    stream: bool = True
+    # Number of profiles scored (and, when streaming, flushed) together
+    chunk_size: int = 256
+    # MMR re-ranking weight, as /recommend?diversity=
+    diversity: Optional[float] = Field(None, ge=0.0, le=1.0)
+
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse]
+
+
+# Largest page /courses will return in one response
+MAX_COURSE_PAGE = 1000
+
+# /recommend retrieval modes -> engine scoring modes
+RETRIEVAL_MODES = {'exhaustive': 'vectorized', 'pruned': 'pruned'}
+
+# Course fields of a CourseRecommendation, besides its rationale
+RESPONSE_COURSE_FIELDS = ('title', 'provider', 'duration', 'level', 'fit_score', 'link', 'domain', 'cost')
+
+# Default MMR trade-off between fit score and variety of the returned
+# courses (1.0 ranks purely by fit score); ?diversity= overrides it per request
+DIVERSITY_LAMBDA = float(os.environ.get('RECOMMENDER_DIVERSITY', DEFAULT_DIVERSITY_LAMBDA))
+
+# Initialize matching engine: TF-IDF by default, dense embeddings with
+# RECOMMENDER_ENGINE=embedding
+if os.environ.get('RECOMMENDER_ENGINE', 'tfidf') == 'embedding':
+    from embedding_engine import EmbeddingMatchingEngine
+    matching_engine = EmbeddingMatchingEngine.from_env(diversity_lambda=DIVERSITY_LAMBDA)
+    # Cached scores are only valid for the engine and model that produced them
+    ENGINE_KEY = f"embedding:{matching_engine.encoder.signature}"
+else:
+    matching_engine = AlternativeMatchingEngine(diversity_lambda=DIVERSITY_LAMBDA)
+    ENGINE_KEY = 'tfidf'
+
+
+def _init_scoring_worker(csv_path='courses.csv'):
+    """Preload the catalog in each scoring process"""
+    if matching_engine.snapshot is None:
+        matching_engine.load_courses(csv_path)
 
 
-@app.post("/recommend", response_model=RecommendationResponse)
-async def get_recommendations(user_profile: UserProfile):
+# CPU-bound scoring runs here instead of on the event loop
+scoring_executor = ScoringExecutor.from_env(initializer=_init_scoring_worker)
+
+# Cached /recommend results; process-pool workers each hold their own
+# copy unless RECOMMENDER_CACHE_URL points them at a shared backend
+result_cache = ResultCache.from_env()
+
+# Polls courses.csv and reloads the catalog when it changes
+catalog_watcher = CatalogWatcher.from_env(matching_engine.reload_if_changed)
+
+# Set by serve.py in its workers: reloads are done once by the parent
+# process, which then replaces the workers
+catalog_reloader = None
+
+# Catalog load and first scoring run in the background at startup, and
+# /ready reports 503 until they are done. RECOMMENDER_WARMUP=0 leaves them
+# to the first request.
+WARMUP_ENABLED = os.environ.get('RECOMMENDER_WARMUP', '1').lower() not in ('0', 'false', 'no')
+warmup_state = {'done': False, 'seconds': None, 'error': None}
+
+
+def warm_up():
+    started = time.perf_counter()
+    try:
+        matching_engine.warm_up()
+        warmup_state['seconds'] = time.perf_counter() - started
+        warmup_state['done'] = True
+    except Exception as e:
+        warmup_state['error'] = f"{type(e).__name__}: {e}"
+
+
+def _on_catalog_swap(previous, snapshot):
+    """Drop results scored against the old catalog and refresh process workers"""
+    result_cache.invalidate()
+    if previous is not None and scoring_executor.kind == 'process':
+        # Workers hold their own engine; replace them so new jobs run on
+        # the new catalog while jobs already queued finish on the old one
+        scoring_executor.recycle(initargs=(snapshot.source_path,))
+
+
+matching_engine.add_reload_listener(_on_catalog_swap)
+
+
+def _service_busy():
+    return HTTPException(
+        status_code=503,
+        detail="Recommendation service is busy, please retry shortly",
+        headers={"Retry-After": str(scoring_executor.retry_after)},
+    )
+
+
+@app.on_event("startup")
+def start_catalog_watcher():
+    if catalog_watcher is not None:
+        catalog_watcher.start()
+
+
+@app.on_event("startup")
+def start_warmup():
+    if WARMUP_ENABLED:
+        threading.Thread(target=warm_up, name='catalog-warmup', daemon=True).start()
+
+
+@app.on_event("shutdown")
+def shutdown_scoring_executor():
+    if catalog_watcher is not None:
+        catalog_watcher.stop()
+    scoring_executor.shutdown(wait=False)
+
+
+@app.post("/recommend", response_model=RecommendationResponse,
+          responses={200: {"model": IndexedRecommendationResponse,
+                           "description": "With timeline=indices"}})
+async def get_recommendations(user_profile: UserProfile, request: Request,
+                              retrieval: Literal['exhaustive', 'pruned'] = 'exhaustive',
+                              timeline: Literal['courses', 'indices'] = 'courses',
+                              diversity: Optional[float] = Query(None, ge=0.0, le=1.0)):
+    started = time.perf_counter()
     try:
         # Convert to dict
         profile_dict = user_profile.dict()
 
-        # Get recommendations
-        recommendations = matching_engine.recommend_courses(profile_dict)
+        payload = await scoring_executor.submit(recommend_for_profile, profile_dict, retrieval, timeline,
+                                                diversity)
 
-        # Generate timeline
-        timeline_data = matching_engine.generate_learning_timeline(recommendations, profile_dict)
+    except ExecutorSaturated:
+        raise _service_busy()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+    finally:
+        handler_seconds = time.perf_counter() - started
+        metrics.observe('handler', handler_seconds)
+        # Read by RecommendTimingMiddleware to split off serialization time
+        request.state.handler_seconds = handler_seconds
 
-        # Add rationales
-        final_recommendations = []
-        for course in recommendations:
-            rationale = matching_engine.generate_rationale(course, profile_dict)
-            course_recommendation = CourseRecommendation(
-                **course,
-                rationale=rationale
-            )
-            final_recommendations.append(course_recommendation)
-
-        # Prepare timeline with rationales
-        timeline_with_rationales = {}
-        for period, courses in timeline_data.items():
-            timeline_courses = []
-            for course in courses:
-                rationale = matching_engine.generate_rationale(course, profile_dict)
-                timeline_courses.append(CourseRecommendation(
-                    **course,
-                    rationale=rationale
-                ))
-            timeline_with_rationales[period] = timeline_courses
-
-        return RecommendationResponse(
-            recommendations=final_recommendations,
-            timeline=timeline_with_rationales,
-            user_profile=profile_dict
-        )
+    # The payload is already plain JSON data, so it skips response_model
+    # validation and is only encoded
+    return FastJSONResponse(payload)
+
+
+@app.post("/recommend/batch",
+          responses={200: {"model": BatchRecommendationResponse,
+                           "description": "With stream=false; otherwise one RecommendationResponse per NDJSON line"}})
+async def get_batch_recommendations(request: BatchRecommendationRequest):
+    profile_dicts = [profile.dict() for profile in request.profiles]
+    chunk_size = max(1, request.chunk_size)
+    chunks = [profile_dicts[start:start + chunk_size] for start in range(0, len(profile_dicts), chunk_size)]
+
+    if request.stream:
+        # Admission is decided before the response starts; once streaming,
+        # later chunks wait for the pool instead of being rejected
+        if scoring_executor.saturated:
+            raise _service_busy()
+
+        # One JSON line per profile, flushed after every scored chunk
+        async def ndjson_lines():
+            for chunk in chunks:
+                responses = await scoring_executor.submit(recommend_for_chunk, chunk, request.top_k, request.diversity,
+                                                          reject=False)
+                for response in responses:
+                    yield dumps_json(response) + b"\n"
 
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    try:
+        results = []
+        for idx, chunk in enumerate(chunks):
+            results.extend(await scoring_executor.submit(recommend_for_chunk, chunk, request.top_k, request.diversity,
+                                                         reject=idx == 0))
+        return FastJSONResponse({'results': results})
+
+    except ExecutorSaturated:
+        raise _service_busy()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
 
+@app.post("/learning-path")
+async def get_learning_path(user_profile: UserProfile):
+    """Ordered, prerequisite-aware multi-month course path toward the target domain"""
+    try:
+        plan = await scoring_executor.submit(plan_for_profile, user_profile.dict())
+        return FastJSONResponse(plan)
+
+    except ExecutorSaturated:
+        raise _service_busy()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error planning learning path: {str(e)}")
+
+
+def plan_for_profile(profile_dict):
+    """Plan one profile's learning path (runs in the scoring executor)"""
+    return matching_engine.plan_learning_path(profile_dict)
+
+
+def recommend_for_profile(profile_dict, retrieval='exhaustive', timeline_format='courses', diversity=None):
+    """Score one profile and build its response (runs in the scoring executor)"""
+    # The whole request runs against this snapshot, even if a reload swaps
+    # in a new catalog meanwhile
+    catalog = matching_engine.ensure_loaded()
+    diversity = matching_engine.diversity_lambda if diversity is None else diversity
+
+    # Scores are shared by every profile with the same normalized fields;
+    # rationales additionally depend on the order of technical skills
+    scoring_key = (f"{catalog.catalog_version}:{ENGINE_KEY}:{retrieval}:{diversity!r}:"
+                   f"{profile_fingerprint(profile_dict)}")
+    rationale_key = rationale_fingerprint(profile_dict, scoring_key)
+
+    with metrics.stage('cache_lookup'):
+        scored = result_cache.get(scoring_key)
+        rationales = result_cache.get(rationale_key) if scored is not None else None
+
+    if rationales is None:
+        # Analyze the user's skills once for the whole request
+        analysis = matching_engine.analyze_profile(profile_dict, catalog)
+
+        if scored is None:
+            # Get recommendations
+            recommendations = matching_engine.recommend_courses(profile_dict, analysis=analysis,
+                                                                scoring_mode=RETRIEVAL_MODES[retrieval],
+                                                                diversity_lambda=diversity)
+            scored = score_timeline(recommendations, profile_dict, analysis)
+            result_cache.set(scoring_key, scored)
+
+        rationales = matching_engine.generate_rationales(scored['recommendations'], profile_dict, analysis)
+        result_cache.set(rationale_key, rationales)
+
+    return assemble_response(profile_dict, scored, rationales, timeline_format)
+
+
+def recommend_for_chunk(profile_dicts, top_k, diversity=None):
+    """Score a chunk of profiles together (runs in the scoring executor)"""
+    catalog = matching_engine.ensure_loaded()
+    analyses = [matching_engine.analyze_profile(profile, catalog) for profile in profile_dicts]
+    batch = matching_engine.recommend_courses_batch(profile_dicts, top_k=top_k, analyses=analyses,
+                                                    chunk_size=len(profile_dicts), diversity_lambda=diversity)
+    return [
+        build_recommendation_response(profile, recommendations, analysis)
+        for profile, recommendations, analysis in zip(profile_dicts, batch, analyses)
+    ]
+
+
+def build_recommendation_response(profile_dict, recommendations, analysis):
+    """Attach timeline and rationales to a profile's recommendations"""
+    scored = score_timeline(recommendations, profile_dict, analysis)
+    rationales = matching_engine.generate_rationales(recommendations, profile_dict, analysis)
+
+    return assemble_response(profile_dict, scored, rationales)
+
+
+def score_timeline(recommendations, profile_dict, analysis):
+    """Bundle recommendations with their timeline, stored as indices into the list"""
+    # Generate timeline
+    timeline_data = matching_engine.generate_learning_timeline(recommendations, profile_dict, analysis)
+
+    positions = {id(course): idx for idx, course in enumerate(recommendations)}
+    return {
+        'recommendations': recommendations,
+        'timeline': {period: [positions[id(course)] for course in courses]
+                     for period, courses in timeline_data.items()},
+    }
+
+
+def assemble_response(profile_dict, scored, rationales, timeline_format='courses'):
+    """Build the RecommendationResponse payload from scored recommendations and their rationales.
+
+    Each course payload is built once. With timeline_format='indices' the
+    timeline lists positions in recommendations (IndexedRecommendationResponse);
+    with 'courses' it repeats the same course payloads.
+    """
+    with metrics.stage('response_build'):
+        # Add rationales
+        final_recommendations = []
+        for course, rationale in zip(scored['recommendations'], rationales):
+            payload = {field: course[field] for field in RESPONSE_COURSE_FIELDS}
+            payload['rationale'] = rationale
+            final_recommendations.append(payload)
+
+        if timeline_format == 'indices':
+            timeline = {period: list(indices) for period, indices in scored['timeline'].items()}
+        else:
+            timeline = {
+                period: [final_recommendations[idx] for idx in indices]
+                for period, indices in scored['timeline'].items()
+            }
+
+        return {
+            'recommendations': final_recommendations,
+            'timeline': timeline,
+            'user_profile': profile_dict,
+        }
+
+
 @app.get("/")
 async def root():
     return {"message": "Smart Career AI Recommender API"}
 
 
+@app.get("/ready")
+async def readiness():
+    """200 once the catalog is loaded and warmed up, 503 until then"""
+    snapshot = matching_engine.snapshot
+    ready = snapshot is not None and (warmup_state['done'] or not WARMUP_ENABLED)
+    return FastJSONResponse({
+        'ready': ready,
+        'warmup_seconds': warmup_state['seconds'],
+        'warmup_error': warmup_state['error'],
+        'catalog_version': snapshot.catalog_version if snapshot is not None else None,
+        'courses': len(snapshot) if snapshot is not None else 0,
+    }, status_code=200 if ready else 503)
+
+
 @app.get("/courses")
-async def get_courses():
+async def get_courses(
+        request: Request,
+        cursor: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=MAX_COURSE_PAGE),
+        domain: Optional[List[str]] = Query(None),
+        level: Optional[List[str]] = Query(None),
+        cost: Optional[List[str]] = Query(None),
+        provider: Optional[List[str]] = Query(None),
+):
     try:
-        matching_engine.load_courses()
-        courses = matching_engine.courses_df.to_dict('records')
-        return {"courses": courses}
+        after = int(cursor) if cursor else -1
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    if after < 0 and cursor:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+    try:
+        # Reads the catalog already held by the engine; it is only loaded
+        # here if no request has needed it yet. The page is served from this
+        # one snapshot even if a reload lands while it streams.
+        catalog = await run_in_threadpool(matching_engine.ensure_loaded)
+
+        filters = {'domain': domain, 'level': level, 'cost': cost, 'provider': provider}
+        etag = _courses_etag(catalog, filters, after, limit)
+        if etag in _parse_if_none_match(request.headers.get('if-none-match')):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        page, total, next_cursor = catalog.page_courses(after, limit, **filters)
+        return StreamingResponse(
+            _stream_course_page(catalog, page, total, next_cursor),
+            media_type="application/json",
+            headers={"ETag": etag},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading courses: {str(e)}")
 
 
+def _courses_etag(catalog, filters, after, limit):
+    """Entity tag for a /courses page: catalog version plus the normalized query"""
+    query = {column: sorted(value.lower() for value in values) for column, values in filters.items() if values}
+    payload = json.dumps([catalog.catalog_version, query, after, limit], sort_keys=True)
+    return '"' + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def _parse_if_none_match(header):
+    if not header:
+        return set()
+    if header.strip() == '*':
+        return _AnyTag()
+    tags = (tag.strip() for tag in header.split(','))
+    return {tag[2:] if tag.startswith('W/') else tag for tag in tags}
+
+
+class _AnyTag:
+    """If-None-Match: * matches every representation"""
+
+    def __contains__(self, tag):
+        return True
+
+
+def _stream_course_page(catalog, positions, total, next_cursor, chunk_size=200):
+    """Serialize a page of courses as JSON incrementally, chunk by chunk"""
+    yield '{"courses": ['
+    for start in range(0, len(positions), chunk_size):
+        records = catalog.course_records(positions[start:start + chunk_size])
+        yield (',' if start else '') + ','.join(json.dumps(record) for record in records)
+    cursor_value = json.dumps(str(next_cursor) if next_cursor is not None else None)
+    yield f'], "total": {total}, "next_cursor": {cursor_value}}}'
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Stage latency histograms and service gauges in the Prometheus text format"""
+    snapshot = matching_engine.snapshot
+    cache = result_cache.stats()
+    gauges = {
+        'catalog_courses': ("Courses in the current catalog snapshot", len(snapshot) if snapshot is not None else 0),
+        'catalog_version': ("Version of the current catalog snapshot",
+                            snapshot.version if snapshot is not None else 0),
+        'cache_hits_total': ("Result cache hits", cache['hits']),
+        'cache_misses_total': ("Result cache misses", cache['misses']),
+        'cache_hit_rate': ("Result cache hits per lookup", cache['hit_rate']),
+        'cache_entries': ("Entries in the result cache", cache['size']),
+        'cache_evictions_total': ("Result cache entries evicted for space", cache['evictions']),
+        'executor_queue_depth': ("Scoring jobs queued or running", scoring_executor.queue_depth),
+        'executor_max_pending': ("Scoring jobs admitted before requests get 503", scoring_executor.max_pending),
+    }
+    return Response(metrics.render(gauges), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Admin endpoints need this token in the X-Admin-Token header; they are
+# disabled when it is not set
+ADMIN_TOKEN = os.environ.get('RECOMMENDER_ADMIN_TOKEN') or None
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set RECOMMENDER_ADMIN_TOKEN")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.post("/admin/reload", status_code=202, dependencies=[Depends(require_admin)])
+async def reload_catalog():
+    """Rebuild the configured catalog in the background; requests keep using the current one until it is swapped in"""
+    if catalog_reloader is not None:
+        catalog_reloader()
+        return matching_engine.catalog_info()
+
+    try:
+        matching_engine.reload_in_background()
+        return matching_engine.catalog_info()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading catalog: {str(e)}")
+
+
+@app.get("/admin/catalog", dependencies=[Depends(require_admin)])
+async def get_catalog_info():
+    """Current snapshot version, build duration and reload state"""
+    return matching_engine.catalog_info()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,307 @@
+# benchmark.py
+"""Reproducible performance benchmark for the matching engine and API.
+
+For each catalog size a seeded synthetic catalog and matching profiles are
+generated with ``course_data``, then these stages are timed:
+
+- ``load_courses`` from the CSV (artifact disabled) and from the artifact
+- ``recommend_courses``, ``generate_learning_timeline`` and
+  ``generate_rationale`` per profile
+- end-to-end ``POST /recommend`` through the FastAPI test client, with the
+  result cache disabled
+- building and encoding a ``/recommend`` response body, next to the same
+  body validated through the pydantic response models
+- ``cold_start``: a fresh interpreter importing the backend, loading the
+  catalog from its artifact and warming up
+
+The report also breaks down the cost of ``import backend`` by top-level
+package, from ``python -X importtime`` in fresh interpreters.
+
+Each stage reports p50/p95/p99 latency, throughput and the process's peak
+RSS so far as JSON. Compare against an earlier run to catch regressions::
+
+    python benchmark.py --sizes 1000 100000 --output bench.json
+    python benchmark.py --sizes 1000 100000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from course_data import generate_synthetic_catalog, generate_user_profiles
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+# Packages below this many ms of import time are summed into 'other'
+IMPORT_REPORT_MIN_MS = 5.0
+
+# Run in a fresh interpreter: seconds until the backend is importable and
+# until it has loaded the catalog and warmed up
+COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import backend
+imported = time.perf_counter()
+backend.matching_engine.load_courses(sys.argv[1])
+backend.matching_engine.warm_up()
+print(json.dumps({'import': imported - started, 'ready': time.perf_counter() - started,
+                  'modules': sorted(name for name in ('pandas', 'sklearn') if name in sys.modules)}))
+"""
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(durations):
+    """Latency percentiles (ms), throughput and peak RSS for one stage"""
+    durations = np.asarray(durations, dtype=np.float64)
+    total = float(durations.sum())
+    return {
+        'count': len(durations),
+        'p50_ms': float(np.percentile(durations, 50) * 1000),
+        'p95_ms': float(np.percentile(durations, 95) * 1000),
+        'p99_ms': float(np.percentile(durations, 99) * 1000),
+        'mean_ms': float(durations.mean() * 1000),
+        'max_ms': float(durations.max() * 1000),
+        'throughput_per_s': len(durations) / total if total > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def timed(func, *args, **kwargs):
+    """(result, seconds) of one call"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def benchmark_catalog(n_courses, n_profiles, api_requests, data_dir, seed=0, top_k=10, cold_starts=3):
+    """Time every stage against one synthetic catalog size"""
+    from catalog_artifact import default_artifact_path, write_artifact
+    from matching_engine import AlternativeMatchingEngine
+
+    csv_path = os.path.join(data_dir, f'bench_{n_courses}_{seed}.csv')
+    if not os.path.exists(csv_path):
+        generate_synthetic_catalog(n_courses, seed=seed, csv_path=csv_path)
+    profiles = generate_user_profiles(n_profiles, seed=seed + 1)
+
+    stages = {}
+    engine = AlternativeMatchingEngine()
+    snapshot, seconds = timed(engine.load_courses, csv_path, use_artifact=False)
+    stages['load_courses'] = summarize([seconds])
+
+    write_artifact(snapshot, default_artifact_path(csv_path), snapshot.catalog_version)
+    _, seconds = timed(AlternativeMatchingEngine().load_courses, csv_path)
+    stages['load_courses_artifact'] = summarize([seconds])
+    if cold_starts:
+        stages.update(benchmark_cold_start(csv_path, cold_starts))
+
+    recommend, timeline, rationale = [], [], []
+    for profile in profiles:
+        analysis = engine.analyze_profile(profile)
+        recommendations, seconds = timed(engine.recommend_courses, profile, top_k=top_k, analysis=analysis)
+        recommend.append(seconds)
+        _, seconds = timed(engine.generate_learning_timeline, recommendations, profile, analysis)
+        timeline.append(seconds)
+        for course in recommendations:
+            _, seconds = timed(engine.generate_rationale, course, profile, analysis)
+            rationale.append(seconds)
+
+    stages['recommend_courses'] = summarize(recommend)
+    stages['generate_learning_timeline'] = summarize(timeline)
+    if rationale:
+        stages['generate_rationale'] = summarize(rationale)
+
+    if api_requests:
+        stages['api_recommend'] = benchmark_api(csv_path, profiles[:api_requests])
+        stages.update(benchmark_serialization(profiles[:api_requests]))
+
+    return {'courses': n_courses, 'profiles': n_profiles, 'stages': stages}
+
+
+def benchmark_api(csv_path, profiles):
+    """Time POST /recommend end to end through the FastAPI test client"""
+    # Every request must be scored, not served from the result cache
+    os.environ['RECOMMENDER_CACHE_SIZE'] = '0'
+    from fastapi.testclient import TestClient
+
+    import backend
+
+    backend.matching_engine.load_courses(csv_path)
+    durations = []
+    with TestClient(backend.app) as client:
+        for profile in profiles:
+            response, seconds = timed(client.post, '/recommend', json=profile)
+            response.raise_for_status()
+            durations.append(seconds)
+    return summarize(durations)
+
+
+def benchmark_serialization(profiles):
+    """Time response construction and encoding on the backend's loaded catalog.
+
+    serialize_response is the path /recommend uses. serialize_response_validated
+    builds the pydantic response models and encodes them the way a
+    response_model route does, for comparison.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    import backend
+
+    engine = backend.matching_engine
+    fast, validated = [], []
+    for profile in profiles:
+        profile_dict = backend.UserProfile(**profile).dict()
+        analysis = engine.analyze_profile(profile_dict)
+        recommendations = engine.recommend_courses(profile_dict, analysis=analysis)
+        scored = backend.score_timeline(recommendations, profile_dict, analysis)
+        rationales = [engine.generate_rationale(course, profile_dict, analysis) for course in recommendations]
+
+        _, seconds = timed(lambda: backend.FastJSONResponse(
+            backend.assemble_response(profile_dict, scored, rationales)))
+        fast.append(seconds)
+        _, seconds = timed(lambda: JSONResponse(jsonable_encoder(backend.RecommendationResponse(
+            **backend.assemble_response(profile_dict, scored, rationales)))))
+        validated.append(seconds)
+
+    return {'serialize_response': summarize(fast), 'serialize_response_validated': summarize(validated)}
+
+
+def _run_fresh(*args):
+    """stdout and stderr of a fresh interpreter started in the repository directory"""
+    result = subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return result.stdout, result.stderr
+
+
+def benchmark_cold_start(csv_path, repeats):
+    """Time import, catalog load and warmup of the backend in fresh interpreters"""
+    imported, ready = [], []
+    for _ in range(repeats):
+        stdout, _ = _run_fresh('-c', COLD_START_SCRIPT, csv_path)
+        timings = json.loads(stdout.splitlines()[-1])
+        imported.append(timings['import'])
+        ready.append(timings['ready'])
+    stages = {'cold_start_import': summarize(imported), 'cold_start_ready': summarize(ready)}
+    # Heavy modules the serving path pulled in
+    stages['cold_start_ready']['modules'] = timings['modules']
+    return stages
+
+
+def parse_importtime(stderr):
+    """Import time in ms per top-level package, from -X importtime output (self times, so they add up)"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    return packages
+
+
+def benchmark_imports(module='backend', repeats=5):
+    """Median -X importtime breakdown of importing module in fresh interpreters"""
+    runs = [parse_importtime(_run_fresh('-X', 'importtime', '-c', f'import {module}')[1]) for _ in range(repeats)]
+    packages = {package: float(np.median([run.get(package, 0.0) for run in runs]))
+                for package in set().union(*runs)}
+
+    breakdown, other = {}, 0.0
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1]):
+        if ms >= IMPORT_REPORT_MIN_MS:
+            breakdown[package] = round(ms, 2)
+        else:
+            other += ms
+    breakdown['other'] = round(other, 2)
+    return {
+        'module': module,
+        'total_ms': round(float(np.median([sum(run.values()) for run in runs])), 2),
+        'packages_ms': breakdown,
+    }
+
+
+def compare_results(current, baseline, tolerance=0.2, metric='p95_ms'):
+    """Stages whose metric got worse than baseline by more than tolerance"""
+    baseline_stages = {result['courses']: result['stages'] for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        for stage, stats in result['stages'].items():
+            before = baseline_stages.get(result['courses'], {}).get(stage)
+            if before and before[metric] > 0 and stats[metric] > before[metric] * (1 + tolerance):
+                regressions.append({
+                    'courses': result['courses'],
+                    'stage': stage,
+                    'baseline': before[metric],
+                    'current': stats[metric],
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='catalog sizes to benchmark')
+    parser.add_argument('--profiles', type=int, default=200, help='profiles scored per catalog size')
+    parser.add_argument('--api-requests', type=int, default=100, help='/recommend requests per size (0 skips)')
+    parser.add_argument('--cold-starts', type=int, default=3,
+                        help='fresh-interpreter starts per size, and -X importtime runs (0 skips)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help='where generated catalogs are kept (default: a temporary directory)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='earlier JSON report to check for p95 regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 slowdown when comparing')
+    args = parser.parse_args(argv)
+
+    import sklearn
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='recommender-bench-')
+    os.makedirs(data_dir, exist_ok=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'scikit-learn': sklearn.__version__,
+            'seed': args.seed,
+        },
+        'results': [
+            benchmark_catalog(size, args.profiles, args.api_requests, data_dir, seed=args.seed,
+                              cold_starts=args.cold_starts)
+            for size in args.sizes
+        ],
+    }
+    if args.cold_starts:
+        report['imports'] = benchmark_imports(repeats=args.cold_starts)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression['stage']} at {regression['courses']} courses, "
+                  f"p95 {regression['baseline']:.2f} ms -> {regression['current']:.2f} ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+# bulk_score.py
+"""Offline bulk scoring: learner profiles in, ranked courses out.
+
+Profiles are streamed from a JSONL file (one UserProfile object per line) or
+a CSV file (one column per field; list fields hold a list literal or
+``;``-separated values, and ``constraints`` a JSON object). The pipeline is made of generators: read, chunk,
+score in a process pool, write in input order. Only a bounded window of
+chunks is in flight at any time, so memory stays flat whatever the input
+size.
+
+The parent loads the catalog once and writes its artifact if needed. Workers
+forked from it share the loaded catalog copy-on-write; on platforms that
+spawn instead of fork, each worker memory-maps the same artifact.
+
+Output is JSONL (one line per profile, with its recommendations and
+rationales) or, with ``--format parquet`` (needs ``pyarrow``), a directory of
+Parquet part files with one row per recommended course; profiles that can't
+be scored get an error line or, for Parquet, a row in the ``_errors``
+subdirectory (skipped by Parquet dataset readers). A checkpoint file
+next to the output records how many profiles are done after every written
+chunk; ``--resume`` continues from it after an interruption.
+
+    python bulk_score.py learners.jsonl rankings.jsonl --catalog courses.csv --workers 8
+    python bulk_score.py learners.jsonl rankings.jsonl --catalog courses.csv --workers 8 --resume
+"""
+import argparse
+import collections
+import csv
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog_loader import parse_skill_list
+from constraints import CONSTRAINT_LIST_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# UserProfile fields, with the defaults the API applies
+PROFILE_DEFAULTS = {
+    'education': '', 'major': '', 'technical_skills': [], 'soft_skills': [], 'interests': [],
+    'target_domain': None, 'career_goals': None, 'level': 'beginner', 'preferred_duration': None,
+}
+PROFILE_LIST_FIELDS = ('technical_skills', 'soft_skills', 'interests')
+
+# Course fields written per recommendation, as in the /recommend response
+OUTPUT_COURSE_FIELDS = ('title', 'provider', 'duration', 'level', 'fit_score', 'link', 'domain', 'cost')
+
+# Chunks in flight per worker; bounds memory together with --chunk-size
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+# Engine and settings of the scoring process(es)
+_engine = None
+_settings = {}
+
+
+class ProfileError(ValueError):
+    """A profile record that can't be scored"""
+
+
+def parse_profile(record):
+    """UserProfile dict from a JSON object or CSV row, with API defaults filled in"""
+    if not isinstance(record, dict):
+        raise ProfileError("profile must be an object")
+    profile = dict(PROFILE_DEFAULTS)
+    for field, value in record.items():
+        if value is None or value == '':
+            continue
+        if field in PROFILE_LIST_FIELDS:
+            profile[field] = _parse_list(field, value)
+        elif field in PROFILE_DEFAULTS:
+            if not isinstance(value, str):
+                raise ProfileError(f"{field}: expected a string")
+            profile[field] = value
+        elif field == 'constraints':
+            profile[field] = _parse_constraints(value)
+        else:
+            # Extra fields such as a learner id are passed through
+            profile[field] = value
+    return profile
+
+
+def _parse_constraints(value):
+    # CSV cells hold the constraints object as JSON
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ProfileError("constraints: invalid JSON")
+    if not isinstance(value, dict):
+        raise ProfileError("constraints: expected an object")
+
+    # Same checks as the API's RecommendationConstraints
+    max_weeks = value.get('max_duration_weeks')
+    if max_weeks is not None and (isinstance(max_weeks, bool) or not isinstance(max_weeks, (int, float))
+                                  or not max_weeks > 0):
+        raise ProfileError("constraints.max_duration_weeks: expected a positive number")
+    for field in CONSTRAINT_LIST_FIELDS:
+        items = value.get(field)
+        if items is not None and (not isinstance(items, list) or not all(isinstance(item, str) for item in items)):
+            raise ProfileError(f"constraints.{field}: expected a list of strings")
+    return value
+
+
+def _parse_list(field, value):
+    if isinstance(value, list):
+        if not all(isinstance(item, str) for item in value):
+            raise ProfileError(f"{field}: list items must be strings")
+        return value
+    if isinstance(value, str):
+        try:
+            return parse_skill_list(value)
+        except ValueError:
+            separator = ';' if ';' in value else ','
+            return [item.strip() for item in value.split(separator) if item.strip()]
+    raise ProfileError(f"{field}: expected a list of strings")
+
+
+def read_profiles(path, start=0, id_field='id'):
+    """Yield (index, profile or None, error or None) for each record from index start on.
+
+    error is a dict with the record's id (None when it has none) and the reason.
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                if index >= start:
+                    yield _checked(index, lambda: row, id_field)
+        return
+
+    with open(path, encoding='utf-8') as f:
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if index >= start:
+                yield _checked(index, lambda: json.loads(line), id_field)
+            index += 1
+
+
+def _checked(index, load, id_field):
+    record = None
+    try:
+        record = load()
+        return index, parse_profile(record), None
+    except (ValueError, ProfileError) as e:
+        record_id = record.get(id_field) if isinstance(record, dict) else None
+        return index, None, {'id': record_id, 'error': str(e)}
+
+
+def chunked(records, size):
+    """Group an iterable into lists of at most size items"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def init_worker(catalog_path, top_k, diversity_lambda, rationales, id_field):
+    """Load the engine in a scoring process, unless it was inherited already loaded"""
+    global _engine
+    if _engine is None:
+        from matching_engine import AlternativeMatchingEngine
+
+        _engine = AlternativeMatchingEngine()
+    if _engine.snapshot is None:
+        _engine.load_courses(catalog_path)
+    _settings.update(top_k=top_k, diversity_lambda=diversity_lambda, rationales=rationales, id_field=id_field)
+
+
+def score_chunk(records):
+    """Result dict per (index, profile, error) record of one chunk"""
+    catalog = _engine.ensure_loaded()
+    valid = [(index, profile) for index, profile, error in records if profile is not None]
+    profiles = [profile for _, profile in valid]
+    analyses = [_engine.analyze_profile(profile, catalog) for profile in profiles]
+    batches = _engine.recommend_courses_batch(profiles, top_k=_settings['top_k'], analyses=analyses,
+                                              chunk_size=max(len(profiles), 1),
+                                              diversity_lambda=_settings['diversity_lambda'])
+
+    scored = {}
+    for (index, profile), analysis, recommendations in zip(valid, analyses, batches):
+        courses = [{field: course[field] for field in OUTPUT_COURSE_FIELDS} for course in recommendations]
+        if _settings['rationales']:
+            for course, rationale in zip(courses, _engine.generate_rationales(recommendations, profile, analysis)):
+                course['rationale'] = rationale
+        scored[index] = {'index': index, 'id': profile.get(_settings['id_field']), 'recommendations': courses}
+
+    return [scored[index] if profile is not None else dict(index=index, **error)
+            for index, profile, error in records]
+
+
+class JsonlWriter:
+    """One JSON line per profile, appended to a single file"""
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        mode = 'r+b' if offset and os.path.exists(path) else 'wb'
+        self.file = open(path, mode)
+        # Drop anything written after the checkpoint
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write(self, results):
+        self.file.write(b''.join(json.dumps(result, default=str).encode('utf-8') + b'\n' for result in results))
+
+    def commit(self):
+        """Make everything written so far durable, returning the resume offset"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """One Parquet part file per chunk, with one row per recommended course.
+
+    Profiles that can't be scored go to part files of the same chunk under
+    _errors, one row each with profile_index, profile_id and error.
+    """
+
+    def __init__(self, path, processed=0):
+        import pyarrow
+
+        self.pyarrow = pyarrow
+        self.path = path
+        self.errors_path = os.path.join(path, '_errors')
+        os.makedirs(self.errors_path, exist_ok=True)
+        # Drop parts written after the checkpoint
+        for directory in (self.path, self.errors_path):
+            for part in glob.glob(os.path.join(directory, 'part-*.parquet')):
+                if int(os.path.basename(part)[5:-8]) >= processed:
+                    os.remove(part)
+
+    def write(self, results):
+        rows = collections.defaultdict(list)
+        errors = collections.defaultdict(list)
+        for result in results:
+            profile_id = None if result.get('id') is None else str(result['id'])
+            if 'error' in result:
+                errors['profile_index'].append(result['index'])
+                errors['profile_id'].append(profile_id)
+                errors['error'].append(result['error'])
+            for rank, course in enumerate(result.get('recommendations', ()), 1):
+                rows['profile_index'].append(result['index'])
+                rows['profile_id'].append(profile_id)
+                rows['rank'].append(rank)
+                for field, value in course.items():
+                    rows[field].append(value)
+
+        pa = self.pyarrow
+        name = f"part-{results[0]['index']:012d}.parquet" if results else ''
+        if rows:
+            self._write_part(os.path.join(self.path, name), pa.table(dict(rows)))
+        if errors:
+            schema = pa.schema([('profile_index', pa.int64()), ('profile_id', pa.string()), ('error', pa.string())])
+            self._write_part(os.path.join(self.errors_path, name), pa.table(dict(errors), schema=schema))
+
+    @staticmethod
+    def _write_part(name, table):
+        import pyarrow.parquet as pq
+
+        tmp_name = name + '.tmp'
+        pq.write_table(table, tmp_name)
+        os.replace(tmp_name, name)
+
+    def commit(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+def checkpoint_path(output_path):
+    return output_path.rstrip('/') + '.checkpoint.json'
+
+
+def load_checkpoint(path, expected):
+    """Checkpoint at path, checked against the run settings it must match"""
+    with open(path) as f:
+        checkpoint = json.load(f)
+    changed = [key for key, value in expected.items() if checkpoint.get(key) != value]
+    if changed:
+        raise SystemExit(f"Checkpoint {path} was written with different {', '.join(changed)}; "
+                         f"rerun without --resume to start over")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run(input_path, output_path, catalog_path='courses.csv', output_format='jsonl', workers=1, chunk_size=1000,
+        top_k=10, diversity_lambda=None, rationales=True, id_field='id', resume=False, report_every=10.0):
+    """Score every profile of input_path into output_path and return a run summary"""
+    # Load the catalog (and write its artifact) before any worker starts
+    init_worker(catalog_path, top_k, diversity_lambda, rationales, id_field)
+    catalog = _engine.snapshot
+    if diversity_lambda is None:
+        diversity_lambda = _engine.diversity_lambda
+        _settings['diversity_lambda'] = diversity_lambda
+
+    input_stat = os.stat(input_path)
+    settings = {
+        'input': os.path.abspath(input_path),
+        'input_size': input_stat.st_size,
+        'input_mtime': input_stat.st_mtime,
+        'catalog_version': catalog.catalog_version,
+        'format': output_format,
+        'top_k': top_k,
+        'diversity_lambda': diversity_lambda,
+        'rationales': rationales,
+    }
+    state_path = checkpoint_path(output_path)
+    processed, offset = 0, 0
+    if resume and os.path.exists(state_path):
+        checkpoint = load_checkpoint(state_path, settings)
+        processed, offset = checkpoint['processed'], checkpoint['output_offset']
+        logger.info("Resuming after %d profiles", processed)
+
+    writer = ParquetWriter(output_path, processed) if output_format == 'parquet' else JsonlWriter(output_path, offset)
+    chunks = chunked(read_profiles(input_path, start=processed, id_field=id_field), chunk_size)
+
+    started = time.perf_counter()
+    last_report = started
+    done = errors = 0
+    pool = None
+    try:
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                       initargs=(catalog_path, top_k, diversity_lambda, rationales, id_field))
+            results = _ordered_results(pool, chunks, workers * CHUNKS_IN_FLIGHT_PER_WORKER)
+        else:
+            results = (score_chunk(chunk) for chunk in chunks)
+
+        for chunk_results in results:
+            writer.write(chunk_results)
+            offset = writer.commit()
+            done += len(chunk_results)
+            errors += sum(1 for result in chunk_results if 'error' in result)
+            save_checkpoint(state_path, dict(settings, processed=processed + done, output_offset=offset))
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                last_report = now
+                logger.info("%d profiles scored, %.1f profiles/s", processed + done, done / (now - started))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        'input': input_path,
+        'output': output_path,
+        'resumed_after': processed,
+        'profiles': done,
+        'invalid_profiles': errors,
+        'seconds': seconds,
+        'profiles_per_second': done / seconds if seconds > 0 else None,
+        'workers': workers,
+        'catalog_version': catalog.catalog_version,
+    }
+
+
+def _ordered_results(pool, chunks, window):
+    """Score chunks in the pool with at most window in flight, yielding results in input order"""
+    pending = collections.deque()
+    for chunk in chunks:
+        pending.append(pool.submit(score_chunk, chunk))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('input', help='profiles as .jsonl or .csv')
+    parser.add_argument('output', help='JSONL file, or directory of Parquet parts with --format parquet')
+    parser.add_argument('--catalog', default='courses.csv', help='catalog file; its artifact is built if missing')
+    parser.add_argument('--format', choices=('jsonl', 'parquet'), default='jsonl')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='scoring processes (1 scores inline)')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='profiles scored and written together')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--diversity', type=float, help='MMR weight (default: the engine default; 1 turns it off)')
+    parser.add_argument('--no-rationales', action='store_true', help='skip rationale text')
+    parser.add_argument('--id-field', default='id', help='profile field copied into each result')
+    parser.add_argument('--resume', action='store_true', help='continue from the checkpoint of an interrupted run')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between progress logs')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', stream=sys.stderr)
+    summary = run(args.input, args.output, catalog_path=args.catalog, output_format=args.format,
+                  workers=max(1, args.workers), chunk_size=max(1, args.chunk_size), top_k=args.top_k,
+                  diversity_lambda=args.diversity, rationales=not args.no_rationales, id_field=args.id_field,
+                  resume=args.resume, report_every=args.report_every)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# candidate_index.py
+"""Inverted indexes for two-stage (pruned) recommendation scoring.
+
+Stage one pulls candidates from postings over TF-IDF terms and prerequisite
+skills. Every other course shares no term with the profile (similarity 0)
+and, unless it has no prerequisites, covers none of them, so its fit score
+is bounded by its (domain, level, prerequisite-free) group. Stage two, in
+``AlternativeMatchingEngine._recommend_pruned``, computes exact fit scores
+in descending order of these upper bounds and stops max-score style once no
+remaining bound can beat the current k-th best.
+
+Check recall against exhaustive scoring with::
+
+    python candidate_index.py courses.csv
+"""
+import sys
+
+import numpy as np
+from scipy import sparse
+
+# Number of course level codes (beginner, intermediate, advanced)
+N_LEVELS = 3
+
+
+class CandidateIndex:
+    """Term, prerequisite and group postings for one catalog snapshot"""
+
+    def __init__(self, catalog):
+        self.n_courses = len(catalog)
+
+        # Column-major copies: term / skill -> courses postings
+        self.term_postings = sparse.csc_matrix(catalog.tfidf_matrix)
+        self.prereq_postings = sparse.csc_matrix(catalog.prereq_matrix)
+
+        # Every course belongs to exactly one (domain, level, prerequisite-free) group
+        group_keys = ((np.asarray(catalog.domain_codes, dtype=np.int64) * N_LEVELS
+                       + np.asarray(catalog.level_codes, dtype=np.int64)) * 2
+                      + np.asarray(catalog.prereq_free, dtype=np.int64))
+        keys, inverse = np.unique(group_keys, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+
+        self.group_positions = [order[bounds[idx]:bounds[idx + 1]] for idx in range(len(keys))]
+        self.group_domain_codes = keys // (N_LEVELS * 2)
+        self.group_level_codes = (keys // 2) % N_LEVELS
+        self.group_prereq_free = (keys % 2).astype(bool)
+
+    def term_matches(self, query_vector):
+        """Mask of courses sharing a term with the query, and their (approximate) cosine similarity.
+
+        Both are dense over the catalog: accumulating postings into dense
+        arrays is cheaper than deduplicating them when query terms are common.
+        """
+        matched = np.zeros(self.n_courses, dtype=bool)
+        query = sparse.csr_matrix(query_vector)
+        norm = np.sqrt(np.dot(query.data, query.data))
+        if not norm:
+            return matched, np.zeros(self.n_courses)
+
+        postings = self.term_postings
+        positions, contributions = [], []
+        for term, weight in zip(query.indices, query.data / norm):
+            start, end = postings.indptr[term], postings.indptr[term + 1]
+            positions.append(postings.indices[start:end])
+            contributions.append(postings.data[start:end] * weight)
+
+        positions = np.concatenate(positions)
+        matched[positions] = True
+        similarities = np.bincount(positions, weights=np.concatenate(contributions), minlength=self.n_courses)
+        return matched, similarities
+
+    def prereq_matches(self, skill_ids):
+        """Mask of courses with at least one prerequisite among skill_ids"""
+        matched = np.zeros(self.n_courses, dtype=bool)
+        postings = self.prereq_postings
+        for skill_id in skill_ids:
+            if skill_id < postings.shape[1]:
+                matched[postings.indices[postings.indptr[skill_id]:postings.indptr[skill_id + 1]]] = True
+        return matched
+
+
+def bound_fit_scores(upper_bounds):
+    """Largest fit score a course with combined score <= upper_bounds can get"""
+    # The tolerance absorbs rounding differences between the bound and the exact score
+    return np.minimum(100, np.floor(upper_bounds * 100 + 1e-9)).astype(np.int64)
+
+
+def pruned_recall(engine, user_profiles, top_k=10):
+    """Compare pruned with exhaustive scoring over some profiles.
+
+    Returns mean and minimum recall of the exhaustive top-k, the share of
+    profiles where pruning was provably exact, and the mean number of
+    courses scored exactly. Both rankings are by fit score alone, without
+    diversity re-ranking.
+    """
+    recalls, exact, candidates = [], 0, []
+    for profile in user_profiles:
+        expected = engine.recommend_courses(profile, top_k=top_k, scoring_mode='vectorized', diversity_lambda=1.0)
+        analysis = engine.analyze_profile(profile)
+        pruned = engine.recommend_courses(profile, top_k=top_k, scoring_mode='pruned', analysis=analysis,
+                                         diversity_lambda=1.0)
+
+        expected_titles = [(course['title'], course['fit_score']) for course in expected]
+        pruned_titles = set((course['title'], course['fit_score']) for course in pruned)
+        recalls.append(sum(1 for item in expected_titles if item in pruned_titles) / len(expected_titles)
+                       if expected_titles else 1.0)
+        exact += analysis.retrieval_stats['exact']
+        candidates.append(analysis.retrieval_stats['candidates'])
+
+    return {
+        'profiles': len(user_profiles),
+        'mean_recall': float(np.mean(recalls)) if recalls else 1.0,
+        'min_recall': float(np.min(recalls)) if recalls else 1.0,
+        'exact_share': exact / len(user_profiles) if user_profiles else 1.0,
+        'mean_candidates': float(np.mean(candidates)) if candidates else 0.0,
+        'courses': len(engine.snapshot),
+    }
+
+
+def sample_profiles(catalog, count=200, seed=0):
+    """Random profiles drawn from the catalog's own skills, domains and levels"""
+    rng = np.random.default_rng(seed)
+    skills = [skill for skill in catalog.skill_vocab.skills if skill != 'none']
+    domains = sorted(set(catalog.courses_df['domain']))
+    levels = ['beginner', 'intermediate', 'advanced']
+
+    return [
+        {
+            'education': 'Bachelor',
+            'major': 'Computer Science',
+            'technical_skills': [skills[idx] for idx in rng.choice(len(skills), size=min(4, len(skills)),
+                                                                   replace=False)],
+            'soft_skills': ['communication'],
+            'interests': [skills[idx] for idx in rng.choice(len(skills), size=min(2, len(skills)),
+                                                            replace=False)],
+            'target_domain': domains[rng.integers(len(domains))],
+            'career_goals': None,
+            'level': levels[rng.integers(len(levels))],
+        }
+        for _ in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    import json
+
+    from matching_engine import AlternativeMatchingEngine
+
+    engine = AlternativeMatchingEngine()
+    engine.load_courses(sys.argv[1] if len(sys.argv) > 1 else 'courses.csv')
+    print(json.dumps(pruned_recall(engine, sample_profiles(engine.snapshot)), indent=2))
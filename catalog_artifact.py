@@ -0,0 +1,218 @@
+# catalog_artifact.py
+"""Prebuilt, memory-mappable course catalog artifact.
+
+The artifact is a directory of ``.npy`` arrays plus a ``manifest.json``. It
+holds everything ``AlternativeMatchingEngine.load_courses`` derives from
+``courses.csv``: the fitted TF-IDF vocabulary and idf, the CSR TF-IDF matrix,
+the encoded catalog columns and the skill/prerequisite index. Arrays are
+opened with ``np.load(mmap_mode='r')`` so several worker processes share the
+same pages, and the artifact is ignored once the CSV's sha256 changes.
+
+Build it ahead of time with::
+
+    python catalog_artifact.py courses.csv
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+# Bumped whenever the stored encoding changes, e.g. how cells are normalized
+ARTIFACT_VERSION = 3
+MANIFEST_NAME = 'manifest.json'
+
+# Catalog columns stored as categorical codes + a packed string table
+STRING_COLUMNS = ['title', 'provider', 'duration', 'level', 'link', 'domain', 'cost']
+# Catalog columns holding lists of skills
+LIST_COLUMNS = ['prerequisites', 'skill_tags']
+
+
+def default_artifact_path(csv_path):
+    """Artifact directory used for a catalog CSV when none is given"""
+    return os.path.splitext(csv_path)[0] + '.artifact'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def vectorizer_signature(vectorizer):
+    """JSON-friendly description of the vectorizer settings an artifact was fitted with"""
+    return {name: repr(value) for name, value in sorted(vectorizer.get_params().items())}
+
+
+def pack_strings(values):
+    """Encode a list of strings as (utf-8 bytes, offsets) arrays"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return data, offsets
+
+
+def unpack_strings(data, offsets):
+    """Decode strings packed by pack_strings"""
+    raw = np.asarray(data).tobytes()
+    bounds = np.asarray(offsets).tolist()
+    return [raw[start:end].decode('utf-8') for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class CatalogArtifact:
+    """Read-only view of a catalog artifact directory"""
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r')
+            self._arrays[name] = array
+        return array
+
+    def strings(self, name):
+        """Decode a packed string table"""
+        return unpack_strings(self[name + '.data'], self[name + '.offsets'])
+
+    def string_column(self, column):
+        """Decode a categorical string column back into per-course values"""
+        categories = self.strings(column + '.categories')
+        # Missing values are stored with code -1
+        categories.append(None)
+        return [categories[code] for code in np.asarray(self[column + '.codes']).tolist()]
+
+    def list_column(self, column):
+        """Decode a list-of-skills column back into per-course lists"""
+        strings = self.strings('list_strings')
+        ids = np.asarray(self[column + '.ids']).tolist()
+        bounds = np.asarray(self[column + '.offsets']).tolist()
+        return [[strings[i] for i in ids[start:end]] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def read_artifact(path, source_hash=None, vectorizer_params=None):
+    """Open an artifact, or return None if it is missing or stale.
+
+    vectorizer_params are the TfidfVectorizer settings the caller asks for;
+    the artifact must have been fitted with the same values. They are
+    compared against the recorded signature so that checking an artifact
+    needs no scikit-learn import.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('version') != ARTIFACT_VERSION:
+        return None
+    if source_hash is not None and manifest.get('source_sha256') != source_hash:
+        return None
+    if vectorizer_params is not None:
+        signature = manifest.get('vectorizer_params') or {}
+        if any(signature.get(name) != repr(value) for name, value in vectorizer_params.items()):
+            return None
+
+    return CatalogArtifact(path, manifest)
+
+
+def write_artifact(snapshot, path, source_hash):
+    """Write a catalog snapshot as an artifact directory.
+
+    The directory is assembled under a temporary name and moved into place,
+    so concurrent readers never see a half-written artifact.
+    """
+    df = snapshot.courses_df
+    arrays = {}
+
+    def add_strings(name, values):
+        arrays[name + '.data'], arrays[name + '.offsets'] = pack_strings(values)
+
+    # TF-IDF vocabulary (in column order), idf and CSR matrix
+    add_strings('tfidf_terms', [str(term) for term in snapshot.feature_names])
+    arrays['tfidf_idf'] = np.asarray(snapshot.vectorizer.idf_)
+    tfidf = snapshot.tfidf_matrix.tocsr()
+    arrays['tfidf_data'] = tfidf.data
+    arrays['tfidf_indices'] = tfidf.indices
+    arrays['tfidf_indptr'] = tfidf.indptr
+
+    # Categorical string columns and list columns (offsets into one shared
+    # string table), exactly as the snapshot's course store holds them
+    store = snapshot.course_store()
+    for column in STRING_COLUMNS:
+        arrays[column + '.codes'] = store.codes[column]
+        arrays[column + '.categories.data'] = store.categories[column].data
+        arrays[column + '.categories.offsets'] = store.categories[column].offsets
+    for column in LIST_COLUMNS:
+        arrays[column + '.ids'] = store.list_ids[column]
+        arrays[column + '.offsets'] = store.list_offsets[column]
+    arrays['list_strings.data'] = store.list_strings.data
+    arrays['list_strings.offsets'] = store.list_strings.offsets
+
+    # Scoring encodings (domain codes are the categorical domain column)
+    # and the skill/prerequisite index
+    arrays['level_codes'] = snapshot.level_codes
+    add_strings('skill_vocab', snapshot.skill_vocab.skills)
+    prereq_matrix = snapshot.prereq_matrix.tocsr()
+    arrays['prereq_data'] = prereq_matrix.data
+    arrays['prereq_indices'] = prereq_matrix.indices
+    arrays['prereq_indptr'] = prereq_matrix.indptr
+    arrays['prereq_counts'] = snapshot.prereq_counts
+    arrays['prereq_free'] = snapshot.prereq_free
+
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'source_sha256': source_hash,
+        'vectorizer_params': vectorizer_signature(snapshot.vectorizer),
+        'n_courses': len(df),
+        'columns': [column for column in df.columns if column in STRING_COLUMNS + LIST_COLUMNS],
+        'tfidf_shape': list(tfidf.shape),
+        'prereq_shape': list(prereq_matrix.shape),
+    }
+
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_path = tempfile.mkdtemp(prefix='.artifact-', dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the finished directory into place
+        if os.path.isdir(path):
+            stale_path = tempfile.mkdtemp(prefix='.artifact-stale-', dir=parent)
+            os.replace(path, os.path.join(stale_path, 'old'))
+            shutil.rmtree(stale_path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    return path
+
+
+def build_artifact(csv_path='courses.csv', artifact_path=None):
+    """Parse a catalog CSV, fit the engine and write its artifact"""
+    from matching_engine import AlternativeMatchingEngine
+
+    engine = AlternativeMatchingEngine()
+    engine.load_courses(csv_path, use_artifact=False)
+
+    artifact_path = artifact_path or default_artifact_path(csv_path)
+    return write_artifact(engine.snapshot, artifact_path, engine.catalog_version)
+
+
+if __name__ == "__main__":
+    csv_file = sys.argv[1] if len(sys.argv) > 1 else 'courses.csv'
+    output = build_artifact(csv_file, sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Wrote catalog artifact to {output}")
@@ -0,0 +1,315 @@
+# catalog_loader.py
+"""Chunked, validating course catalog reader for CSV, JSON Lines and Parquet.
+
+List columns (``prerequisites``, ``skill_tags``) are parsed with a strict
+grammar instead of ``eval``: a CSV cell should be a list literal of quoted
+strings such as ``['python', "c, c++"]`` (commas, quotes and backslash
+escapes inside items are fine). JSON Lines and Parquet may hold real lists.
+Empty or missing list cells are empty lists. Other text, such as the
+unquoted ``[python, sql]`` older catalogs use, is split on commas as the
+original loader did and reported as a warning. Files are read in chunks and
+each chunk is validated and normalized before the next is read, so raw cell
+text never accumulates for the whole catalog. Rows that fail validation
+are skipped and reported, or rejected with ``strict=True``.
+
+pandas is imported by the functions that read or normalize catalogs, so
+modules that only need the column and level constants stay light.
+"""
+import ast
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+LEVEL_MAPPING = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
+
+# Columns every course needs, in courses.csv order
+COURSE_COLUMNS = ['title', 'provider', 'duration', 'prerequisites', 'skill_tags',
+                  'level', 'link', 'domain', 'cost']
+LIST_FIELDS = ['prerequisites', 'skill_tags']
+TEXT_FIELDS = [column for column in COURSE_COLUMNS if column not in LIST_FIELDS]
+
+CATALOG_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+
+# Bad rows (and warnings) kept with details in a load report; the rest are only counted
+MAX_REPORTED_ROWS = 100
+
+UNQUOTED_LIST_WARNING = "unquoted list items, split on commas"
+
+_QUOTED = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*\""""
+LIST_PATTERN = re.compile(rf"\[\s*(?:(?:{_QUOTED})\s*(?:,\s*(?:{_QUOTED})\s*)*,?\s*)?\]")
+ITEM_PATTERN = re.compile(_QUOTED)
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogValidationError(ValueError):
+    """Raised when courses fail validation and cannot be skipped"""
+
+    def __init__(self, bad_rows, total=None):
+        self.bad_rows = bad_rows
+        self.total = total if total is not None else len({row for row, _, _ in bad_rows})
+        details = '; '.join(f"row {row} {column}: {reason}" for row, column, reason in bad_rows[:5])
+        more = f" (and {len(bad_rows) - 5} more problems)" if len(bad_rows) > 5 else ''
+        super().__init__(f"{self.total} invalid course rows: {details}{more}")
+
+
+class CatalogLoadReport:
+    """Row counts and rejected rows of one catalog load"""
+
+    def __init__(self, path, file_format):
+        self.path = path
+        self.format = file_format
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+        # (row number, column, reason) of the first MAX_REPORTED_ROWS errors
+        self.bad_rows = []
+        # Rows loaded with a warning, and the first MAX_REPORTED_ROWS warnings
+        self.rows_with_warnings = 0
+        self.warnings = []
+
+    def add_bad_rows(self, bad_rows):
+        rows = {row for row, _, _ in bad_rows}
+        self.rows_rejected += len(rows)
+        self.bad_rows.extend(bad_rows[:max(0, MAX_REPORTED_ROWS - len(self.bad_rows))])
+
+    def add_warnings(self, warnings):
+        self.rows_with_warnings += len({row for row, _, _ in warnings})
+        self.warnings.extend(warnings[:max(0, MAX_REPORTED_ROWS - len(self.warnings))])
+
+    def summary(self):
+        return {
+            'format': self.format,
+            'rows_read': self.rows_read,
+            'rows_loaded': self.rows_loaded,
+            'rows_rejected': self.rows_rejected,
+            'bad_rows': [{'row': row, 'column': column, 'reason': reason} for row, column, reason in self.bad_rows],
+            'rows_with_warnings': self.rows_with_warnings,
+            'warnings': [{'row': row, 'column': column, 'reason': reason} for row, column, reason in self.warnings],
+        }
+
+
+def _unquote(token):
+    """Content of a quoted list item, with backslash escapes resolved"""
+    if '\\' in token:
+        # literal_eval only ever sees one quoted string literal matched by ITEM_PATTERN
+        return ast.literal_eval(token)
+    return token[1:-1]
+
+
+def parse_skill_list(value):
+    """Parse one list cell (a list literal of quoted strings, or a list) into stripped skills"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        items = list(value)
+        if not all(isinstance(item, str) for item in items):
+            raise ValueError("list items must be strings")
+        return [item.strip() for item in items]
+    if isinstance(value, str):
+        value = value.strip()
+        if LIST_PATTERN.fullmatch(value):
+            return [_unquote(token).strip() for token in ITEM_PATTERN.findall(value)]
+    raise ValueError(f"expected a list of quoted strings, got {str(value)[:40]!r}")
+
+
+def split_unquoted_list(text):
+    """Items of a list cell without quotes, such as '[python, sql]', split on commas"""
+    items = (item.strip().strip('\'"').strip() for item in text.strip().strip('[]').split(','))
+    return [item for item in items if item]
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def parse_list_column(values):
+    """Parse a column of list cells.
+
+    Returns the parsed lists (None where invalid), a boolean mask of valid
+    cells and a boolean mask of cells split with split_unquoted_list. Empty
+    or missing cells are empty lists. Catalogs repeat the same list cells a
+    lot, so each distinct cell text is parsed once and rows with the same
+    text share the parsed list.
+    """
+    import pandas as pd
+
+    values = values.reset_index(drop=True)
+    is_text = np.fromiter((isinstance(value, str) for value in values.tolist()), dtype=bool, count=len(values))
+    parsed = [None] * len(values)
+    valid = np.zeros(len(values), dtype=bool)
+    unquoted = np.zeros(len(values), dtype=bool)
+
+    if is_text.any():
+        codes, texts = pd.factorize(values[is_text])
+        unique_lists = []
+        unique_unquoted = np.zeros(len(texts), dtype=bool)
+        for code, text in enumerate(texts):
+            if not text.strip():
+                unique_lists.append([])
+                continue
+            try:
+                unique_lists.append(parse_skill_list(text))
+            except ValueError:
+                unique_lists.append(split_unquoted_list(text))
+                unique_unquoted[code] = True
+        positions = np.flatnonzero(is_text)
+        for position, code in zip(positions.tolist(), codes.tolist()):
+            parsed[position] = unique_lists[code]
+        valid[positions] = True
+        unquoted[positions] = unique_unquoted[codes]
+
+    # Real lists (JSON Lines, Parquet, add_courses) are checked item by item
+    for position in np.flatnonzero(~is_text).tolist():
+        if _is_missing(values[position]):
+            parsed[position] = []
+            valid[position] = True
+            continue
+        try:
+            parsed[position] = parse_skill_list(values[position])
+            valid[position] = True
+        except ValueError:
+            pass
+
+    return parsed, valid, unquoted
+
+
+def normalize_courses(courses_df, first_row=1):
+    """Validate and normalize a frame of courses.
+
+    Returns the valid courses, with parsed list columns and a fresh index,
+    a list of (row number, column, reason) for every problem found, and one
+    for every warning about a loaded row. Rows are numbered from first_row.
+    Raises ValueError if a required column is missing altogether.
+    """
+    import pandas as pd
+
+    missing = [column for column in COURSE_COLUMNS if column not in courses_df.columns]
+    if missing:
+        raise ValueError(f"Courses are missing required fields: {', '.join(missing)}")
+
+    courses_df = courses_df.reset_index(drop=True)
+    valid = np.ones(len(courses_df), dtype=bool)
+    bad_rows = []
+    warned = []
+
+    def reject(mask, column, reason):
+        for position in np.flatnonzero(mask):
+            bad_rows.append((first_row + int(position), column, reason))
+        valid[mask] = False
+
+    for column in TEXT_FIELDS:
+        # Stored as validated, so encoding and filter indexes see the same
+        # value: stripped, and lowercased for level
+        values = [value.strip() if isinstance(value, str) else value for value in courses_df[column].tolist()]
+        if column == 'level':
+            values = [value.lower() if isinstance(value, str) else value for value in values]
+        courses_df[column] = pd.Series(values, index=courses_df.index, dtype=object)
+
+        present = np.fromiter((isinstance(value, str) and bool(value) for value in values),
+                              dtype=bool, count=len(values))
+        reject(~present, column, "expected a non-empty string")
+
+        if column == 'level':
+            known = np.fromiter((isinstance(value, str) and value in LEVEL_MAPPING
+                                 for value in values), dtype=bool, count=len(values))
+            reject(present & ~known, column, f"unknown level, expected one of {', '.join(LEVEL_MAPPING)}")
+
+    for column in LIST_FIELDS:
+        parsed, parsed_ok, unquoted = parse_list_column(courses_df[column])
+        reject(~parsed_ok, column, "expected a list of strings")
+        warned.extend((int(position), column) for position in np.flatnonzero(unquoted))
+        courses_df[column] = pd.Series(parsed, index=courses_df.index, dtype=object)
+
+    bad_rows.sort()
+    warnings = sorted((first_row + position, column, UNQUOTED_LIST_WARNING)
+                      for position, column in warned if valid[position])
+    return courses_df[valid].reset_index(drop=True), bad_rows, warnings
+
+
+def catalog_format(path):
+    """'csv', 'jsonl' or 'parquet', from the file extension"""
+    file_format = CATALOG_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format is None:
+        raise ValueError(f"Unsupported catalog format: {path} (expected {', '.join(CATALOG_FORMATS)})")
+    return file_format
+
+
+def iter_catalog_chunks(path, chunk_size=50000):
+    """Yield (first row number, raw DataFrame) chunks of a catalog file"""
+    import pandas as pd
+
+    file_format = catalog_format(path)
+    first_row = 1
+
+    if file_format == 'csv':
+        # Every cell is read as text: nothing is type-inferred or turned into NaN
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            yield first_row, chunk
+            first_row += len(chunk)
+
+    elif file_format == 'jsonl':
+        records = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                # Unparseable lines become empty rows, reported as missing fields
+                records.append(record if isinstance(record, dict) else {})
+                if len(records) >= chunk_size:
+                    yield first_row, pd.DataFrame.from_records(records, columns=COURSE_COLUMNS)
+                    first_row += len(records)
+                    records = []
+        if records or first_row == 1:
+            yield first_row, pd.DataFrame.from_records(records, columns=COURSE_COLUMNS)
+
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet catalogs requires the pyarrow package") from e
+
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            yield first_row, chunk
+            first_row += len(chunk)
+
+
+def read_catalog(path, chunk_size=50000, strict=False):
+    """Read, validate and normalize a catalog file chunk by chunk.
+
+    Returns the valid courses (list columns parsed) and a CatalogLoadReport.
+    Invalid rows are skipped and logged; with strict=True the first chunk
+    containing one raises CatalogValidationError instead.
+    """
+    import pandas as pd
+
+    report = CatalogLoadReport(path, catalog_format(path))
+    chunks = []
+    for first_row, chunk in iter_catalog_chunks(path, chunk_size):
+        report.rows_read += len(chunk)
+        normalized, bad_rows, warnings = normalize_courses(chunk, first_row)
+        if bad_rows:
+            if strict:
+                raise CatalogValidationError(bad_rows)
+            report.add_bad_rows(bad_rows)
+        report.add_warnings(warnings)
+        chunks.append(normalized[COURSE_COLUMNS + [column for column in normalized.columns
+                                                   if column not in COURSE_COLUMNS]])
+
+    courses_df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    report.rows_loaded = len(courses_df)
+    if report.rows_rejected:
+        logger.warning("Skipped %d invalid rows of %s, first: %s", report.rows_rejected, path,
+                       report.bad_rows[:3])
+    if report.rows_with_warnings:
+        logger.warning("Loaded %d rows of %s with warnings, first: %s", report.rows_with_warnings, path,
+                       report.warnings[:3])
+    return courses_df, report
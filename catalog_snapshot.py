@@ -0,0 +1,579 @@
+# catalog_snapshot.py
+"""Immutable catalog snapshots for AlternativeMatchingEngine.
+
+A snapshot bundles everything derived from one version of the catalog file:
+the DataFrame, the fitted vectorizer and TF-IDF matrix, the scoring
+encodings and the lookup indexes. Snapshots are built off to the side and
+never modified afterwards, so the engine can swap in a new one while
+in-flight requests keep using the one they started with.
+
+Snapshots restored from an artifact hold the fitted model as arrays and
+score profiles with ``tfidf_transform``. Their DataFrame and scikit-learn
+vectorizer are only rebuilt when something asks for them (incremental
+updates, the legacy loop scorer), so serving from an artifact never imports
+pandas or scikit-learn.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from skill_index import SkillVocabulary
+from candidate_index import CandidateIndex
+from catalog_loader import (COURSE_COLUMNS, LEVEL_MAPPING, CatalogValidationError,
+                            normalize_courses, read_catalog)
+from course_store import CourseStore
+from rationale import RationaleTemplates
+from catalog_artifact import (default_artifact_path, file_sha256, read_artifact,
+                              vectorizer_signature, write_artifact)
+from incremental_tfidf import TermStatistics, stack_rows, stacked_order
+from learning_path import DEFAULT_COURSE_WEEKS, DependencyGraph, parse_duration_weeks
+from tfidf_transform import TfidfTransform, cosine_similarities, l2_normalize_rows
+
+# Catalog columns with a value -> course positions index for filtering
+FILTER_COLUMNS = ['domain', 'level', 'cost', 'provider']
+
+# Below this share of the catalog, similarities for a subset of courses are
+# computed on its own rows; above it, scoring every course and picking the
+# subset is cheaper than slicing and transposing the rows
+SUBSET_SIMILARITY_SHARE = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """One loaded catalog with its TF-IDF model and precomputed indexes"""
+
+    def __init__(self, courses_df, vectorizer, tfidf_matrix, feature_names, catalog_version):
+        # None for snapshots restored from an artifact until first used
+        self._courses_df = courses_df
+        self._vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.feature_names = feature_names
+        # sha256 of the catalog file, used to namespace cached results
+        self.catalog_version = catalog_version
+
+        # Column encodings used by the vectorized scoring path
+        self.level_codes = None
+        self.domain_codes = None
+        self.domain_values = None
+        self.skill_vocab = None
+        self.prereq_matrix = None
+        self.prereq_counts = None
+        self.prereq_free = None
+        self.column_indexes = None
+
+        # Filled in by the engine when the snapshot is built and swapped in
+        self.version = 0
+        self.source_path = None
+        self.build_seconds = None
+        self.loaded_at = None
+        # Set on snapshots derived by update_snapshot
+        self.vocabulary_drift = None
+        self.refitted = None
+        # CatalogLoadReport of the file read, when built from the catalog file
+        self.load_report = None
+
+        # Term counts behind the TF-IDF matrix, computed on the first
+        # incremental update
+        self._term_statistics = None
+        # Postings for pruned scoring, built on the first pruned request
+        self._candidate_index = None
+        # Columnar course fields behind recommendation views
+        self._course_store = None
+        # Prerequisite graph and per-skill costs for learning-path planning
+        self._dependency_graph = None
+        # Per-course rationale suffixes and skill lookups
+        self._rationale_templates = None
+        # Weeks of study per course, and lowercased title -> title codes,
+        # for request constraints
+        self._course_weeks = None
+        self._title_codes = None
+        # Profile text transform, and TF-IDF rows normalized the way
+        # cosine_similarity does it (plus their transpose)
+        self._profile_vectorizer = None
+        self._normalized_tfidf = None
+        # Artifact a snapshot was restored from, and the vectorizer settings
+        # to rebuild its vectorizer with
+        self._artifact = None
+        self._vectorizer_params = None
+
+    def __len__(self):
+        return self.tfidf_matrix.shape[0]
+
+    @property
+    def courses_df(self):
+        """Catalog DataFrame; decoded from the artifact on first use for restored snapshots"""
+        if self._courses_df is None:
+            self._courses_df = _frame_from_artifact(self._artifact)
+        return self._courses_df
+
+    @property
+    def vectorizer(self):
+        """Fitted TfidfVectorizer; rebuilt from the artifact's vocabulary and idf on first use for restored snapshots"""
+        if self._vectorizer is None:
+            vectorizer = make_vectorizer(self._vectorizer_params)
+            vectorizer.vocabulary_ = {term: idx for idx, term in enumerate(self.feature_names)}
+            vectorizer.idf_ = np.asarray(self._artifact['tfidf_idf'])
+            self._vectorizer = vectorizer
+        return self._vectorizer
+
+    def info(self):
+        """Summary used by the admin endpoints"""
+        return {
+            'version': self.version,
+            'catalog_version': self.catalog_version,
+            'source_path': self.source_path,
+            'courses': len(self),
+            'build_seconds': self.build_seconds,
+            'loaded_at': self.loaded_at,
+            'vocabulary_drift': self.vocabulary_drift,
+            'refitted': self.refitted,
+            'load_report': self.load_report.summary() if self.load_report is not None else None,
+        }
+
+    def term_statistics(self):
+        """Term counts and frequencies of the catalog text, for incremental updates"""
+        if self._term_statistics is None:
+            self._term_statistics = TermStatistics.from_corpus(self.vectorizer, self.courses_df['combined_text'])
+        return self._term_statistics
+
+    def candidate_index(self):
+        """Inverted indexes used by pruned scoring"""
+        if self._candidate_index is None:
+            self._candidate_index = CandidateIndex(self)
+        return self._candidate_index
+
+    def course_store(self):
+        """Columnar course fields that recommendations are read from"""
+        if self._course_store is None:
+            self._course_store = CourseStore.from_frame(self.courses_df)
+        return self._course_store
+
+    def dependency_graph(self):
+        """Course dependency graph used by the learning-path planner"""
+        if self._dependency_graph is None:
+            self._dependency_graph = DependencyGraph(self)
+        return self._dependency_graph
+
+    def rationale_templates(self):
+        """Precompiled rationale templates of the catalog's courses"""
+        if self._rationale_templates is None:
+            self._rationale_templates = RationaleTemplates(self)
+        return self._rationale_templates
+
+    def course_weeks(self):
+        """Weeks of study per course, parsed once per distinct duration string"""
+        if self._course_weeks is None:
+            store = self.course_store()
+            durations = store.categories['duration']
+            unique_weeks = np.array([parse_duration_weeks(durations[idx]) for idx in range(len(durations))]
+                                    + [DEFAULT_COURSE_WEEKS])
+            self._course_weeks = unique_weeks[np.asarray(store.codes['duration'])]
+        return self._course_weeks
+
+    def title_mask(self, titles):
+        """Boolean mask of the courses whose title is one of titles (case-insensitive)"""
+        store = self.course_store()
+        if self._title_codes is None:
+            title_codes = {}
+            categories = store.categories['title']
+            for code in range(len(categories)):
+                title_codes.setdefault(categories[code].strip().lower(), []).append(code)
+            self._title_codes = title_codes
+        codes = [code for title in titles for code in self._title_codes.get(title.strip().lower(), ())]
+        return np.isin(store.codes['title'], codes)
+
+    def profile_vectorizer(self):
+        """Transform for profile text: a TfidfTransform, or the vectorizer when its settings aren't supported"""
+        if self._profile_vectorizer is None:
+            if self._vectorizer is None:
+                signature, idf = self._artifact.manifest['vectorizer_params'], self._artifact['tfidf_idf']
+            else:
+                signature, idf = vectorizer_signature(self._vectorizer), self._vectorizer.idf_
+            self._profile_vectorizer = (TfidfTransform.from_fitted(signature, self.feature_names, idf)
+                                        or self.vectorizer)
+        return self._profile_vectorizer
+
+    def normalized_tfidf(self):
+        """TF-IDF rows renormalized as cosine_similarity does, and their transpose as terms x courses CSR"""
+        if self._normalized_tfidf is None:
+            rows = l2_normalize_rows(self.tfidf_matrix)
+            self._normalized_tfidf = (rows, rows.T.tocsr())
+        return self._normalized_tfidf
+
+    def cosine_similarities(self, profile_matrix, positions=None):
+        """Profiles x courses cosine similarity against every course, or the courses at positions"""
+        rows, columns = self.normalized_tfidf()
+        if positions is None:
+            return cosine_similarities(profile_matrix, columns)
+        if len(positions) > SUBSET_SIMILARITY_SHARE * len(self):
+            return cosine_similarities(profile_matrix, columns)[:, positions]
+        return cosine_similarities(profile_matrix, rows[positions].T)
+
+    def encode_columns(self, previous=None, source_rows=None):
+        """Precompute array encodings of the catalog for vectorized scoring.
+
+        With a previous snapshot and source_rows (see update_snapshot), the
+        skill vocabulary and prerequisite matrix rows of carried-over courses
+        are reused and only new courses are indexed.
+        """
+        import pandas as pd
+
+        df = self.courses_df
+
+        self.level_codes = np.array(
+            [LEVEL_MAPPING.get(level.lower(), 0) for level in df['level']], dtype=np.int8
+        )
+
+        domain_codes, domain_values = pd.factorize(df['domain'])
+        self.domain_codes = domain_codes
+        self.domain_values = [str(domain).lower() for domain in domain_values]
+
+        # Canonical skill vocabulary over prerequisites and skill tags. The
+        # previous snapshot's vocabulary is copied, never extended in place,
+        # because requests pinned to it may still be running.
+        if previous is None:
+            self.skill_vocab = SkillVocabulary()
+            fresh = df
+        else:
+            self.skill_vocab = SkillVocabulary(previous.skill_vocab.skills)
+            fresh = df.iloc[np.flatnonzero(np.asarray(source_rows) < 0)]
+        for skill_tags in fresh['skill_tags']:
+            for tag in skill_tags:
+                self.skill_vocab.add(tag.lower())
+
+        # Sparse course x skill prerequisite count matrix; duplicate
+        # prerequisites within a course are summed, matching the per-item loop count
+        rows, cols = [], []
+        for row_idx, prereqs in enumerate(fresh['prerequisites']):
+            for prereq in prereqs:
+                rows.append(row_idx)
+                cols.append(self.skill_vocab.add(prereq.lower().strip()))
+        prereq_matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(len(fresh), len(self.skill_vocab))
+        )
+        if previous is None:
+            self.prereq_matrix = prereq_matrix
+        else:
+            self.prereq_matrix = stack_rows(previous.prereq_matrix, source_rows, prereq_matrix)
+        self.prereq_counts = np.array([len(prereqs) for prereqs in df['prerequisites']], dtype=np.float64)
+        self.prereq_free = np.array(
+            [not prereqs or prereqs == ['none'] for prereqs in df['prerequisites']], dtype=bool
+        )
+
+        self.column_indexes = {
+            column: index_from_codes(*pd.factorize(df[column])) for column in FILTER_COLUMNS
+        }
+
+    def filter_courses(self, **filters):
+        """Sorted positions of courses matching every filter, or None when unfiltered.
+
+        Each filter maps a FILTER_COLUMNS name to a list of accepted values
+        (case-insensitive); empty filters are ignored.
+        """
+        positions = None
+        for column, values in filters.items():
+            if not values:
+                continue
+            index = self.column_indexes[column]
+            matches = [index[value.lower()] for value in values if value.lower() in index]
+            matched = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.intp)
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        return positions
+
+    def column_mask(self, column, values):
+        """Boolean mask of the courses whose FILTER_COLUMNS column is one of values (case-insensitive)"""
+        index = self.column_indexes[column]
+        mask = np.zeros(len(self), dtype=bool)
+        for value in values:
+            mask[index.get(value.lower(), [])] = True
+        return mask
+
+    def page_courses(self, after=-1, limit=100, **filters):
+        """Return (positions, total, next_cursor) for a cursor-paginated catalog listing"""
+        # Negative positions would wrap around to the end of the catalog
+        after = max(after, -1)
+        positions = self.filter_courses(**filters)
+
+        if positions is None:
+            total = len(self)
+            page = np.arange(after + 1, min(after + 1 + limit, total))
+            has_more = after + 1 + limit < total
+        else:
+            total = len(positions)
+            start = np.searchsorted(positions, after, side='right')
+            page = positions[start:start + limit]
+            has_more = start + limit < total
+
+        next_cursor = int(page[-1]) if has_more and len(page) else None
+        return page, total, next_cursor
+
+    def course_records(self, positions):
+        """Catalog rows at the given positions as plain dicts"""
+        if self._courses_df is None:
+            store = self.course_store()
+            columns = self._artifact.manifest['columns']
+            return [{column: store.value(column, position) for column in columns}
+                    for position in np.asarray(positions).tolist()]
+        columns = [column for column in self.courses_df.columns if column != 'combined_text']
+        return self.courses_df.iloc[positions][columns].to_dict('records')
+
+
+def index_from_codes(codes, categories):
+    """Map each lowercased category to the sorted positions of courses having it"""
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+
+    index = {}
+    for code, category in enumerate(categories):
+        positions = order[bounds[code]:bounds[code + 1]]
+        key = str(category).lower()
+        if key in index:
+            positions = np.union1d(index[key], positions)
+        index[key] = positions
+    return index
+
+
+def make_vectorizer(params):
+    """Unfitted TfidfVectorizer with the given settings"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(**params)
+
+
+def build_snapshot(csv_path, vectorizer_params, artifact_path=None, use_artifact=True):
+    """Build a snapshot from a catalog file, or from its artifact when it is up to date.
+
+    vectorizer_params are the TfidfVectorizer settings; an artifact is used
+    when it was fitted with the same ones.
+    """
+    started = time.perf_counter()
+    source_hash = file_sha256(csv_path)
+
+    snapshot = None
+    if use_artifact:
+        artifact_path = artifact_path or default_artifact_path(csv_path)
+        artifact = read_artifact(artifact_path, source_hash, vectorizer_params)
+        if artifact is not None:
+            snapshot = _snapshot_from_artifact(artifact, vectorizer_params, source_hash)
+
+    if snapshot is None:
+        snapshot = _snapshot_from_file(csv_path, make_vectorizer(vectorizer_params), source_hash)
+        if use_artifact:
+            try:
+                write_artifact(snapshot, artifact_path, source_hash)
+            except OSError:
+                # Read-only deployments keep working from the catalog file
+                pass
+
+    snapshot.source_path = csv_path
+    snapshot.build_seconds = time.perf_counter() - started
+    return snapshot
+
+
+def prepare_courses(courses_df):
+    """Validate and parse courses added at runtime and add their combined text.
+
+    Unlike a catalog file, where bad rows are skipped, any invalid course
+    raises CatalogValidationError.
+    """
+    courses_df, bad_rows, warnings = normalize_courses(courses_df)
+    if bad_rows:
+        raise CatalogValidationError(bad_rows)
+    if warnings:
+        logger.warning("Added courses with warnings: %s", warnings[:3])
+    return add_combined_text(courses_df)
+
+
+def add_combined_text(courses_df):
+    """Add the combined text TF-IDF is fitted on to normalized courses"""
+    import pandas as pd
+
+    courses_df['combined_text'] = pd.Series([
+        f"{title} {provider} {' '.join(skill_tags)} {domain}"
+        for title, provider, skill_tags, domain in zip(
+            courses_df['title'], courses_df['provider'], courses_df['skill_tags'], courses_df['domain'])
+    ], index=courses_df.index, dtype=object)
+    return courses_df
+
+
+def update_snapshot(snapshot, source_rows, fresh_df, vectorizer, drift_threshold=0.05):
+    """Derive a new snapshot from an existing one without refitting TF-IDF.
+
+    Row i of the new catalog is row source_rows[i] of snapshot, or, where
+    source_rows[i] is -1, the next course of fresh_df. Document frequencies,
+    idf and the TF-IDF matrix are updated from the changed courses with the
+    vocabulary held fixed, which matches a full refit exactly as long as the
+    refit would pick the same vocabulary. When the share of vocabulary a
+    refit would replace exceeds drift_threshold, the new catalog is refitted
+    from scratch instead. vectorizer must be a fresh, unfitted clone.
+    """
+    import pandas as pd
+    from sklearn.base import clone
+
+    started = time.perf_counter()
+    source_rows = np.asarray(source_rows, dtype=np.intp)
+    reused = source_rows >= 0
+
+    old_df = snapshot.courses_df
+    fresh_df = prepare_courses(fresh_df.reset_index(drop=True))
+    stacked = pd.concat([old_df.iloc[source_rows[reused]], fresh_df[list(old_df.columns)]], ignore_index=True)
+    courses_df = stacked.iloc[stacked_order(source_rows)].reset_index(drop=True)
+
+    dropped = np.ones(len(old_df), dtype=bool)
+    dropped[source_rows[reused]] = False
+
+    catalog_version = hashlib.sha256(
+        (snapshot.catalog_version + source_rows.tobytes().hex()
+         + fresh_df[COURSE_COLUMNS].to_json(orient='records')).encode('utf-8')
+    ).hexdigest()
+
+    vectorizer.vocabulary_ = snapshot.vectorizer.vocabulary_
+    stats = snapshot.term_statistics().updated(
+        source_rows, fresh_df['combined_text'], old_df['combined_text'][dropped], vectorizer
+    )
+    drift = stats.vocabulary_drift()
+
+    if drift > drift_threshold:
+        new_snapshot = _snapshot_from_frame(courses_df, clone(vectorizer), catalog_version)
+        new_snapshot.refitted = True
+    else:
+        idf = stats.idf()
+        vectorizer.idf_ = idf
+        new_snapshot = CatalogSnapshot(courses_df, vectorizer, stats.tfidf_matrix(idf),
+                                       snapshot.feature_names, catalog_version)
+        new_snapshot._term_statistics = stats
+        new_snapshot.encode_columns(previous=snapshot, source_rows=source_rows)
+        new_snapshot.refitted = False
+
+    new_snapshot.vocabulary_drift = drift
+    new_snapshot.source_path = snapshot.source_path
+    new_snapshot.build_seconds = time.perf_counter() - started
+    return new_snapshot
+
+
+def _snapshot_from_file(path, vectorizer, source_hash):
+    """Read and validate the catalog file and fit the TF-IDF model"""
+    courses_df, report = read_catalog(path)
+    snapshot = _snapshot_from_frame(add_combined_text(courses_df), vectorizer, source_hash)
+    snapshot.load_report = report
+    return snapshot
+
+
+def _snapshot_from_frame(courses_df, vectorizer, source_hash):
+    """Fit the TF-IDF model and indexes on a prepared catalog DataFrame"""
+    # Create TF-IDF matrix
+    tfidf_matrix = vectorizer.fit_transform(courses_df['combined_text'])
+    snapshot = CatalogSnapshot(courses_df, vectorizer, tfidf_matrix,
+                               vectorizer.get_feature_names_out(), source_hash)
+    snapshot.encode_columns()
+    return snapshot
+
+
+def _frame_from_artifact(artifact):
+    """Decode an artifact's catalog columns into a DataFrame with combined text"""
+    import pandas as pd
+
+    manifest = artifact.manifest
+    columns = {}
+    for column in manifest['columns']:
+        if column in ('prerequisites', 'skill_tags'):
+            columns[column] = artifact.list_column(column)
+        else:
+            columns[column] = artifact.string_column(column)
+    courses_df = pd.DataFrame(columns, columns=manifest['columns'])
+    courses_df['combined_text'] = [
+        f"{title} {provider} {' '.join(skill_tags)} {domain}"
+        for title, provider, skill_tags, domain in zip(
+            columns['title'], columns['provider'], columns['skill_tags'], columns['domain'])
+    ]
+    return courses_df
+
+
+def _snapshot_from_artifact(artifact, vectorizer_params, source_hash):
+    """Restore catalog, TF-IDF and index state from a prebuilt artifact"""
+    manifest = artifact.manifest
+
+    # Memory-mapped TF-IDF matrix; the DataFrame and vectorizer are rebuilt
+    # from the artifact only if needed
+    tfidf_matrix = sparse.csr_matrix(
+        (artifact['tfidf_data'], artifact['tfidf_indices'], artifact['tfidf_indptr']),
+        shape=tuple(manifest['tfidf_shape'])
+    )
+    snapshot = CatalogSnapshot(None, None, tfidf_matrix,
+                               np.array(artifact.strings('tfidf_terms'), dtype=object), source_hash)
+    snapshot._artifact = artifact
+    snapshot._vectorizer_params = vectorizer_params
+
+    snapshot._course_store = CourseStore.from_artifact(artifact)
+    snapshot.level_codes = artifact['level_codes']
+    snapshot.domain_codes = artifact['domain.codes']
+    snapshot.domain_values = [domain.lower() for domain in artifact.strings('domain.categories')]
+
+    snapshot.skill_vocab = SkillVocabulary(artifact.strings('skill_vocab'))
+    snapshot.prereq_matrix = sparse.csr_matrix(
+        (artifact['prereq_data'], artifact['prereq_indices'], artifact['prereq_indptr']),
+        shape=tuple(manifest['prereq_shape'])
+    )
+    snapshot.prereq_counts = artifact['prereq_counts']
+    snapshot.prereq_free = artifact['prereq_free']
+
+    snapshot.column_indexes = {
+        column: index_from_codes(np.asarray(artifact[column + '.codes']),
+                                 artifact.strings(column + '.categories'))
+        for column in FILTER_COLUMNS
+    }
+    return snapshot
+
+
+class CatalogWatcher:
+    """Background thread calling check() every interval seconds.
+
+    check is normally AlternativeMatchingEngine.reload_if_changed, which only
+    rebuilds the snapshot when the catalog file actually changed.
+
+    Configured through environment variables:
+
+    - ``RECOMMENDER_WATCH_CATALOG``: ``1`` to enable the watcher (default off)
+    - ``RECOMMENDER_WATCH_INTERVAL``: seconds between checks (default 5)
+    """
+
+    def __init__(self, check, interval=5.0):
+        self.check = check
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, check):
+        """Build a watcher from the RECOMMENDER_WATCH_* environment variables, or None when disabled"""
+        if os.environ.get('RECOMMENDER_WATCH_CATALOG', '').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(check, interval=float(os.environ.get('RECOMMENDER_WATCH_INTERVAL', 5)))
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='catalog-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # A broken catalog file must not stop the watcher; the current
+                # snapshot keeps serving until a good file appears
+                logger.exception("Catalog reload failed")
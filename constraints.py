@@ -0,0 +1,69 @@
+# constraints.py
+"""Hard course constraints, pushed down in front of scoring.
+
+A profile may carry ``constraints``: a longest acceptable duration, accepted
+costs, levels and providers, and titles to leave out (courses the learner
+already finished). They are compiled into one boolean mask over the
+catalog from columns the snapshot already holds:
+
+- course durations parsed once per snapshot into weeks
+  (``CatalogSnapshot.course_weeks``)
+- the per-category position indexes behind ``filter_courses``
+- title codes of the course store
+
+Only the surviving courses get TF-IDF similarity, level, prerequisite and
+domain scoring, so a tighter constraint makes a request cheaper.
+"""
+import numpy as np
+
+# Constraint fields, as in the API's RecommendationConstraints
+CONSTRAINT_FIELDS = ('max_duration_weeks', 'costs', 'levels', 'providers', 'exclude_titles')
+CONSTRAINT_LIST_FIELDS = ('costs', 'levels', 'providers', 'exclude_titles')
+
+# List constraints -> the catalog column their values are matched against
+COLUMN_CONSTRAINTS = {'costs': 'cost', 'levels': 'level', 'providers': 'provider'}
+
+
+class CourseConstraints:
+    """Hard filters on the courses a request may recommend"""
+
+    def __init__(self, max_duration_weeks=None, costs=None, levels=None, providers=None, exclude_titles=None):
+        self.max_duration_weeks = max_duration_weeks
+        self.costs = list(costs or [])
+        self.levels = list(levels or [])
+        self.providers = list(providers or [])
+        self.exclude_titles = list(exclude_titles or [])
+
+    @classmethod
+    def from_profile(cls, user_profile):
+        """Constraints of a profile dict, or None when it has none"""
+        spec = user_profile.get('constraints')
+        if not spec:
+            return None
+        constraints = cls(**{field: spec.get(field) for field in CONSTRAINT_FIELDS})
+        return constraints if constraints.active else None
+
+    @property
+    def active(self):
+        return self.max_duration_weeks is not None or any(
+            getattr(self, field) for field in CONSTRAINT_LIST_FIELDS
+        )
+
+    def mask(self, catalog):
+        """Boolean mask over the catalog of the courses meeting every constraint"""
+        mask = np.ones(len(catalog), dtype=bool)
+        if self.max_duration_weeks is not None:
+            mask &= catalog.course_weeks() <= self.max_duration_weeks
+
+        for field, column in COLUMN_CONSTRAINTS.items():
+            values = getattr(self, field)
+            if values:
+                mask &= catalog.column_mask(column, values)
+
+        if self.exclude_titles:
+            mask &= ~catalog.title_mask(self.exclude_titles)
+        return mask
+
+    def positions(self, catalog):
+        """Sorted catalog positions of the courses meeting every constraint"""
+        return np.flatnonzero(self.mask(catalog))
@@ -1,5 +1,7 @@
 import pandas as pd
+import numpy as np
 import json
+import random
 
 
 def generate_course_catalog():
@@ -160,5 +162,143 @@ def generate_course_catalog():
     return courses
 
 
+# Skills of each synthetic domain, from foundational to advanced. Courses
+# teach skills around their level and require earlier ones as prerequisites.
+SYNTHETIC_SKILLS = {
+    "software development": ["basic programming", "python", "java", "git", "OOP", "data structures",
+                             "algorithms", "testing", "design patterns", "system design", "concurrency"],
+    "web development": ["html", "css", "javascript", "web development", "typescript", "react", "node.js",
+                        "rest apis", "graphql", "web performance", "microfrontends"],
+    "data science": ["statistics", "python", "sql", "pandas", "numpy", "data analysis", "data visualization",
+                     "feature engineering", "time series", "bayesian statistics", "causal inference"],
+    "artificial intelligence": ["python", "linear algebra", "calculus", "machine learning", "scikit-learn",
+                                "deep learning", "neural networks", "tensorflow", "pytorch", "computer vision",
+                                "nlp", "reinforcement learning"],
+    "cloud computing": ["linux", "basic networking", "cloud computing", "aws", "azure", "gcp", "serverless",
+                        "cloud architecture", "cloud security", "multi-cloud"],
+    "devops": ["linux", "git", "bash", "ci/cd", "docker", "containers", "kubernetes", "terraform",
+               "monitoring", "site reliability", "service mesh"],
+    "cybersecurity": ["basic networking", "linux", "security fundamentals", "cryptography", "network security",
+                      "penetration testing", "incident response", "threat modeling", "malware analysis"],
+    "mobile development": ["javascript", "java", "swift", "kotlin", "mobile", "android", "ios", "react native",
+                           "flutter", "mobile performance"],
+    "business": ["project experience", "communication", "project management", "agile", "product management",
+                 "leadership", "business strategy", "finance", "negotiation"],
+    "soft skills": ["communication", "teamwork", "presentation", "time management", "critical thinking",
+                    "leadership", "conflict resolution", "mentoring"],
+}
+# Relative catalog share of each domain (technical domains dominate)
+SYNTHETIC_DOMAIN_WEIGHTS = [18, 16, 16, 14, 9, 8, 6, 5, 5, 3]
+SYNTHETIC_PROVIDERS = {
+    "Coursera": "coursera.org", "edX": "edx.org", "Udemy": "udemy.com", "Udacity": "udacity.com",
+    "LinkedIn Learning": "linkedin.com/learning", "Pluralsight": "pluralsight.com",
+    "FreeCodeCamp": "freecodecamp.org", "AWS Training": "aws.amazon.com/training", "PMI": "pmi.org",
+}
+SYNTHETIC_PROVIDER_WEIGHTS = [25, 18, 22, 8, 10, 8, 4, 3, 2]
+SYNTHETIC_LEVELS = ["beginner", "intermediate", "advanced"]
+SYNTHETIC_LEVEL_WEIGHTS = [45, 35, 20]
+# Title patterns per level
+SYNTHETIC_TITLE_FORMATS = [["{skill} for Beginners", "Introduction to {skill}"],
+                           ["{skill} in Practice", "Applied {skill}"],
+                           ["Mastering {skill}", "Advanced {skill}"]]
+
+
+def generate_synthetic_catalog(n_courses, seed=0, csv_path=None):
+    """Generate a seeded catalog of n_courses in the courses.csv format.
+
+    Domains, providers and levels follow skewed distributions, skill tags
+    cluster around each course's level within its domain (plus occasional
+    cross-domain skills), and prerequisites are drawn from the domain's
+    earlier skills, with most beginner courses having none.
+    """
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+
+    domains = list(SYNTHETIC_SKILLS)
+    providers = list(SYNTHETIC_PROVIDERS)
+    all_skills = sorted(set(skill for skills in SYNTHETIC_SKILLS.values() for skill in skills))
+
+    def weights(values):
+        values = np.asarray(values, dtype=np.float64)
+        return values / values.sum()
+
+    domain_ids = rng.choice(len(domains), size=n_courses, p=weights(SYNTHETIC_DOMAIN_WEIGHTS))
+    level_ids = rng.choice(len(SYNTHETIC_LEVELS), size=n_courses, p=weights(SYNTHETIC_LEVEL_WEIGHTS))
+    provider_ids = rng.choice(len(providers), size=n_courses, p=weights(SYNTHETIC_PROVIDER_WEIGHTS))
+    tag_counts = rng.integers(2, 6, size=n_courses)
+    weeks = np.clip(rng.normal(4 + 4 * level_ids, 2), 1, 24).astype(int)
+    free = rng.random(n_courses) < 0.35
+
+    rows = []
+    for idx in range(n_courses):
+        domain = domains[domain_ids[idx]]
+        level = level_ids[idx]
+        skills = SYNTHETIC_SKILLS[domain]
+
+        # Skills around this level's third of the domain's progression
+        third = len(skills) / 3
+        start = int(level * third)
+        window = skills[max(0, start - 1):int(start + 2 * third)]
+        tags = pick.sample(window, min(int(tag_counts[idx]), len(window)))
+        if pick.random() < 0.15:
+            tags.append(pick.choice(all_skills))
+        tags = list(dict.fromkeys(tags))
+
+        earlier = skills[:max(1, start)]
+        if level == 0 and pick.random() < 0.8:
+            prerequisites = ["none"]
+        else:
+            prerequisites = pick.sample(earlier, min(len(earlier), pick.randint(1, level + 1)))
+
+        provider = providers[provider_ids[idx]]
+        skill_name = ' '.join(word[:1].upper() + word[1:] for word in tags[0].split())
+        title = pick.choice(SYNTHETIC_TITLE_FORMATS[level]).format(skill=skill_name)
+        rows.append({
+            "title": f"{title} ({idx + 1})",
+            "provider": provider,
+            "duration": f"{weeks[idx]} weeks",
+            "prerequisites": str(prerequisites),
+            "skill_tags": str(tags),
+            "level": SYNTHETIC_LEVELS[level],
+            "link": f"https://{SYNTHETIC_PROVIDERS[provider]}/course/{idx + 1}",
+            "domain": domain,
+            "cost": "free" if free[idx] else "paid",
+        })
+
+    df = pd.DataFrame(rows, columns=["title", "provider", "duration", "prerequisites", "skill_tags",
+                                     "level", "link", "domain", "cost"])
+    if csv_path:
+        df.to_csv(csv_path, index=False)
+    return df
+
+
+def generate_user_profiles(n_profiles, seed=0):
+    """Generate seeded user profiles matching the synthetic catalog's domains and skills"""
+    pick = random.Random(seed)
+    domains = list(SYNTHETIC_SKILLS)
+    soft_skills = SYNTHETIC_SKILLS["soft skills"]
+
+    profiles = []
+    for _ in range(n_profiles):
+        domain = pick.choices(domains, weights=SYNTHETIC_DOMAIN_WEIGHTS)[0]
+        level = pick.choices(SYNTHETIC_LEVELS, weights=SYNTHETIC_LEVEL_WEIGHTS)[0]
+        skills = SYNTHETIC_SKILLS[domain]
+        # Users know skills up to their level within the target domain
+        known = skills[:max(2, int(len(skills) * (SYNTHETIC_LEVELS.index(level) + 1) / 3))]
+        interests = pick.sample(domains, 2)
+
+        profiles.append({
+            "education": pick.choice(["High School", "Bachelor's", "Master's", "PhD"]),
+            "major": pick.choice(["Computer Science", "Statistics", "Business", "Engineering", "Mathematics"]),
+            "technical_skills": pick.sample(known, min(len(known), pick.randint(1, 5))),
+            "soft_skills": pick.sample(soft_skills, pick.randint(0, 3)),
+            "interests": interests,
+            "target_domain": domain,
+            "career_goals": pick.choice([None, f"Become a {domain} professional", f"Move into {domain}"]),
+            "level": level,
+        })
+    return profiles
+
+
 if __name__ == "__main__":
     generate_course_catalog()
\ No newline at end of file
@@ -0,0 +1,188 @@
+# course_store.py
+"""Columnar, read-only store of a catalog's course fields.
+
+String columns are kept as int32 codes into an interned string table (titles
+and links too, whose tables are simply as long as the catalog), and the
+prerequisite / skill tag lists as CSR-style ids + offsets into one shared
+table. It is the same layout ``catalog_artifact`` writes, so snapshots loaded
+from an artifact use its memory-mapped arrays directly.
+
+Recommendations are ``CourseView`` objects: a store reference, a position
+and the scores. Field values are only decoded when read, and views turn into
+plain dicts when pickled or passed through ``dict()`` at the API boundary.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+from catalog_artifact import LIST_COLUMNS, STRING_COLUMNS, pack_strings, unpack_strings
+
+# Keys of a recommendation, in the order recommend_courses has always returned them
+RECORD_FIELDS = ('title', 'provider', 'duration', 'level', 'fit_score', 'link', 'domain', 'cost',
+                 'prerequisites', 'skill_tags', 'similarity_score', 'level_score', 'prerequisite_score')
+SCORE_FIELDS = frozenset(('fit_score', 'similarity_score', 'level_score', 'prerequisite_score'))
+
+# String tables up to this size are decoded once; larger ones per access
+DECODED_TABLE_SIZE = 4096
+
+
+class StringTable:
+    """Packed utf-8 strings addressed by integer id"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+        self._raw = None
+        self._values = unpack_strings(data, offsets) if len(offsets) - 1 <= DECODED_TABLE_SIZE else None
+
+    @classmethod
+    def from_strings(cls, values):
+        return cls(*pack_strings(values))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def preload(self):
+        """Copy the packed bytes into memory now instead of on first access"""
+        if self._values is None and self._raw is None:
+            self._raw = np.asarray(self.data).tobytes()
+
+    def __getitem__(self, idx):
+        if self._values is not None:
+            return self._values[idx]
+        if self._raw is None:
+            self.preload()
+        return self._raw[self.offsets[idx]:self.offsets[idx + 1]].decode('utf-8')
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes
+
+
+class CourseStore:
+    """Course fields of one catalog snapshot as NumPy columns"""
+
+    def __init__(self, n_courses, codes, categories, list_ids, list_offsets, list_strings):
+        self.n_courses = n_courses
+        # column -> int32 codes (-1 for missing) and their StringTable
+        self.codes = codes
+        self.categories = categories
+        # list column -> ids into list_strings, and per-course offsets
+        self.list_ids = list_ids
+        self.list_offsets = list_offsets
+        self.list_strings = list_strings
+
+    @classmethod
+    def from_frame(cls, courses_df):
+        """Encode a prepared catalog DataFrame"""
+        n_courses = len(courses_df)
+        codes, categories = {}, {}
+        for column in STRING_COLUMNS:
+            table = {}
+            column_codes = np.empty(n_courses, dtype=np.int32)
+            for row_idx, value in enumerate(courses_df[column]):
+                column_codes[row_idx] = table.setdefault(value, len(table)) if isinstance(value, str) else -1
+            codes[column] = column_codes
+            categories[column] = StringTable.from_strings(list(table))
+
+        strings = {}
+        list_ids, list_offsets = {}, {}
+        for column in LIST_COLUMNS:
+            ids = []
+            offsets = np.zeros(n_courses + 1, dtype=np.int64)
+            for row_idx, items in enumerate(courses_df[column]):
+                ids.extend(strings.setdefault(item, len(strings)) for item in items)
+                offsets[row_idx + 1] = len(ids)
+            list_ids[column] = np.array(ids, dtype=np.int32)
+            list_offsets[column] = offsets
+
+        return cls(n_courses, codes, categories, list_ids, list_offsets, StringTable.from_strings(list(strings)))
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        """Use a catalog artifact's (memory-mapped) column arrays as they are"""
+        def table(name):
+            return StringTable(artifact[name + '.data'], artifact[name + '.offsets'])
+
+        return cls(
+            artifact.manifest['n_courses'],
+            {column: artifact[column + '.codes'] for column in STRING_COLUMNS},
+            {column: table(column + '.categories') for column in STRING_COLUMNS},
+            {column: artifact[column + '.ids'] for column in LIST_COLUMNS},
+            {column: artifact[column + '.offsets'] for column in LIST_COLUMNS},
+            table('list_strings'),
+        )
+
+    def __len__(self):
+        return self.n_courses
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays and string tables"""
+        return (sum(codes.nbytes for codes in self.codes.values())
+                + sum(table.nbytes for table in self.categories.values())
+                + sum(ids.nbytes for ids in self.list_ids.values())
+                + sum(offsets.nbytes for offsets in self.list_offsets.values())
+                + self.list_strings.nbytes)
+
+    def preload(self):
+        """Ready every string table for access, e.g. before forking workers that share it"""
+        for table in self.categories.values():
+            table.preload()
+        self.list_strings.preload()
+
+    def value(self, column, position):
+        """Field value of the course at position, decoded from the columns"""
+        codes = self.codes.get(column)
+        if codes is not None:
+            code = codes[position]
+            return self.categories[column][code] if code >= 0 else None
+
+        ids = self.list_ids.get(column)
+        if ids is None:
+            raise KeyError(column)
+        offsets = self.list_offsets[column]
+        strings = self.list_strings
+        return [strings[item] for item in ids[offsets[position]:offsets[position + 1]].tolist()]
+
+    def view(self, position, fit_score, similarity_score, level_score, prerequisite_score):
+        """Recommendation view of the course at position"""
+        return CourseView(self, int(position), int(fit_score), similarity_score,
+                          float(level_score), float(prerequisite_score))
+
+
+class CourseView(Mapping):
+    """Read-only recommendation: a store position plus its scores, decoded on access"""
+
+    __slots__ = ('store', 'position', 'fit_score', 'similarity_score', 'level_score', 'prerequisite_score')
+
+    def __init__(self, store, position, fit_score, similarity_score, level_score, prerequisite_score):
+        self.store = store
+        self.position = position
+        self.fit_score = fit_score
+        self.similarity_score = similarity_score
+        self.level_score = level_score
+        self.prerequisite_score = prerequisite_score
+
+    def __getitem__(self, key):
+        if key in SCORE_FIELDS:
+            return getattr(self, key)
+        if key not in RECORD_FIELDS:
+            raise KeyError(key)
+        return self.store.value(key, self.position)
+
+    def __iter__(self):
+        return iter(RECORD_FIELDS)
+
+    def __len__(self):
+        return len(RECORD_FIELDS)
+
+    def to_dict(self):
+        return {key: self[key] for key in RECORD_FIELDS}
+
+    def __reduce__(self):
+        # Pickles (e.g. in a shared result cache) as a plain dict, not the whole store
+        return dict, (self.to_dict(),)
+
+    def __repr__(self):
+        return f"CourseView({self.to_dict()!r})"
@@ -0,0 +1,89 @@
+# diversity.py
+"""Maximal marginal relevance (MMR) re-ranking of recommendations.
+
+Sorting purely by fit score tends to fill a top-k list with near-identical
+courses. MMR picks courses one at a time, each time taking the candidate
+with the best
+
+    lambda * relevance - (1 - lambda) * (max similarity to the courses already picked)
+
+Relevance is the fit score scaled to [0, 1]. Course-course similarity mixes
+TF-IDF cosine with whether the courses share a domain or provider. Only
+the candidate pool (the best few times k courses by fit score) is
+considered. Its similarity block is computed once, with one sparse
+product, and each pick then costs O(candidates), so re-ranking stays cheap
+next to scoring.
+"""
+import numpy as np
+
+# Default trade-off between relevance (1.0 = no re-ranking) and diversity
+DEFAULT_DIVERSITY_LAMBDA = 0.8
+
+# Candidate pool per requested course when re-ranking
+CANDIDATE_POOL_FACTOR = 5
+
+# Weights of the course-course similarity components, summing to 1
+SIMILARITY_WEIGHTS = {'text': 0.5, 'domain': 0.3, 'provider': 0.2}
+
+
+def candidate_pool_size(top_k, diversity_lambda):
+    """Courses to score before re-ranking down to top_k"""
+    if diversity_lambda is None or diversity_lambda >= 1.0:
+        return top_k
+    return top_k * CANDIDATE_POOL_FACTOR
+
+
+def _same_category(codes):
+    """Pairwise 'same value' matrix of category codes; missing values (-1) match nothing"""
+    codes = np.asarray(codes)
+    return (codes[:, np.newaxis] == codes[np.newaxis, :]) & (codes >= 0)[:, np.newaxis]
+
+
+def _compact_rows(matrix, positions):
+    """Dense rows of a CSR matrix, restricted to the columns those rows use"""
+    indptr = matrix.indptr
+    starts = indptr[positions]
+    lengths = indptr[positions + 1] - starts
+    # Flat offsets of every stored value of the selected rows
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    columns, compact_columns = np.unique(matrix.indices[offsets], return_inverse=True)
+    dense = np.zeros((len(positions), len(columns)))
+    dense[np.repeat(np.arange(len(positions)), lengths), compact_columns] = matrix.data[offsets]
+    return dense
+
+
+def similarity_block(text_matrix, positions, domain_codes, provider_codes):
+    """Candidates x candidates similarity of the courses at positions.
+
+    text_matrix holds the catalog's L2-normalized TF-IDF rows as CSR; the
+    category codes are per course.
+    """
+    text_rows = _compact_rows(text_matrix, positions)
+    text = text_rows @ text_rows.T
+    domain = _same_category(domain_codes[positions])
+    provider = _same_category(provider_codes[positions])
+    return (SIMILARITY_WEIGHTS['text'] * text + SIMILARITY_WEIGHTS['domain'] * domain
+            + SIMILARITY_WEIGHTS['provider'] * provider)
+
+
+def mmr_order(relevance, similarity, top_k, diversity_lambda):
+    """Indices of up to top_k candidates in MMR order.
+
+    Candidates must be given best-first: ties go to the earlier one, so with
+    no similarity at all the order is unchanged.
+    """
+    n_candidates = len(relevance)
+    if n_candidates == 0 or top_k <= 0:
+        return []
+
+    weighted_relevance = diversity_lambda * np.asarray(relevance, dtype=np.float64)
+    # Similarity penalties pre-scaled; picked candidates get an infinite one
+    penalties = (1.0 - diversity_lambda) * similarity
+    max_penalty = np.zeros(n_candidates)
+    order = []
+    for _ in range(min(top_k, n_candidates)):
+        pick = int(np.argmax(weighted_relevance - max_penalty))
+        order.append(pick)
+        np.maximum(max_penalty, penalties[pick], out=max_penalty)
+        max_penalty[pick] = np.inf
+    return order
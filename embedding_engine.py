@@ -0,0 +1,333 @@
+# embedding_engine.py
+"""Matching engine scoring semantic similarity with dense embeddings.
+
+``EmbeddingMatchingEngine`` keeps the ``recommend_courses`` contract and the
+fit score formula of ``AlternativeMatchingEngine``; only the similarity term
+changes from TF-IDF cosine to embedding cosine. Course embeddings are
+computed once per catalog snapshot (reusing the vectors of unchanged course
+texts), stored as a ``.npy`` matrix next to the catalog and memory-mapped on
+later starts; a trained IVF index is stored and memory-mapped alongside. Search goes through a CPU nearest-neighbour index from
+``vector_index``: exact blocked matrix products for small catalogs, IVF
+above ``exact_threshold`` courses.
+
+Encoders:
+
+- ``SentenceTransformerEncoder`` wraps a sentence-transformers model (a hub
+  name or a local directory); the package is only imported when used.
+- ``HashingEncoder`` is a deterministic, dependency-free stand-in built on
+  feature hashing. It needs no model download, so it is the default.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from catalog_snapshot import LEVEL_MAPPING
+from matching_engine import AlternativeMatchingEngine
+from pipeline_metrics import metrics
+from vector_index import DEFAULT_EXACT_THRESHOLD, BruteForceIndex, IVFIndex, blocked_similarities
+
+logger = logging.getLogger(__name__)
+
+
+class HashingEncoder:
+    """Deterministic stand-in for a sentence embedding model, based on feature hashing"""
+
+    def __init__(self, dim=384):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.dim = dim
+        self._vectorizer = HashingVectorizer(n_features=dim, ngram_range=(1, 2), stop_words='english',
+                                             alternate_sign=True, norm='l2')
+
+    @property
+    def signature(self):
+        return f"hashing-{self.dim}"
+
+    def encode(self, texts):
+        """L2-normalized float32 embeddings, one row per text"""
+        return self._vectorizer.transform(list(texts)).toarray().astype(np.float32)
+
+
+class SentenceTransformerEncoder:
+    """sentence-transformers model run on the CPU, loaded on first use"""
+
+    def __init__(self, model_name='sentence-transformers/all-MiniLM-L6-v2', batch_size=64, device='cpu'):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def signature(self):
+        return f"sentence-transformers:{self.model_name}"
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def encode(self, texts):
+        """L2-normalized float32 embeddings, one row per text"""
+        embeddings = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+                                       convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class ProfileEmbeddingCache:
+    """Bounded LRU of profile text -> embedding; misses are encoded in one batch"""
+
+    def __init__(self, encoder, max_size=4096):
+        self.encoder = encoder
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def encode(self, texts):
+        """Embeddings of texts as a (len(texts), dim) float32 matrix"""
+        found = {}
+        with self._lock:
+            for text in texts:
+                vector = self._entries.get(text)
+                if vector is not None:
+                    self._entries.move_to_end(text)
+                    found[text] = vector
+
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        if missing:
+            # Encode outside the lock; concurrent misses may encode a text twice
+            for text, vector in zip(missing, self.encoder.encode(missing)):
+                found[text] = vector
+            with self._lock:
+                for text in missing:
+                    self._entries[text] = found[text]
+                    self._entries.move_to_end(text)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return np.vstack([found[text] for text in texts]) if texts else np.empty((0, 0), dtype=np.float32)
+
+
+def default_embedding_path(csv_path):
+    """Directory holding the course embedding matrices of a catalog CSV"""
+    return os.path.splitext(csv_path)[0] + '.embeddings'
+
+
+class EmbeddingMatchingEngine(AlternativeMatchingEngine):
+    """AlternativeMatchingEngine with embedding similarity in place of TF-IDF"""
+
+    def __init__(self, encoder=None, storage_dtype='float16', exact_threshold=DEFAULT_EXACT_THRESHOLD,
+                 profile_cache_size=4096, min_candidates=200, embedding_path=None, **kwargs):
+        super().__init__(**kwargs)
+        self.encoder = encoder or HashingEncoder()
+        # Course embeddings are stored (and memory-mapped) in this dtype
+        self.storage_dtype = np.dtype(storage_dtype)
+        # Catalogs above this size are searched with IVF instead of exactly
+        self.exact_threshold = exact_threshold
+        # Courses pulled from an approximate index per request, at least
+        # 20x top_k, before fit scores are computed
+        self.min_candidates = min_candidates
+        # Directory for stored course embeddings; defaults to <catalog>.embeddings
+        self.embedding_path = embedding_path
+        self.profile_embeddings = ProfileEmbeddingCache(self.encoder, profile_cache_size)
+
+        # Vector index per catalog snapshot, dropped with the snapshot
+        self._course_indexes = weakref.WeakKeyDictionary()
+        self._index_lock = threading.Lock()
+
+    def _after_fork(self):
+        super()._after_fork()
+        self._index_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Engine configured from RECOMMENDER_EMBEDDING_* environment variables"""
+        model = os.environ.get('RECOMMENDER_EMBEDDING_MODEL', 'hashing')
+        encoder = HashingEncoder() if model == 'hashing' else SentenceTransformerEncoder(model)
+        return cls(
+            encoder=encoder,
+            storage_dtype=os.environ.get('RECOMMENDER_EMBEDDING_DTYPE', 'float16'),
+            exact_threshold=int(os.environ.get('RECOMMENDER_ANN_THRESHOLD', DEFAULT_EXACT_THRESHOLD)),
+            profile_cache_size=int(os.environ.get('RECOMMENDER_EMBEDDING_CACHE_SIZE', 4096)),
+            **kwargs
+        )
+
+    def _swap_snapshot(self, snapshot, source_stat=None):
+        # Embed the new catalog before it is published, so no request waits on it
+        self.course_index(snapshot)
+        super()._swap_snapshot(snapshot, source_stat)
+
+    def course_index(self, catalog):
+        """Nearest-neighbour index over the course embeddings of a snapshot"""
+        index = self._course_indexes.get(catalog)
+        if index is None:
+            with self._index_lock:
+                index = self._course_indexes.get(catalog)
+                if index is None:
+                    vectors = self._course_embeddings(catalog)
+                    index = self._course_indexes[catalog] = self._build_index(catalog, vectors)
+        return index
+
+    def _build_index(self, catalog, vectors):
+        """Exact index for small catalogs; above exact_threshold an IVF index stored next to the embeddings"""
+        if vectors.shape[0] <= self.exact_threshold:
+            return BruteForceIndex(vectors)
+
+        path = self._embedding_file(catalog)
+        ivf_path = path[:-len('.npy')] + '.ivf' if path is not None else None
+        if ivf_path is not None:
+            index = IVFIndex.load(vectors, ivf_path)
+            if index is not None:
+                return index
+
+        index = IVFIndex(vectors)
+        if ivf_path is None:
+            return index
+        try:
+            index.save(ivf_path)
+        except OSError:
+            logger.warning("Could not store the IVF index at %s", ivf_path, exc_info=True)
+            return index
+        # Reopen memory-mapped, so the lists are shared instead of held privately
+        return IVFIndex.load(vectors, ivf_path) or index
+
+    def _embedding_file(self, catalog):
+        """Path of the stored embedding matrix of a snapshot, or None if it has no source file"""
+        directory = self.embedding_path
+        if directory is None:
+            if catalog.source_path is None:
+                return None
+            directory = default_embedding_path(catalog.source_path)
+        key = hashlib.sha256(json.dumps([catalog.catalog_version, self.encoder.signature,
+                                         self.storage_dtype.name]).encode('utf-8')).hexdigest()
+        return os.path.join(directory, key[:32] + '.npy')
+
+    def _course_embeddings(self, catalog):
+        """Stored embeddings of a snapshot's courses, computing and storing them if needed"""
+        path = self._embedding_file(catalog)
+        if path is not None:
+            try:
+                vectors = np.load(path, mmap_mode='r')
+                if vectors.shape[0] == len(catalog) and vectors.dtype == self.storage_dtype:
+                    return vectors
+            except (OSError, ValueError):
+                pass
+
+        vectors = self._encode_courses(catalog.courses_df['combined_text'].tolist()).astype(self.storage_dtype)
+        if path is None:
+            return vectors
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.embeddings-', suffix='.npy', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, vectors)
+            os.replace(tmp_path, path)
+            return np.load(path, mmap_mode='r')
+        except OSError:
+            logger.warning("Could not store course embeddings at %s", path, exc_info=True)
+            return vectors
+
+    def _encode_courses(self, texts):
+        """Embed course texts, reusing the current snapshot's vectors for unchanged texts"""
+        vectors = None
+        previous = self.snapshot
+        previous_index = self._course_indexes.get(previous) if previous is not None else None
+        if previous_index is not None:
+            previous_rows = {text: row for row, text in enumerate(previous.courses_df['combined_text'])}
+            rows = np.array([previous_rows.get(text, -1) for text in texts], dtype=np.intp)
+            reused = rows >= 0
+            if reused.any():
+                vectors = np.empty((len(texts), previous_index.vectors.shape[1]), dtype=np.float32)
+                vectors[reused] = previous_index.vectors[rows[reused]]
+                fresh = np.flatnonzero(~reused)
+                if len(fresh):
+                    vectors[fresh] = self.encoder.encode([texts[row] for row in fresh])
+
+        if vectors is None:
+            vectors = self.encoder.encode(texts)
+        return vectors
+
+    def _score_profile(self, user_profile, top_k, scoring_mode, analysis):
+        """Top-k courses by fit score for one analyzed profile.
+
+        scoring_mode='vectorized' scores every course even when the catalog
+        uses an approximate index; any other mode follows the index.
+        """
+        with metrics.stage('profile_text'):
+            user_text = self.create_user_profile_text(user_profile)
+        with metrics.stage('embed'):
+            user_embedding = self.profile_embeddings.encode([user_text])[0]
+        return self._recommend_embedding(user_profile, user_embedding, top_k, scoring_mode, analysis)
+
+    def _score_batch(self, catalog, user_profiles, analyses, top_k, chunk_size):
+        """Top-k courses by fit score for each analyzed profile, encoding their embeddings in one batch"""
+        results = []
+        for start in range(0, len(user_profiles), chunk_size):
+            profiles = user_profiles[start:start + chunk_size]
+            with metrics.stage('embed'):
+                embeddings = self.profile_embeddings.encode([self.create_user_profile_text(profile)
+                                                             for profile in profiles])
+            results.extend(
+                self._recommend_embedding(profile, embedding, top_k, None, analysis)
+                for profile, embedding, analysis in zip(profiles, embeddings, analyses[start:start + chunk_size])
+            )
+        return results
+
+    def _recommend_embedding(self, user_profile, user_embedding, top_k, scoring_mode, analysis):
+        """Score courses by embedding similarity, through the snapshot's vector index"""
+        catalog = analysis.catalog
+        index = self.course_index(catalog)
+
+        if index.exact or scoring_mode == 'vectorized':
+            with metrics.stage('similarity'):
+                similarities = self._course_similarities(index, user_embedding)
+            analysis.retrieval_stats = {'candidates': len(catalog), 'exact': True}
+            with metrics.stage('scoring'):
+                return self._recommend_vectorized(user_profile, similarities, top_k, analysis)
+
+        # Approximate: fit scores for the nearest courses only
+        with metrics.stage('vector_search'):
+            positions, similarities = index.search(user_embedding[np.newaxis, :],
+                                                   max(self.min_candidates, 20 * top_k))
+        found = positions[0] >= 0
+        positions = positions[0][found]
+        similarities = np.clip(similarities[0][found].astype(np.float64), 0.0, 1.0)
+        analysis.retrieval_stats = {'candidates': len(positions), 'exact': False}
+
+        user_lvl = LEVEL_MAPPING.get(user_profile.get('level', 'beginner').lower(), 0)
+        bonus_by_value = self._domain_bonus_by_value(user_profile.get('target_domain'), catalog)
+        with metrics.stage('scoring'):
+            scored = self._score_positions(catalog, positions, similarities, user_lvl, bonus_by_value, analysis)
+            return self._top_k_records(catalog, scored, top_k)
+
+    def _similarities_at(self, user_profile, positions, analysis):
+        """Embedding similarity of the profile with the courses at positions, clipped to [0, 1]"""
+        with metrics.stage('profile_text'):
+            user_text = self.create_user_profile_text(user_profile)
+        with metrics.stage('embed'):
+            user_embedding = self.profile_embeddings.encode([user_text])[0]
+        index = self.course_index(analysis.catalog)
+        with metrics.stage('similarity'):
+            similarities = blocked_similarities(index.vectors[positions], user_embedding[np.newaxis, :])[0]
+        return np.clip(similarities.astype(np.float64), 0.0, 1.0)
+
+    @staticmethod
+    def _course_similarities(index, user_embedding):
+        """Cosine similarity of the profile with every course, clipped to [0, 1] like TF-IDF cosine"""
+        similarities = index.similarities(user_embedding[np.newaxis, :])[0]
+        return np.clip(similarities.astype(np.float64), 0.0, 1.0)
@@ -0,0 +1,155 @@
+# incremental_tfidf.py
+"""Keep a fitted TfidfVectorizer's statistics current as documents come and go.
+
+``TfidfVectorizer.fit`` derives three things from the corpus: the vocabulary
+(the ``max_features`` most frequent terms), the document frequency of each
+vocabulary term, and from those the idf weights. With the vocabulary held
+fixed, document frequencies and the weighted matrix can be updated from the
+added and removed documents alone, and the result is identical to a refit
+that happens to pick the same vocabulary. ``vocabulary_drift`` measures how
+far the vocabulary a refit would pick has moved, so callers can decide when
+a full refit is worth it.
+"""
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+
+class TermStatistics:
+    """Per-document term counts and corpus frequencies behind a fitted vectorizer"""
+
+    def __init__(self, vectorizer, term_counts, corpus_frequency):
+        self.vectorizer = vectorizer
+        self.analyzer = vectorizer.build_analyzer()
+        # documents x vocabulary raw counts, restricted to the fitted vocabulary
+        self.term_counts = term_counts
+        # Total count of every term in the corpus, in or out of the vocabulary
+        self.corpus_frequency = corpus_frequency
+
+    @classmethod
+    def from_corpus(cls, vectorizer, texts):
+        """Count the terms of every document once"""
+        stats = cls(vectorizer, None, Counter())
+        stats.term_counts, stats.corpus_frequency = stats.count(texts)
+        return stats
+
+    def __len__(self):
+        return self.term_counts.shape[0]
+
+    def count(self, texts):
+        """Vocabulary-restricted count matrix and corpus term counts of some documents"""
+        vocabulary = self.vectorizer.vocabulary_
+        corpus_frequency = Counter()
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            doc_counts = Counter(self.analyzer(text))
+            corpus_frequency.update(doc_counts)
+            for term, term_count in doc_counts.items():
+                term_id = vocabulary.get(term)
+                if term_id is not None:
+                    indices.append(term_id)
+                    data.append(term_count)
+            indptr.append(len(indices))
+
+        counts = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.int64), np.asarray(indices, dtype=np.int64), indptr),
+            shape=(len(indptr) - 1, len(vocabulary))
+        )
+        return counts, corpus_frequency
+
+    def updated(self, source_rows, fresh_texts, dropped_texts, vectorizer):
+        """Statistics for a new corpus built from this one.
+
+        Row i of the new corpus is row source_rows[i] of this one, or, where
+        source_rows[i] is -1, the next document of fresh_texts. dropped_texts
+        are the documents of this corpus that are not carried over.
+        vectorizer is the (fitted, same vocabulary) vectorizer of the new corpus.
+        """
+        fresh_counts, fresh_frequency = self.count(fresh_texts)
+
+        corpus_frequency = self.corpus_frequency.copy()
+        corpus_frequency.update(fresh_frequency)
+        for text in dropped_texts:
+            corpus_frequency.subtract(Counter(self.analyzer(text)))
+        corpus_frequency = +corpus_frequency
+
+        term_counts = stack_rows(self.term_counts, source_rows, fresh_counts)
+        return TermStatistics(vectorizer, term_counts, corpus_frequency)
+
+    def document_frequency(self):
+        """Number of documents containing each vocabulary term"""
+        return np.bincount(self.term_counts.indices, minlength=self.term_counts.shape[1])
+
+    def idf(self):
+        """idf weights exactly as TfidfTransformer.fit computes them"""
+        n_samples = len(self) + int(self.vectorizer.smooth_idf)
+        df = self.document_frequency() + int(self.vectorizer.smooth_idf)
+        return np.log(n_samples / df) + 1
+
+    def tfidf_matrix(self, idf):
+        """Weighted, normalized document-term matrix as TfidfVectorizer.transform returns it"""
+        # Built from the raw arrays because astype() sorts the column indices;
+        # keeping the vectorizer's order keeps normalize() rounding the same
+        counts = self.term_counts
+        tf = sparse.csr_matrix((counts.data.astype(np.float64), counts.indices.copy(), counts.indptr.copy()),
+                               shape=counts.shape)
+        if self.vectorizer.sublinear_tf:
+            np.log(tf.data, tf.data)
+            tf.data += 1
+        if self.vectorizer.use_idf:
+            tf.data *= idf[tf.indices]
+        if self.vectorizer.norm:
+            from sklearn.preprocessing import normalize
+
+            tf = normalize(tf, norm=self.vectorizer.norm, copy=False)
+        return tf
+
+    def refit_vocabulary(self):
+        """Terms a full refit would keep, selected exactly as CountVectorizer does.
+
+        CountVectorizer sorts terms by name, then keeps the max_features
+        highest total counts via argsort, which also decides ties at the
+        cutoff. min_df/max_df pruning is not modelled (the engine uses the
+        defaults, which prune nothing).
+        """
+        terms = sorted(self.corpus_frequency)
+        max_features = self.vectorizer.max_features
+        if max_features is None or len(terms) <= max_features:
+            return set(terms)
+
+        totals = np.fromiter((self.corpus_frequency[term] for term in terms), dtype=np.int64, count=len(terms))
+        return {terms[idx] for idx in (-totals).argsort()[:max_features]}
+
+    def vocabulary_drift(self):
+        """Share of the fitted vocabulary a full refit would replace (0 = identical)"""
+        vocabulary = self.vectorizer.vocabulary_
+        target = self.refit_vocabulary()
+        shared = sum(1 for term in target if term in vocabulary)
+        return 1.0 - shared / max(len(target), len(vocabulary), 1)
+
+
+def stack_rows(matrix, source_rows, fresh_rows):
+    """Assemble a CSR matrix whose rows come from matrix (source_rows >= 0) or, in order, from fresh_rows"""
+    source_rows = np.asarray(source_rows, dtype=np.intp)
+    n_columns = max(matrix.shape[1], fresh_rows.shape[1])
+    reused = source_rows >= 0
+
+    kept = matrix[source_rows[reused]]
+    kept = sparse.csr_matrix((kept.data, kept.indices, kept.indptr), shape=(kept.shape[0], n_columns))
+    fresh_rows = sparse.csr_matrix((fresh_rows.data, fresh_rows.indices, fresh_rows.indptr),
+                                   shape=(fresh_rows.shape[0], n_columns))
+    stacked = sparse.vstack([kept, fresh_rows], format='csr')
+    return stacked[stacked_order(source_rows)]
+
+
+def stacked_order(source_rows):
+    """Row order that turns [reused rows..., fresh rows...] back into catalog order"""
+    source_rows = np.asarray(source_rows, dtype=np.intp)
+    reused = source_rows >= 0
+    n_reused = int(reused.sum())
+
+    order = np.empty(len(source_rows), dtype=np.intp)
+    order[reused] = np.arange(n_reused)
+    order[~reused] = n_reused + np.arange(len(source_rows) - n_reused)
+    return order
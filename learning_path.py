@@ -0,0 +1,230 @@
+# learning_path.py
+"""Course dependency graph and prerequisite-aware learning-path planning.
+
+The graph is bipartite between courses and skills: a course points to every
+prerequisite skill it satisfies (one of its skill tags matches the skill
+under the engine's 0.7 similarity rule), and a skill points to the courses
+that require it. Skills act as hubs, so popular skills don't turn into
+millions of course-to-course edges.
+
+When a catalog is loaded, every prerequisite skill gets a from-scratch cost:
+the weeks of study needed to reach it with no prior skills. The cost is an
+additive estimate over the cheapest chain of courses, computed with a
+vectorized Bellman-Ford pass. ``DependencyGraph.plan`` then runs a
+shortest-path search for one learner. It skips skills the learner already
+covers and uses the cached costs to price deeper prerequisites, so each
+search only visits the skills on the path. The chosen courses are ordered topologically into stages and
+scheduled week by week.
+"""
+import re
+from graphlib import TopologicalSorter
+
+import numpy as np
+from scipy import sparse
+
+# Used for courses whose duration can't be parsed
+DEFAULT_COURSE_WEEKS = 4.0
+WEEKS_PER_MONTH = 52 / 12
+
+# Same threshold ProfileAnalysis uses for user skills covering a prerequisite
+PREREQUISITE_MATCH_THRESHOLD = 0.7
+
+DURATION_UNITS = {'hour': 1 / 40, 'day': 1 / 5, 'week': 1.0, 'month': WEEKS_PER_MONTH, 'year': 52.0}
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(hour|day|week|month|year)s?", re.IGNORECASE)
+
+# Course fields copied into each learning-path step
+STEP_FIELDS = ('title', 'provider', 'duration', 'level', 'link', 'domain', 'cost', 'prerequisites', 'skill_tags')
+
+
+def parse_duration_weeks(duration):
+    """Study time of a duration string such as '6 weeks' or '3 months', in weeks"""
+    match = DURATION_PATTERN.search(duration) if isinstance(duration, str) else None
+    if match is None:
+        return DEFAULT_COURSE_WEEKS
+    weeks = float(match.group(1)) * DURATION_UNITS[match.group(2).lower()]
+    return weeks if weeks > 0 else DEFAULT_COURSE_WEEKS
+
+
+def _segment_min(values, indptr):
+    """Minimum of each segment of a CSC/CSR layout, inf for empty segments"""
+    minimum = np.full(len(indptr) - 1, np.inf)
+    nonempty = np.diff(indptr) > 0
+    if nonempty.any():
+        minimum[nonempty] = np.minimum.reduceat(values, indptr[:-1][nonempty])
+    return minimum
+
+
+class DependencyGraph:
+    """Course/skill dependency graph of one catalog snapshot, with cached per-skill costs"""
+
+    def __init__(self, catalog):
+        vocab = catalog.skill_vocab
+        store = catalog.course_store()
+        self.catalog = catalog
+        self.n_courses = len(catalog)
+        n_skills = len(vocab)
+
+        # Weeks of study per course, parsed once per distinct duration string
+        self.course_weeks = catalog.course_weeks()
+
+        # Course -> required skills. 'none' is not a real prerequisite.
+        requires = sparse.csr_matrix(catalog.prereq_matrix, copy=True)
+        requires.data[:] = 1.0
+        none_id = vocab.get_id('none')
+        if none_id is not None:
+            keep = np.ones(n_skills)
+            keep[none_id] = 0.0
+            requires = sparse.csr_matrix(requires @ sparse.diags(keep))
+            requires.eliminate_zeros()
+        self.requires = requires
+        self.prerequisite_ids = np.flatnonzero(np.diff(requires.tocsc().indptr))
+
+        # Course -> taught skills, read from the course store's skill tag lists
+        tag_strings = store.list_strings
+        tag_skill_ids = np.array([vocab.skill_ids.get(tag_strings[idx].lower(), -1)
+                                  for idx in range(len(tag_strings))], dtype=np.int64)
+        taught_ids = tag_skill_ids[np.asarray(store.list_ids['skill_tags'], dtype=np.int64)]
+        offsets = np.asarray(store.list_offsets['skill_tags'], dtype=np.int64)
+        rows = np.repeat(np.arange(self.n_courses), np.diff(offsets))
+        valid = taught_ids >= 0
+        teaches = sparse.csr_matrix(
+            (np.ones(int(valid.sum())), (rows[valid], taught_ids[valid])), shape=(self.n_courses, n_skills)
+        )
+
+        # Taught skill -> prerequisite skills it satisfies. Skill similarity is
+        # symmetric, so the matches of each prerequisite are the skills satisfying it.
+        skill_rows, skill_cols = [], []
+        for prerequisite_id in self.prerequisite_ids.tolist():
+            for skill_id in vocab.matching_ids(vocab.skills[prerequisite_id], PREREQUISITE_MATCH_THRESHOLD):
+                skill_rows.append(skill_id)
+                skill_cols.append(prerequisite_id)
+        satisfies_skill = sparse.csr_matrix(
+            (np.ones(len(skill_rows)), (skill_rows, skill_cols)), shape=(n_skills, n_skills)
+        )
+
+        # Course -> prerequisite skills it satisfies, and skill -> satisfying courses
+        satisfies = sparse.csr_matrix(teaches @ satisfies_skill)
+        satisfies.data[:] = 1.0
+        self.satisfies = satisfies
+        self.satisfied_by = satisfies.tocsc()
+
+        self.skill_cost, self.course_cost = self._skill_costs()
+
+    def _skill_costs(self):
+        """From-scratch weeks to reach every skill and to complete every course.
+
+        A course costs its own weeks plus the costs of its prerequisites; a
+        skill costs as much as its cheapest satisfying course. Iterates to a
+        fixed point, one round per prerequisite depth. Skills only reachable
+        through cycles (or not taught at all) stay at infinity.
+        """
+        skill_cost = np.full(self.requires.shape[1], np.inf)
+        skill_cost[np.setdiff1d(np.arange(len(skill_cost)), self.prerequisite_ids)] = 0.0
+        course_cost = np.full(self.n_courses, np.inf)
+        satisfied_by = self.satisfied_by
+
+        for _ in range(len(self.prerequisite_ids) + 1):
+            course_cost = self.course_weeks + self.requires @ skill_cost
+            cheapest = _segment_min(course_cost[satisfied_by.indices], satisfied_by.indptr)
+            updated = skill_cost.copy()
+            updated[self.prerequisite_ids] = cheapest[self.prerequisite_ids]
+            if np.array_equal(updated, skill_cost):
+                break
+            skill_cost = updated
+        return skill_cost, course_cost
+
+    def plan(self, covered_ids, target_positions):
+        """Shortest learning path from the covered skills to the target courses.
+
+        Returns the ordered steps, as (position, stage, prerequisite skill ids
+        it teaches to later steps, whether it is a target), and the ids of the
+        prerequisite skills no course can teach.
+        """
+        # Skills the learner covers, and those covered once the chosen courses are taken
+        covered = np.zeros(self.requires.shape[1], dtype=bool)
+        if covered_ids:
+            covered[list(covered_ids)] = True
+        known = covered.copy()
+
+        chosen = {}          # position -> set of positions it depends on
+        provides = {}        # position -> skill ids later courses need from it
+        provider_of = {}     # skill id -> chosen position teaching it
+        unreachable = set()
+        requires, satisfied_by, satisfies = self.requires, self.satisfied_by, self.satisfies
+
+        def learn(position):
+            """Add a course after the courses teaching the prerequisites the learner lacks"""
+            dependencies = set()
+            skills = requires.indices[requires.indptr[position]:requires.indptr[position + 1]]
+            for skill_id in skills[~covered[skills]].tolist():
+                provider = acquire(skill_id)
+                if provider is not None:
+                    dependencies.add(provider)
+                    provides.setdefault(provider, set()).add(skill_id)
+            chosen[position] = dependencies
+            taught = satisfies.indices[satisfies.indptr[position]:satisfies.indptr[position + 1]]
+            for skill_id in taught[~known[taught]].tolist():
+                provider_of[skill_id] = position
+            known[taught] = True
+
+        def acquire(skill_id):
+            """Chosen course teaching skill_id, picking the cheapest one for this learner"""
+            if skill_id in provider_of:
+                return provider_of[skill_id]
+            if not np.isfinite(self.skill_cost[skill_id]):
+                unreachable.add(skill_id)
+                return None
+
+            candidates = satisfied_by.indices[satisfied_by.indptr[skill_id]:satisfied_by.indptr[skill_id + 1]]
+            # Own weeks plus the cached cost of every prerequisite still missing
+            remaining = np.where(known, 0.0, self.skill_cost)
+            costs = self.course_weeks[candidates] + requires[candidates] @ remaining
+            position = int(candidates[np.argmin(costs)])
+            learn(position)
+            return position
+
+        for position in target_positions:
+            if position not in chosen:
+                learn(position)
+
+        # Stage = longest chain of dependencies before a course; within a
+        # stage, easier courses first
+        level_codes = self.catalog.level_codes
+        sorter = TopologicalSorter(chosen)
+        sorter.prepare()
+        steps, stage = [], 0
+        targets = set(target_positions)
+        while sorter.is_active():
+            ready = sorted(sorter.get_ready(), key=lambda pos: (level_codes[pos], pos))
+            for position in ready:
+                steps.append((position, stage, sorted(provides.get(position, ())), position in targets))
+            sorter.done(*ready)
+            stage += 1
+        return steps, sorted(unreachable)
+
+    def schedule(self, steps, unreachable):
+        """Turn planned steps into course records with week and month offsets"""
+        store = self.catalog.course_store()
+        skills = self.catalog.skill_vocab.skills
+        path, week = [], 0.0
+        for number, (position, stage, skill_ids, is_target) in enumerate(steps, 1):
+            record = {field: store.value(field, position) for field in STEP_FIELDS}
+            weeks = float(self.course_weeks[position])
+            record.update({
+                'step': number,
+                'stage': stage,
+                'start_week': week,
+                'end_week': week + weeks,
+                'month': int(week // WEEKS_PER_MONTH) + 1,
+                'target': is_target,
+                'unlocks': [skills[skill_id] for skill_id in skill_ids],
+            })
+            path.append(record)
+            week += weeks
+
+        return {
+            'steps': path,
+            'total_weeks': week,
+            'total_months': int(np.ceil(week / WEEKS_PER_MONTH)) if week else 0,
+            'unreachable_prerequisites': [skills[skill_id] for skill_id in unreachable],
+        }
@@ -1,39 +1,432 @@
 # matching_engine_alternative.py
-import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import heapq
+import os
 import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+from catalog_artifact import file_sha256, vectorizer_signature
+from candidate_index import bound_fit_scores
+from catalog_snapshot import LEVEL_MAPPING, build_snapshot, make_vectorizer, update_snapshot
+from constraints import CourseConstraints
+from course_store import CourseView
+from diversity import DEFAULT_DIVERSITY_LAMBDA, candidate_pool_size, mmr_order, similarity_block
+from pipeline_metrics import metrics
+
+# Upper bound on profiles x courses cells scored at once by the batch path
+BATCH_CELL_BUDGET = 1 << 22
+
+# Profile scored by warm_up
+WARMUP_PROFILE = {
+    'education': "Bachelor's", 'major': 'Computer Science', 'technical_skills': ['python'],
+    'soft_skills': ['communication'], 'interests': ['software'], 'target_domain': 'Software Development',
+    'career_goals': 'Software engineer', 'level': 'beginner',
+}
+
+# Engines in this process, whose locks are reset in forked children
+_engines = weakref.WeakSet()
+
+
+def _reset_engines_after_fork():
+    """Give every engine fresh locks in a forked child.
+
+    The child only has the forking thread, so a lock another thread held at
+    fork time (e.g. the startup warm-up loading the catalog) would stay
+    locked in the child forever.
+    """
+    for engine in list(_engines):
+        engine._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
+
+class ProfileAnalysis:
+    """Skill analysis of one user profile, computed once per request.
+
+    Holds the normalized technical skills, the catalog skills they cover and
+    per-course prerequisite/skill matches, so that recommend, timeline and
+    rationale never evaluate the same course/skill pair twice.
+    """
+
+    def __init__(self, engine, user_profile, catalog=None):
+        self.engine = engine
+        # The catalog snapshot this request is pinned to
+        self.catalog = catalog if catalog is not None else engine.snapshot
+        self.vocab = self.catalog.skill_vocab if self.catalog is not None else None
+
+        self.technical_skills = list(user_profile.get('technical_skills', []))
+        self.skills_lower = [skill.lower() for skill in self.technical_skills]
+
+        vocab = self.vocab
+        self.covered_ids = vocab.covered_ids(self.skills_lower) if vocab is not None else set()
+        self._covered_mask = None
+
+        # Per-skill and per-course memos
+        self._prereq_met = {}
+        self._related_ids = None
+        self._related_skill_mask = None
+        self._matched_skills = {}
+        self._rationales = {}
+        # Templated rationales by catalog position
+        self._rendered_rationales = {}
+
+        # Candidate count and exactness of the last pruned scoring run
+        self.retrieval_stats = None
+
+    def covered_mask(self):
+        """Float mask over the skill vocabulary of skills the user covers"""
+        if self._covered_mask is None:
+            mask = np.zeros(len(self.vocab), dtype=np.float64)
+            if self.covered_ids:
+                mask[list(self.covered_ids)] = 1.0
+            self._covered_mask = mask
+        return self._covered_mask
+
+    def prerequisite_met(self, prereq_lower):
+        """Check if any user skill covers a (lowercased) prerequisite"""
+        met = self._prereq_met.get(prereq_lower)
+        if met is None:
+            vocab = self.vocab
+            skill_id = vocab.get_id(prereq_lower) if vocab is not None else None
+            if skill_id is not None:
+                met = skill_id in self.covered_ids
+            else:
+                # Skills outside the catalog vocabulary fall back to pairwise comparison
+                met = any(self.engine.skill_similarity(prereq_lower, skill) > 0.7
+                          for skill in self.skills_lower)
+            self._prereq_met[prereq_lower] = met
+        return met
+
+    def prerequisite_score(self, course_prerequisites):
+        """Fraction of a course's prerequisites covered by the user"""
+        if not course_prerequisites or course_prerequisites == ['none']:
+            return 1.0
+
+        prereq_met = sum(1 for prereq in course_prerequisites
+                         if self.prerequisite_met(prereq.lower().strip()))
+
+        return prereq_met / len(course_prerequisites)
+
+    def missing_prerequisites(self, course_prerequisites):
+        """Prerequisites (other than 'none') the user does not cover yet"""
+        return [prereq for prereq in course_prerequisites
+                if prereq != 'none' and not self.prerequisite_met(prereq.lower())]
+
+    def matched_skills(self, course_skills):
+        """Course skills related to the user's skills, in user-skill order (first two only)"""
+        key = tuple(course_skills)
+        matched = self._matched_skills.get(key)
+        if matched is not None:
+            return matched
+
+        vocab = self.vocab
+        matched = []
+        for user_skill, related_ids in zip(self.skills_lower, self.related_ids()):
+            for course_skill in course_skills:
+                course_skill_lower = course_skill.lower()
+                skill_id = vocab.get_id(course_skill_lower) if vocab is not None else None
+                if skill_id is not None:
+                    related = skill_id in related_ids
+                else:
+                    related = self.engine.skill_similarity(user_skill, course_skill_lower) > 0.6
+                if related:
+                    matched.append(course_skill)
+            if len(matched) >= 2:
+                break
+
+        self._matched_skills[key] = matched[:2]
+        return self._matched_skills[key]
+
+    def related_ids(self):
+        """Per user skill, the ids of the catalog skills it relates to for rationales"""
+        if self._related_ids is None:
+            vocab = self.vocab
+            self._related_ids = [
+                vocab.matching_ids(skill, 0.6) if vocab is not None else frozenset()
+                for skill in self.skills_lower
+            ]
+        return self._related_ids
+
+    def related_skill_mask(self):
+        """Boolean user skills x skill vocabulary matrix of related_ids"""
+        if self._related_skill_mask is None:
+            mask = np.zeros((len(self.skills_lower), len(self.vocab)), dtype=bool)
+            for row, related_ids in enumerate(self.related_ids()):
+                mask[row, list(related_ids)] = True
+            self._related_skill_mask = mask
+        return self._related_skill_mask
+
+    def rendered_rationales(self, positions):
+        """Rationales of the courses at catalog positions, rendered from the catalog's templates"""
+        pending = [position for position in dict.fromkeys(positions) if position not in self._rendered_rationales]
+        if pending:
+            rendered = self.catalog.rationale_templates().render(pending, self)
+            self._rendered_rationales.update(zip(pending, rendered))
+        return [self._rendered_rationales[position] for position in positions]
+
+    def cached_rationale(self, course, build):
+        """Return the rationale for a course, building it at most once"""
+        key = (course['title'], course['level'], course['duration'], course['cost'],
+               tuple(course['prerequisites']), tuple(course['skill_tags']))
+        rationale = self._rationales.get(key)
+        if rationale is None:
+            rationale = self._rationales[key] = build()
+        return rationale
 
 
 class AlternativeMatchingEngine:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-        self.courses_df = None
-        self.tfidf_matrix = None
-        self.feature_names = None
-
-    def load_courses(self, csv_path='courses.csv'):
-        """Load course catalog from CSV"""
-        self.courses_df = pd.read_csv(csv_path)
-
-        # Convert list-like strings to actual lists
-        for col in ['prerequisites', 'skill_tags']:
-            self.courses_df[col] = self.courses_df[col].apply(
-                lambda x: [item.strip() for item in x.strip('[]').replace("'", "").split(',')]
-                if isinstance(x, str) else []
-            )
+    def __init__(self, scoring_mode='vectorized', refit_drift_threshold=0.05, max_candidates=1000,
+                 diversity_lambda=DEFAULT_DIVERSITY_LAMBDA):
+        # TfidfVectorizer settings; every catalog snapshot fits its own vectorizer
+        self.vectorizer_params = {'stop_words': 'english', 'max_features': 1000}
+        # 'vectorized' scores the whole catalog with array operations,
+        # 'pruned' only scores candidates pulled from inverted indexes,
+        # 'loop' keeps the original row-by-row implementation
+        self.scoring_mode = scoring_mode
+        # Most courses the pruned mode scores exactly per request; results
+        # are only approximate when this budget runs out
+        self.max_candidates = max_candidates
+        # MMR trade-off between fit score and variety of the top-k list;
+        # 1.0 returns courses purely by fit score
+        self.diversity_lambda = diversity_lambda
 
-        # Create combined text for TF-IDF
-        self.courses_df['combined_text'] = self.courses_df.apply(
-            lambda row: f"{row['title']} {row['provider']} {' '.join(row['skill_tags'])} {row['domain']}",
-            axis=1
-        )
+        # Current immutable catalog snapshot; replaced atomically on reload
+        self.snapshot = None
+        self._snapshot_version = 0
+        self._load_lock = threading.RLock()
+        self._reload_executor = None
+        self._reload_future = None
+        self._reload_listeners = []
+        self.last_reload_error = None
+
+        # (mtime, size) of the source file when the snapshot was built
+        self._source_stat = None
+
+        # Incremental catalog updates refit TF-IDF from scratch once a refit
+        # would replace more than this share of the vocabulary
+        self.refit_drift_threshold = refit_drift_threshold
+        _engines.add(self)
+
+    def _after_fork(self):
+        """Fresh locks and no reload thread in a forked child"""
+        self._load_lock = threading.RLock()
+        self._reload_executor = None
+        self._reload_future = None
+
+    # Catalog state of the current snapshot, kept as attributes for callers
+    # that predate snapshots. Code serving a request should hold on to one
+    # snapshot instead of reading these repeatedly.
+    courses_df = property(lambda self: self._snapshot_attribute('courses_df'))
+    tfidf_matrix = property(lambda self: self._snapshot_attribute('tfidf_matrix'))
+    feature_names = property(lambda self: self._snapshot_attribute('feature_names'))
+    catalog_version = property(lambda self: self._snapshot_attribute('catalog_version'))
+    skill_vocab = property(lambda self: self._snapshot_attribute('skill_vocab'))
+    column_indexes = property(lambda self: self._snapshot_attribute('column_indexes'))
+
+    def _snapshot_attribute(self, name):
+        snapshot = self.snapshot
+        return getattr(snapshot, name) if snapshot is not None else None
+
+    @property
+    def vectorizer_template(self):
+        """Fresh unfitted vectorizer with the engine's settings"""
+        return make_vectorizer(self.vectorizer_params)
+
+    @property
+    def vectorizer(self):
+        """Fitted vectorizer of the current snapshot (the template before loading)"""
+        snapshot = self.snapshot
+        return snapshot.vectorizer if snapshot is not None else self.vectorizer_template
+
+    def load_courses(self, csv_path='courses.csv', artifact_path=None, use_artifact=True):
+        """Load course catalog from CSV, or from its prebuilt artifact when it is up to date.
 
-        # Create TF-IDF matrix
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.courses_df['combined_text'])
-        self.feature_names = self.vectorizer.get_feature_names_out()
+        The new catalog is built as a separate snapshot and swapped in at the
+        end, so requests already running keep the snapshot they started with.
+        """
+        with self._load_lock:
+            source_stat = self._stat(csv_path)
+            snapshot = build_snapshot(csv_path, self.vectorizer_params,
+                                      artifact_path=artifact_path, use_artifact=use_artifact)
+            self._swap_snapshot(snapshot, source_stat)
+            return snapshot
+
+    def _swap_snapshot(self, snapshot, source_stat=None):
+        """Publish a fully built snapshot as the engine's current catalog"""
+        # Build the course store, similarity matrices, dependency graph and
+        # rationale templates before requests can reach the snapshot
+        snapshot.course_store()
+        snapshot.profile_vectorizer()
+        snapshot.normalized_tfidf()
+        snapshot.dependency_graph()
+        snapshot.rationale_templates()
+        self._snapshot_version += 1
+        snapshot.version = self._snapshot_version
+        snapshot.loaded_at = time.time()
+
+        previous = self.snapshot
+        self.snapshot = snapshot
+        self._source_stat = source_stat
+
+        for listener in self._reload_listeners:
+            listener(previous, snapshot)
+
+    def add_reload_listener(self, listener):
+        """Call listener(old_snapshot, new_snapshot) after every catalog swap"""
+        self._reload_listeners.append(listener)
+
+    def reload_in_background(self, csv_path=None, **load_kwargs):
+        """Rebuild the catalog on a background thread and swap it in when ready.
+
+        Returns the Future of the build; if a reload is already running its
+        Future is returned instead of starting another one.
+        """
+        with self._load_lock:
+            if self._reload_future is not None and not self._reload_future.done():
+                return self._reload_future
+
+            if self._reload_executor is None:
+                self._reload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalog-reload')
+
+            csv_path = csv_path or (self.snapshot.source_path if self.snapshot is not None else 'courses.csv')
+            self._reload_future = self._reload_executor.submit(self._reload, csv_path, load_kwargs)
+            return self._reload_future
+
+    def _reload(self, csv_path, load_kwargs):
+        try:
+            snapshot = self.load_courses(csv_path, **load_kwargs)
+            self.last_reload_error = None
+            return snapshot
+        except Exception as e:
+            self.last_reload_error = f"{type(e).__name__}: {e}"
+            raise
+
+    @property
+    def reload_in_progress(self):
+        return self._reload_future is not None and not self._reload_future.done()
+
+    def reload_if_changed(self):
+        """Reload the catalog if its source file changed since the last build.
+
+        A cheap stat() check runs first; the file is only hashed when its
+        modification time or size moved. Returns True when a reload ran.
+        """
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.source_path is None:
+            return False
+
+        source_stat = self._stat(snapshot.source_path)
+        if source_stat is None or source_stat == self._source_stat:
+            return False
+
+        if file_sha256(snapshot.source_path) == snapshot.catalog_version:
+            # Touched but unchanged
+            self._source_stat = source_stat
+            return False
+
+        self._reload(snapshot.source_path, {})
+        return True
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def catalog_info(self):
+        """Snapshot version, build duration and reload state of the engine"""
+        snapshot = self.snapshot
+        info = snapshot.info() if snapshot is not None else {'version': 0}
+        info['reload_in_progress'] = self.reload_in_progress
+        info['last_reload_error'] = self.last_reload_error
+        return info
+
+    def add_courses(self, courses):
+        """Append courses (a DataFrame or list of dicts with the courses.csv columns) to the catalog"""
+        import pandas as pd
+
+        fresh_df = pd.DataFrame(courses)
+        with self._load_lock:
+            snapshot = self.ensure_loaded()
+            source_rows = np.concatenate([np.arange(len(snapshot)), np.full(len(fresh_df), -1)])
+            return self._apply_update(snapshot, source_rows, fresh_df)
+
+    def remove_courses(self, titles):
+        """Remove every course whose title is in titles"""
+        import pandas as pd
+
+        titles = set(titles)
+        with self._load_lock:
+            snapshot = self.ensure_loaded()
+            keep = ~snapshot.courses_df['title'].isin(titles).to_numpy()
+            if keep.all():
+                return snapshot
+            return self._apply_update(snapshot, np.flatnonzero(keep), pd.DataFrame(columns=snapshot.courses_df.columns))
+
+    def update_course(self, title, changes):
+        """Replace fields of the course with this title, keeping its catalog position"""
+        import pandas as pd
+
+        with self._load_lock:
+            snapshot = self.ensure_loaded()
+            positions = np.flatnonzero(snapshot.courses_df['title'].to_numpy() == title)
+            if not len(positions):
+                raise KeyError(f"Course not found: {title}")
+
+            records = snapshot.courses_df.iloc[positions].drop(columns='combined_text').to_dict('records')
+            for record in records:
+                record.update(changes)
+
+            source_rows = np.arange(len(snapshot))
+            source_rows[positions] = -1
+            return self._apply_update(snapshot, source_rows, pd.DataFrame(records))
+
+    def _apply_update(self, snapshot, source_rows, fresh_df):
+        """Build the updated snapshot next to the current one and swap it in"""
+        if len(source_rows) == 0:
+            raise ValueError("The catalog must keep at least one course")
+
+        updated = update_snapshot(snapshot, source_rows, fresh_df, self.vectorizer_template,
+                                  drift_threshold=self.refit_drift_threshold)
+        self._swap_snapshot(updated, self._source_stat)
+        return updated
+
+    def vectorizer_signature(self):
+        """JSON-friendly description of the vectorizer settings an artifact was fitted with"""
+        return vectorizer_signature(self.vectorizer_template)
+
+    def ensure_loaded(self):
+        """Load the default catalog if nothing has been loaded yet, and return the current snapshot"""
+        if self.snapshot is None:
+            with self._load_lock:
+                if self.snapshot is None:
+                    self.load_courses()
+        return self.snapshot
+
+    def warm_up(self, user_profile=None):
+        """Load the catalog if needed and score one profile, so the first real request finds everything built"""
+        catalog = self.ensure_loaded()
+        self.recommend_courses(user_profile or WARMUP_PROFILE, top_k=1)
+        return catalog
+
+    def filter_courses(self, **filters):
+        """Sorted positions of courses matching every filter in the current snapshot"""
+        return self.ensure_loaded().filter_courses(**filters)
+
+    def page_courses(self, after=-1, limit=100, **filters):
+        """Return (positions, total, next_cursor) for a cursor-paginated catalog listing"""
+        return self.ensure_loaded().page_courses(after, limit, **filters)
+
+    def course_records(self, positions):
+        """Catalog rows at the given positions as plain dicts"""
+        return self.ensure_loaded().course_records(positions)
 
     def create_user_profile_text(self, user_profile):
         """Create combined text representation of user profile"""
@@ -49,9 +442,8 @@ class AlternativeMatchingEngine:
 
     def calculate_level_match(self, user_level, course_level):
         """Calculate level compatibility score"""
-        level_mapping = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
-        user_lvl = level_mapping.get(user_level.lower(), 0)
-        course_lvl = level_mapping.get(course_level.lower(), 0)
+        user_lvl = LEVEL_MAPPING.get(user_level.lower(), 0)
+        course_lvl = LEVEL_MAPPING.get(course_level.lower(), 0)
 
         # Penalize recommending advanced courses to beginners
         if course_lvl - user_lvl > 1:
@@ -61,23 +453,60 @@ class AlternativeMatchingEngine:
         else:
             return 1.0  # Good match
 
-    def calculate_prerequisite_match(self, user_skills, course_prerequisites):
+    def calculate_level_scores(self, user_level, catalog=None):
+        """Calculate level compatibility scores for every course at once"""
+        catalog = catalog if catalog is not None else self.ensure_loaded()
+        user_lvl = LEVEL_MAPPING.get(user_level.lower(), 0)
+        level_gap = catalog.level_codes.astype(np.int64) - user_lvl
+
+        return self._level_scores_from_gap(level_gap)
+
+    @staticmethod
+    def _level_scores_from_gap(level_gap):
+        """Map course level minus user level to the level match score"""
+        return np.select([level_gap > 1, level_gap == 1], [0.3, 0.7], default=1.0)
+
+    def analyze_profile(self, user_profile, catalog=None):
+        """Build the per-request skill analysis shared by recommend, timeline and rationale"""
+        with metrics.stage('analysis'):
+            return ProfileAnalysis(self, user_profile, catalog)
+
+    def calculate_prerequisite_match(self, user_skills, course_prerequisites, analysis=None):
         """Calculate how well user meets course prerequisites"""
-        if not course_prerequisites or course_prerequisites == ['none']:
-            return 1.0
+        if analysis is None:
+            analysis = self.analyze_profile({'technical_skills': user_skills})
+
+        return analysis.prerequisite_score(course_prerequisites)
+
+    def calculate_prerequisite_scores(self, user_skills, analysis=None):
+        """Calculate prerequisite coverage for every course at once"""
+        if analysis is None:
+            self.ensure_loaded()
+            analysis = self.analyze_profile({'technical_skills': user_skills})
+        catalog = analysis.catalog
+
+        prereq_met = catalog.prereq_matrix @ analysis.covered_mask()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coverage = prereq_met / catalog.prereq_counts
+
+        return np.where(catalog.prereq_free, 1.0, coverage)
 
-        user_skills_lower = [skill.lower() for skill in user_skills]
-        prereq_met = 0
+    def calculate_domain_bonus(self, target_domain, catalog=None):
+        """Calculate the target domain bonus for every course at once"""
+        catalog = catalog if catalog is not None else self.ensure_loaded()
+        return self._domain_bonus_by_value(target_domain, catalog)[catalog.domain_codes]
 
-        for prereq in course_prerequisites:
-            prereq_lower = prereq.lower().strip()
-            # Check if user has this skill or a similar one
-            if any(prereq_lower in skill or skill in prereq_lower for skill in user_skills_lower):
-                prereq_met += 1
-            elif any(self.skill_similarity(prereq_lower, skill) > 0.7 for skill in user_skills_lower):
-                prereq_met += 1
+    @staticmethod
+    def _domain_bonus_by_value(target_domain, catalog):
+        """Domain bonus for each distinct catalog domain"""
+        if not target_domain:
+            return np.ones(len(catalog.domain_values), dtype=np.float64)
 
-        return prereq_met / len(course_prerequisites) if course_prerequisites else 1.0
+        target_lower = target_domain.lower()
+        return np.array(
+            [1.2 if target_lower in domain else 1.0 for domain in catalog.domain_values],
+            dtype=np.float64
+        )
 
     def skill_similarity(self, skill1, skill2):
         """Calculate similarity between two skills"""
@@ -101,20 +530,93 @@ class AlternativeMatchingEngine:
 
         return 0.0
 
-    def recommend_courses(self, user_profile, top_k=10):
-        """Generate course recommendations for user profile"""
-        if self.courses_df is None:
-            self.load_courses()
+    def recommend_courses(self, user_profile, top_k=10, scoring_mode=None, analysis=None, diversity_lambda=None):
+        """Generate course recommendations for user profile.
+
+        Unless diversity_lambda (default: the engine's) is 1.0, a pool of the
+        best courses by fit score is re-ranked with MMR (see diversity.py).
+        Profiles with constraints (see constraints.py) are scored against the
+        courses meeting them only, whatever the scoring mode.
+        """
+        self.ensure_loaded()
+        if analysis is None or analysis.catalog is None:
+            analysis = self.analyze_profile(user_profile)
+        diversity_lambda = self.diversity_lambda if diversity_lambda is None else diversity_lambda
+        pool_size = candidate_pool_size(top_k, diversity_lambda)
+
+        positions = self.constrained_positions(analysis.catalog, user_profile)
+        if positions is None:
+            recommendations = self._score_profile(user_profile, pool_size, scoring_mode, analysis)
+        else:
+            recommendations = self._score_constrained(user_profile, positions, pool_size, analysis)
+        return self.diversify(analysis.catalog, recommendations, top_k, diversity_lambda)
+
+    @staticmethod
+    def constrained_positions(catalog, user_profile):
+        """Sorted positions of the courses meeting the profile's constraints, or None when it has none"""
+        constraints = CourseConstraints.from_profile(user_profile)
+        if constraints is None:
+            return None
+        with metrics.stage('constraints'):
+            return constraints.positions(catalog)
+
+    def _score_constrained(self, user_profile, positions, top_k, analysis):
+        """Top-k courses by fit score among the courses at positions"""
+        catalog = analysis.catalog
+        analysis.retrieval_stats = {'candidates': len(positions), 'exact': True}
+        if not len(positions) or top_k <= 0:
+            return []
 
-        user_text = self.create_user_profile_text(user_profile)
-        user_vector = self.vectorizer.transform([user_text])
+        similarities = self._similarities_at(user_profile, positions, analysis)
+        user_lvl = LEVEL_MAPPING.get(user_profile.get('level', 'beginner').lower(), 0)
+        bonus_by_value = self._domain_bonus_by_value(user_profile.get('target_domain'), catalog)
+        with metrics.stage('scoring'):
+            scored = self._score_positions(catalog, positions, similarities, user_lvl, bonus_by_value, analysis)
+            return self._top_k_records(catalog, scored, top_k)
+
+    def _similarities_at(self, user_profile, positions, analysis):
+        """Cosine similarity of the profile with the courses at positions"""
+        catalog = analysis.catalog
+        with metrics.stage('profile_text'):
+            user_text = self.create_user_profile_text(user_profile)
+        with metrics.stage('vectorize'):
+            user_vector = catalog.profile_vectorizer().transform([user_text])
+        with metrics.stage('similarity'):
+            return catalog.cosine_similarities(user_vector, positions)[0]
+
+    def _score_profile(self, user_profile, top_k, scoring_mode, analysis):
+        """Top-k courses by fit score for one analyzed profile"""
+        # Everything below reads the snapshot the analysis is pinned to
+        catalog = analysis.catalog
+
+        with metrics.stage('profile_text'):
+            user_text = self.create_user_profile_text(user_profile)
+        with metrics.stage('vectorize'):
+            user_vector = catalog.profile_vectorizer().transform([user_text])
+
+        scoring_mode = scoring_mode or self.scoring_mode
+        if scoring_mode == 'pruned':
+            with metrics.stage('pruned_scoring'):
+                return self._recommend_pruned(user_profile, user_vector, top_k, analysis)
 
         # Calculate cosine similarity
-        similarities = cosine_similarity(user_vector, self.tfidf_matrix)[0]
+        with metrics.stage('similarity'):
+            similarities = catalog.cosine_similarities(user_vector)[0]
+
+        if scoring_mode == 'vectorized':
+            with metrics.stage('scoring'):
+                return self._recommend_vectorized(user_profile, similarities, top_k, analysis)
+
+        with metrics.stage('scoring'):
+            return self._recommend_loop(user_profile, similarities, top_k, analysis)
+
+    def _recommend_loop(self, user_profile, similarities, top_k, analysis):
+        """Original row-by-row scoring, kept as the reference implementation"""
+        catalog = analysis.catalog
 
         recommendations = []
 
-        for idx, course in self.courses_df.iterrows():
+        for idx, course in catalog.courses_df.iterrows():
             # Calculate various matching scores
             similarity_score = similarities[idx]
             level_score = self.calculate_level_match(
@@ -123,7 +625,8 @@ class AlternativeMatchingEngine:
             )
             prerequisite_score = self.calculate_prerequisite_match(
                 user_profile.get('technical_skills', []),
-                course['prerequisites']
+                course['prerequisites'],
+                analysis
             )
 
             # Domain matching bonus
@@ -162,53 +665,443 @@ class AlternativeMatchingEngine:
 
         return recommendations[:top_k]
 
-    def generate_learning_timeline(self, recommendations, user_profile):
-        """Generate short-term and long-term learning plan"""
-        short_term = []
-        long_term = []
-
-        user_level = user_profile.get('level', 'beginner')
-        user_skills = set(skill.lower() for skill in user_profile.get('technical_skills', []))
-
-        for course in recommendations:
-            course_level = course['level']
-            prerequisites_met = all(
-                any(self.skill_similarity(prereq, user_skill) > 0.7
-                    for user_skill in user_skills)
-                for prereq in course['prerequisites'] if prereq != 'none'
-            )
+    def _recommend_vectorized(self, user_profile, similarities, top_k, analysis):
+        """Score the whole catalog with array operations and select the top-k"""
+        catalog = analysis.catalog
+        level_scores = self.calculate_level_scores(user_profile.get('level', 'beginner'), catalog)
+        prerequisite_scores = self.calculate_prerequisite_scores(
+            user_profile.get('technical_skills', []), analysis
+        )
+        domain_bonus = self.calculate_domain_bonus(user_profile.get('target_domain'), catalog)
+
+        # Same weighted average and evaluation order as the row-by-row loop
+        combined_scores = (
+                                  0.5 * similarities +
+                                  0.25 * level_scores +
+                                  0.25 * prerequisite_scores
+                          ) * domain_bonus
+        fit_scores = np.minimum(100, (combined_scores * 100).astype(np.int64))
+
+        top_indices = self._select_top_k(fit_scores, top_k)
+
+        return [
+            self._course_record(catalog, idx, fit_scores[idx], similarities[idx],
+                                level_scores[idx], prerequisite_scores[idx])
+            for idx in top_indices
+        ]
+
+    def _recommend_pruned(self, user_profile, user_vector, top_k, analysis):
+        """Score only courses whose fit score upper bound can still reach the top-k.
+
+        Candidates come from the catalog's CandidateIndex. They are scored
+        exactly in descending order of their bounds until the next bound
+        cannot beat the current k-th best, so the result matches exhaustive
+        scoring unless max_candidates runs out first.
+        """
+        catalog = analysis.catalog
+        index = catalog.candidate_index()
+        n_courses = len(catalog)
+        user_lvl = LEVEL_MAPPING.get(user_profile.get('level', 'beginner').lower(), 0)
+        bonus_by_value = self._domain_bonus_by_value(user_profile.get('target_domain'), catalog)
+
+        def bound_keys(fit_bounds, positions):
+            # Same (score, catalog position) ordering as _select_top_k
+            return fit_bounds * n_courses + (n_courses - 1 - positions)
+
+        # Stage one: courses sharing a term or a covered prerequisite with the
+        # profile, bounded with prerequisite coverage taken as complete
+        term_mask, similarity_bounds = index.term_matches(user_vector)
+        prereq_mask = index.prereq_matches(analysis.covered_ids)
+        matched_mask = term_mask | prereq_mask
+        matched = np.flatnonzero(matched_mask)
+
+        prereq_bounds = (catalog.prereq_free[matched] | prereq_mask[matched]).astype(np.float64)
+        level_bounds = self._level_scores_from_gap(catalog.level_codes[matched].astype(np.int64) - user_lvl)
+        matched_bounds = (
+                                 0.5 * similarity_bounds[matched] +
+                                 0.25 * level_bounds +
+                                 0.25 * prereq_bounds
+                         ) * bonus_by_value[catalog.domain_codes[matched]]
+        matched_keys = bound_keys(bound_fit_scores(matched_bounds), matched)
+
+        # At most max_candidates matched courses can be scored; the best key
+        # among the rest only decides whether the result is exact
+        overflow_key = -1
+        if len(matched) > self.max_candidates:
+            top = np.argpartition(-matched_keys, self.max_candidates - 1)
+            overflow_key = int(matched_keys[top[self.max_candidates:]].max())
+            top = top[:self.max_candidates]
+            matched, matched_keys = matched[top], matched_keys[top]
+        order = np.argsort(-matched_keys)
+        queue, queue_keys = matched[order], matched_keys[order]
+
+        # Every other course scores exactly its group's bound: no similarity,
+        # and prerequisite coverage is 1 if it has none and 0 otherwise
+        group_bounds = bound_fit_scores((
+                                                0.25 * self._level_scores_from_gap(index.group_level_codes - user_lvl) +
+                                                0.25 * index.group_prereq_free
+                                        ) * bonus_by_value[index.group_domain_codes])
+        group_members = {}
+        group_heap = [(-int(bound_keys(bound, positions[0])), group)
+                      for group, (bound, positions) in enumerate(zip(group_bounds, index.group_positions))]
+        heapq.heapify(group_heap)
+
+        # Stage two: exact scores in descending bound order
+        scored = []
+        kth_key = 21 * n_courses - 1  # fit_score must exceed 20
+        budget = self.max_candidates
+        cursor = 0
+        exact = True
+        while True:
+            next_match = int(queue_keys[cursor]) if cursor < len(queue) else overflow_key
+            next_group = -group_heap[0][0] if group_heap else -1
+            if max(next_match, next_group) <= kth_key:
+                break
+            if budget <= 0 or (cursor >= len(queue) and next_match > next_group):
+                # Out of budget, or only matched courses beyond max_candidates remain
+                exact = False
+                break
+
+            matched_batch = cursor < len(queue) and next_match >= next_group
+            if matched_batch:
+                # A group can share its first course's key with a matched course,
+                # hence next_group - 1
+                stop = cursor + int(np.count_nonzero(queue_keys[cursor:] > max(next_group - 1, kth_key)))
+                batch = queue[cursor:min(stop, cursor + budget)]
+                cursor += len(batch)
+            else:
+                _, group = heapq.heappop(group_heap)
+                members = group_members.get(group)
+                if members is None:
+                    members = index.group_positions[group]
+                    members = members[~matched_mask[members]]
+                batch, members = members[:budget], members[budget:]
+                group_members[group] = members
+                if len(members):
+                    heapq.heappush(group_heap, (-int(bound_keys(group_bounds[group], members[0])), group))
+
+            budget -= len(batch)
+            if len(batch):
+                similarities = (catalog.cosine_similarities(user_vector, batch)[0]
+                                if matched_batch else None)
+                scored.append(self._score_positions(catalog, batch, similarities, user_lvl, bonus_by_value,
+                                                    analysis))
+                fit_scores = np.concatenate([batch_scores[1] for batch_scores in scored])
+                positions = np.concatenate([batch_scores[0] for batch_scores in scored])
+                keys = bound_keys(fit_scores, positions)
+                if len(keys) >= top_k > 0:
+                    kth_key = max(kth_key, int(np.partition(keys, len(keys) - top_k)[len(keys) - top_k]))
+
+        analysis.retrieval_stats = {'candidates': self.max_candidates - budget, 'exact': exact}
+        if not scored:
+            return []
+
+        return self._top_k_records(catalog, [np.concatenate(column) for column in zip(*scored)], top_k)
+
+    def _score_positions(self, catalog, positions, similarities, user_lvl, bonus_by_value, analysis):
+        """Exact scores of the courses at positions, computed like _recommend_vectorized.
+
+        similarities is None for courses known to share no term and no covered
+        prerequisite with the profile, whose similarity and prerequisite
+        coverage are exactly 0 (coverage is 1 for courses without prerequisites).
+        """
+        level_scores = self._level_scores_from_gap(catalog.level_codes[positions].astype(np.int64) - user_lvl)
+
+        if similarities is None:
+            similarities = np.zeros(len(positions))
+            coverage = 0.0
+        else:
+            prereq_met = catalog.prereq_matrix[positions] @ analysis.covered_mask()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                coverage = prereq_met / catalog.prereq_counts[positions]
+        prerequisite_scores = np.where(catalog.prereq_free[positions], 1.0, coverage)
+
+        domain_bonus = bonus_by_value[catalog.domain_codes[positions]]
+        combined_scores = (
+                                  0.5 * similarities +
+                                  0.25 * level_scores +
+                                  0.25 * prerequisite_scores
+                          ) * domain_bonus
+        fit_scores = np.minimum(100, (combined_scores * 100).astype(np.int64))
+
+        return positions, fit_scores, similarities, level_scores, prerequisite_scores
+
+    def _top_k_records(self, catalog, scored, top_k):
+        """Recommendations for the top-k of courses scored by _score_positions"""
+        positions, fit_scores, similarities, level_scores, prerequisite_scores = scored
+        # Same (score, catalog position) ordering as _select_top_k
+        n_courses = len(catalog)
+        keys = fit_scores * n_courses + (n_courses - 1 - positions)
+        top = [row for row in np.argsort(-keys)[:max(top_k, 0)] if fit_scores[row] > 20]
+
+        return [
+            self._course_record(catalog, positions[row], fit_scores[row], similarities[row],
+                                level_scores[row], prerequisite_scores[row])
+            for row in top
+        ]
+
+    @staticmethod
+    def _course_record(catalog, idx, fit_score, similarity_score, level_score, prerequisite_score):
+        """Recommendation for the course at catalog position idx.
+
+        A read-only CourseView over the snapshot's course store, with the same
+        keys and values as the original per-course dict.
+        """
+        return catalog.course_store().view(idx, fit_score, similarity_score, level_score, prerequisite_score)
+
+    def recommend_courses_batch(self, user_profiles, top_k=10, analyses=None, chunk_size=256, diversity_lambda=None):
+        """Generate course recommendations for many user profiles at once.
 
-            # Short-term: beginner level or prerequisites fully met
-            if (course_level == 'beginner' or
-                    (prerequisites_met and course_level in ['beginner', 'intermediate'])):
-                short_term.append(course)
+        Returns one recommendation list per profile, identical to calling
+        recommend_courses on each.
+        """
+        catalog = self.ensure_loaded()
+        if analyses is None:
+            analyses = [None] * len(user_profiles)
+        # Score every profile against one snapshot; analyses pinned to an
+        # older snapshot are rebuilt
+        analyses = [
+            analysis if analysis is not None and analysis.catalog is catalog
+            else self.analyze_profile(profile, catalog)
+            for profile, analysis in zip(user_profiles, analyses)
+        ]
+        diversity_lambda = self.diversity_lambda if diversity_lambda is None else diversity_lambda
+        pool_size = candidate_pool_size(top_k, diversity_lambda)
+
+        # Constrained profiles are scored one by one against their own
+        # courses, the rest together
+        results = [None] * len(user_profiles)
+        unconstrained = []
+        for idx, (profile, analysis) in enumerate(zip(user_profiles, analyses)):
+            positions = self.constrained_positions(catalog, profile)
+            if positions is None:
+                unconstrained.append(idx)
             else:
-                long_term.append(course)
+                results[idx] = self._score_constrained(profile, positions, pool_size, analysis)
+        scored = self._score_batch(catalog, [user_profiles[idx] for idx in unconstrained],
+                                   [analyses[idx] for idx in unconstrained], pool_size, chunk_size)
+        for idx, recommendations in zip(unconstrained, scored):
+            results[idx] = recommendations
+        return [self.diversify(catalog, recommendations, top_k, diversity_lambda) for recommendations in results]
+
+    def _score_batch(self, catalog, user_profiles, analyses, top_k, chunk_size):
+        """Top-k courses by fit score for each analyzed profile.
+
+        Profiles are scored in chunks with one vectorizer transform and one
+        sparse similarity product per chunk.
+        """
+        # Keep the profiles x courses score matrices within a fixed budget
+        n_courses = max(len(catalog), 1)
+        rows_per_chunk = max(1, min(chunk_size, BATCH_CELL_BUDGET // n_courses))
+
+        results = []
+        for start in range(0, len(user_profiles), rows_per_chunk):
+            end = start + rows_per_chunk
+            with metrics.stage('batch_scoring'):
+                results.extend(self._recommend_batch_chunk(catalog, user_profiles[start:end], analyses[start:end],
+                                                           top_k))
+
+        return results
+
+    def _recommend_batch_chunk(self, catalog, user_profiles, analyses, top_k):
+        """Score a chunk of profiles against the whole catalog as profiles x courses matrices"""
+        user_texts = [self.create_user_profile_text(profile) for profile in user_profiles]
+        user_matrix = catalog.profile_vectorizer().transform(user_texts)
+
+        # Profiles x courses cosine similarity in a single sparse product
+        similarities = catalog.cosine_similarities(user_matrix)
+
+        user_levels = np.array(
+            [LEVEL_MAPPING.get(profile.get('level', 'beginner').lower(), 0) for profile in user_profiles],
+            dtype=np.int64
+        )
+        level_scores = self._level_scores_from_gap(
+            catalog.level_codes.astype(np.int64)[np.newaxis, :] - user_levels[:, np.newaxis]
+        )
+
+        covered = np.vstack([analysis.covered_mask() for analysis in analyses])
+        prereq_met = (catalog.prereq_matrix @ covered.T).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coverage = prereq_met / catalog.prereq_counts
+        prerequisite_scores = np.where(catalog.prereq_free, 1.0, coverage)
+
+        domain_bonus = np.vstack([
+            self._domain_bonus_by_value(profile.get('target_domain'), catalog) for profile in user_profiles
+        ])[:, catalog.domain_codes]
+
+        # Same weighted average and evaluation order as the row-by-row loop
+        combined_scores = (
+                                  0.5 * similarities +
+                                  0.25 * level_scores +
+                                  0.25 * prerequisite_scores
+                          ) * domain_bonus
+        fit_scores = np.minimum(100, (combined_scores * 100).astype(np.int64))
+
+        results = []
+        for row, top_indices in enumerate(self._select_top_k_rows(fit_scores, top_k)):
+            results.append([
+                self._course_record(catalog, idx, fit_scores[row, idx], similarities[row, idx],
+                                    level_scores[row, idx], prerequisite_scores[row, idx])
+                for idx in top_indices
+            ])
+
+        return results
+
+    def diversify(self, catalog, recommendations, top_k, diversity_lambda=None):
+        """Re-rank recommendations (best-first by fit score) with MMR and keep top_k"""
+        diversity_lambda = self.diversity_lambda if diversity_lambda is None else diversity_lambda
+        if diversity_lambda >= 1.0 or len(recommendations) <= 1:
+            return recommendations[:top_k]
+
+        with metrics.stage('diversity'):
+            positions = np.array([self._course_position(catalog, course) for course in recommendations])
+            relevance = np.array([course['fit_score'] for course in recommendations]) / 100
+            rows, _ = catalog.normalized_tfidf()
+            similarity = similarity_block(rows, positions, catalog.domain_codes,
+                                          np.asarray(catalog.course_store().codes['provider']))
+            order = mmr_order(relevance, similarity, top_k, diversity_lambda)
+        return [recommendations[idx] for idx in order]
+
+    @staticmethod
+    def _select_top_k(fit_scores, top_k, threshold=20):
+        """Indices of the top-k scores above threshold, in stable descending order"""
+        candidates = np.flatnonzero(fit_scores > threshold)
+        if top_k <= 0 or len(candidates) == 0:
+            return candidates[:0]
+
+        # Encode (score, catalog position) into one unique key so ties break
+        # by catalog order exactly like a stable sort
+        n_courses = len(fit_scores)
+        keys = fit_scores[candidates].astype(np.int64) * n_courses + (n_courses - 1 - candidates)
+
+        if len(candidates) > top_k:
+            selected = np.argpartition(-keys, top_k - 1)[:top_k]
+            candidates = candidates[selected]
+            keys = keys[selected]
+
+        return candidates[np.argsort(-keys)]
+
+    @staticmethod
+    def _select_top_k_rows(fit_scores, top_k, threshold=20):
+        """Row-wise version of _select_top_k for a profiles x courses score matrix"""
+        n_rows, n_courses = fit_scores.shape
+        k = min(top_k, n_courses)
+        if k <= 0:
+            return [np.empty(0, dtype=np.intp) for _ in range(n_rows)]
 
-        return {
-            'short_term': short_term[:3],  # Next 1-3 months
-            'long_term': long_term[:5]  # Next 3-12 months
-        }
+        keys = fit_scores.astype(np.int64) * n_courses + (n_courses - 1 - np.arange(n_courses))
+        keys[fit_scores <= threshold] = -1
 
-    def generate_rationale(self, course, user_profile):
+        if k < n_courses:
+            top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n_courses), keys.shape)
+        top_keys = np.take_along_axis(keys, top, axis=1)
+
+        order = np.argsort(-top_keys, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_keys = np.take_along_axis(top_keys, order, axis=1)
+
+        return [row[row_keys >= 0] for row, row_keys in zip(top, top_keys)]
+
+    def generate_learning_timeline(self, recommendations, user_profile, analysis=None):
+        """Generate short-term and long-term learning plan"""
+        with metrics.stage('timeline'):
+            if analysis is None:
+                analysis = self.analyze_profile(user_profile)
+
+            short_term = []
+            long_term = []
+
+            for course in recommendations:
+                course_level = course['level']
+                prerequisites_met = not analysis.missing_prerequisites(course['prerequisites'])
+
+                # Short-term: beginner level or prerequisites fully met
+                if (course_level == 'beginner' or
+                        (prerequisites_met and course_level in ['beginner', 'intermediate'])):
+                    short_term.append(course)
+                else:
+                    long_term.append(course)
+
+            return {
+                'short_term': short_term[:3],  # Next 1-3 months
+                'long_term': long_term[:5]  # Next 3-12 months
+            }
+
+    def plan_learning_path(self, user_profile, recommendations=None, analysis=None, max_targets=3):
+        """Plan an ordered, prerequisite-aware multi-month path toward the target domain.
+
+        The targets are the best recommendations in the target domain, or the
+        best overall when none match. Courses teaching the prerequisites they
+        still lack are chained in front of them, cheapest path first.
+        """
+        self.ensure_loaded()
+        if analysis is None or analysis.catalog is None:
+            analysis = self.analyze_profile(user_profile)
+        catalog = analysis.catalog
+
+        if recommendations is None:
+            recommendations = self.recommend_courses(user_profile, analysis=analysis)
+
+        with metrics.stage('learning_path'):
+            positions = np.array([self._course_position(catalog, course) for course in recommendations],
+                                 dtype=np.intp)
+            bonus_by_value = self._domain_bonus_by_value(user_profile.get('target_domain'), catalog)
+            in_domain = positions[bonus_by_value[catalog.domain_codes[positions]] > 1.0]
+            targets = (in_domain if len(in_domain) else positions)[:max_targets]
+
+            graph = catalog.dependency_graph()
+            steps, unreachable = graph.plan(analysis.covered_ids, targets.tolist())
+            plan = graph.schedule(steps, unreachable)
+            plan['target_domain'] = user_profile.get('target_domain')
+            return plan
+
+    @staticmethod
+    def _course_position(catalog, course):
+        """Catalog position of a recommended course"""
+        if isinstance(course, CourseView):
+            return course.position
+        matches = np.flatnonzero(catalog.courses_df['title'].to_numpy() == course['title'])
+        if not len(matches):
+            raise KeyError(f"Course not found: {course['title']}")
+        return int(matches[0])
+
+    def generate_rationale(self, course, user_profile, analysis=None):
         """Generate explanation for why course is recommended"""
-        user_skills = user_profile.get('technical_skills', [])
-        course_skills = course['skill_tags']
+        return self.generate_rationales([course], user_profile, analysis)[0]
 
-        # Find matching skills
-        matching_skills = []
-        for user_skill in user_skills:
-            for course_skill in course_skills:
-                if self.skill_similarity(user_skill, course_skill) > 0.6:
-                    matching_skills.append(course_skill)
-
-        # Find missing prerequisites
-        missing_prereqs = []
-        user_skills_lower = [skill.lower() for skill in user_skills]
-        for prereq in course['prerequisites']:
-            if prereq != 'none' and not any(
-                    self.skill_similarity(prereq, user_skill) > 0.7 for user_skill in user_skills_lower):
-                missing_prereqs.append(prereq)
+    def generate_rationales(self, courses, user_profile, analysis=None):
+        """Explanations for many courses, one per course.
+
+        Recommendations read from the analysis's catalog are filled into the
+        catalog's precompiled rationale templates in one pass; plain dicts
+        are built one at a time.
+        """
+        if analysis is None:
+            analysis = self.analyze_profile(user_profile)
+
+        with metrics.stage('rationale'):
+            catalog = analysis.catalog
+            store = catalog.course_store() if catalog is not None else None
+            templated = [idx for idx, course in enumerate(courses)
+                         if isinstance(course, CourseView) and course.store is store]
+
+            rationales = [None] * len(courses)
+            if templated:
+                rendered = analysis.rendered_rationales([courses[idx].position for idx in templated])
+                for idx, rationale in zip(templated, rendered):
+                    rationales[idx] = rationale
+            for idx, course in enumerate(courses):
+                if rationales[idx] is None:
+                    rationales[idx] = analysis.cached_rationale(course, lambda: self._build_rationale(course, analysis))
+            return rationales
+
+    def _build_rationale(self, course, analysis):
+        """Render the rationale text from the shared profile analysis"""
+        # Find matching skills and missing prerequisites
+        matching_skills = analysis.matched_skills(course['skill_tags'])
+        missing_prereqs = analysis.missing_prerequisites(course['prerequisites'])
 
         rationale_parts = []
 
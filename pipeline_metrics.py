@@ -0,0 +1,148 @@
+# pipeline_metrics.py
+"""Latency histograms for the stages of the recommendation pipeline.
+
+Code wraps each stage in ``metrics.stage(name)``; durations are aggregated
+into fixed-bucket histograms and rendered in the Prometheus text format by
+the backend's ``/metrics`` endpoint. With ``RECOMMENDER_METRICS=0`` spans are
+a shared no-op context manager, so instrumented code pays one attribute
+check per stage.
+
+Histograms are per process: with the process scoring executor, the engine
+stages are recorded inside the workers and only the backend's own stages
+reach the parent's ``/metrics``.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_DISABLED_SPAN = nullcontext()
+
+
+class Histogram:
+    """Bucketed observation counts with their sum"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class _Span:
+    """Times one stage and records it on exit"""
+
+    __slots__ = ('registry', 'name', 'started')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    """Per-stage latency histograms"""
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Registry enabled unless RECOMMENDER_METRICS is 0/false/off"""
+        value = os.environ.get('RECOMMENDER_METRICS', '1').lower()
+        return cls(enabled=value not in ('0', 'false', 'off', 'no'))
+
+    def stage(self, name):
+        """Context manager timing one pipeline stage"""
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return _Span(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Copy of the histograms by stage name"""
+        with self._lock:
+            copies = {}
+            for name, histogram in self._histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+                copies[name] = copy
+            return copies
+
+    def render(self, gauges=None, prefix='recommender'):
+        """Prometheus text exposition of the stage histograms plus extra gauges.
+
+        gauges maps metric name (without prefix) to (help text, value).
+        """
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each recommendation pipeline stage",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, histogram in sorted(self.snapshot().items()):
+            label = _escape_label(name)
+            for bound, count in histogram.cumulative_counts():
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{label}",le="{_format_bound(bound)}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {histogram.sum!r}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {histogram.count}')
+
+        for name, (help_text, value) in (gauges or {}).items():
+            kind = 'counter' if name.endswith('_total') else 'gauge'
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {float(value)!r}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process-wide registry used by the engine and the backend
+metrics = MetricsRegistry.from_env()
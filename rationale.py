@@ -0,0 +1,138 @@
+# rationale.py
+"""Precompiled per-course rationale templates.
+
+A rationale reads "Matches your skills in A, B. Will help you learn C, D.
+Level: X. Duration: Y. Cost: Z." Only the first two sentences depend on the
+user. ``RationaleTemplates`` is built once per catalog snapshot. It renders
+each distinct level/duration/cost suffix once, and maps every prerequisite
+and skill tag string of the course store to its skill vocabulary id. For a
+request, ``render`` looks up the matched skills and missing prerequisites
+of all requested courses at once, against the profile's skill masks. Work
+grows with the number of rationales produced, not with user skills x tags
+per course.
+
+The text is identical to ``AlternativeMatchingEngine._build_rationale``,
+which remains the path for courses that are plain dicts.
+"""
+import numpy as np
+
+# Same threshold ProfileAnalysis.matched_skills uses
+SKILL_MATCH_THRESHOLD = 0.6
+
+# At most this many matched skills and missing prerequisites are named
+MAX_NAMED = 2
+
+
+def _gather_segments(ids, offsets, positions):
+    """Ids of the CSR segments at positions, concatenated, and the index of the position owning each"""
+    starts = np.asarray(offsets[positions], dtype=np.int64)
+    lengths = np.asarray(offsets[positions + 1], dtype=np.int64) - starts
+    flat = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return np.asarray(ids[flat], dtype=np.int64), np.repeat(np.arange(len(positions)), lengths)
+
+
+def _first_per_owner(owners, limit=MAX_NAMED):
+    """Mask of the first `limit` entries of each run of equal owners"""
+    if not len(owners):
+        return np.zeros(0, dtype=bool)
+    index = np.arange(len(owners))
+    run_start = np.r_[True, owners[1:] != owners[:-1]]
+    return index - np.maximum.accumulate(np.where(run_start, index, 0)) < limit
+
+
+class RationaleTemplates:
+    """Per-course rationale suffixes and skill lookups of one catalog snapshot"""
+
+    def __init__(self, catalog):
+        store = catalog.course_store()
+        vocab = catalog.skill_vocab
+        self.store = store
+
+        # One suffix per distinct (level, duration, cost) combination
+        level, duration, cost = (np.asarray(store.codes[column], dtype=np.int64) + 1
+                                 for column in ('level', 'duration', 'cost'))
+        combined = (level * (len(store.categories['duration']) + 1) + duration) * (len(store.categories['cost']) + 1) + cost
+        combinations, self.suffix_ids = np.unique(combined, return_inverse=True)
+        first_positions = np.zeros(len(combinations), dtype=np.int64)
+        first_positions[self.suffix_ids[::-1]] = np.arange(len(combined))[::-1]
+        self.suffixes = [self._suffix(position) for position in first_positions.tolist()]
+
+        # Vocabulary id of every list string, lowercased (-1 if not in the vocabulary)
+        strings = store.list_strings
+        self.strings = strings
+        lowered = [strings[idx].lower() for idx in range(len(strings))]
+        self.lowered = lowered
+        self.string_skill_ids = np.array([vocab.skill_ids.get(value, -1) for value in lowered], dtype=np.int64)
+        self.string_is_none = np.array([strings[idx] == 'none' for idx in range(len(strings))], dtype=bool)
+
+    def _suffix(self, position):
+        store = self.store
+        return (f"Level: {store.value('level', position).title()}. Duration: {store.value('duration', position)}. "
+                f"Cost: {store.value('cost', position).title()}.")
+
+    def render(self, positions, analysis):
+        """Rationales of the courses at positions for one analyzed profile"""
+        positions = np.asarray(positions, dtype=np.int64)
+        matched = self._matched_skills(positions, analysis)
+        missing = self._missing_prerequisites(positions, analysis)
+
+        rationales = []
+        for matched_skills, missing_prereqs, suffix_id in zip(matched, missing, self.suffix_ids[positions].tolist()):
+            parts = []
+            if matched_skills:
+                parts.append(f"Matches your skills in {', '.join(set(matched_skills))}")
+            if missing_prereqs:
+                parts.append(f"Will help you learn {', '.join(missing_prereqs)}")
+            else:
+                parts.append("Builds directly on your current skills")
+            rationales.append(". ".join(parts) + ". " + self.suffixes[suffix_id])
+        return rationales
+
+    def _named_strings(self, string_ids, owners, keep, n_positions):
+        """Lists of the kept strings per position"""
+        named = [[] for _ in range(n_positions)]
+        strings = self.strings
+        for owner, string_id in zip(owners[keep].tolist(), string_ids[keep].tolist()):
+            named[owner].append(strings[string_id])
+        return named
+
+    def _matched_skills(self, positions, analysis):
+        """Per position, its first two skill tags related to a user skill, in user-skill order"""
+        string_ids, owners = _gather_segments(self.store.list_ids['skill_tags'],
+                                              self.store.list_offsets['skill_tags'], positions)
+        related = analysis.related_skill_mask()
+        if not len(string_ids) or not len(related):
+            return [[] for _ in range(len(positions))]
+
+        # User skills x gathered tags
+        skill_ids = self.string_skill_ids[string_ids]
+        known = skill_ids >= 0
+        hits = np.zeros((len(related), len(string_ids)), dtype=bool)
+        hits[:, known] = related[:, skill_ids[known]]
+        for column in np.flatnonzero(~known).tolist():
+            # Tags outside the vocabulary fall back to pairwise comparison
+            tag = self.lowered[string_ids[column]]
+            hits[:, column] = [analysis.engine.skill_similarity(skill, tag) > SKILL_MATCH_THRESHOLD
+                               for skill in analysis.skills_lower]
+
+        # Matches ordered by course, then user skill, then tag order
+        skill_rows, columns = np.nonzero(hits)
+        order = np.lexsort((columns, skill_rows, owners[columns]))
+        columns = columns[order]
+        match_owners = owners[columns]
+        return self._named_strings(string_ids[columns], match_owners, _first_per_owner(match_owners), len(positions))
+
+    def _missing_prerequisites(self, positions, analysis):
+        """Per position, its first two prerequisites (other than 'none') the user does not cover"""
+        string_ids, owners = _gather_segments(self.store.list_ids['prerequisites'],
+                                              self.store.list_offsets['prerequisites'], positions)
+        skill_ids = self.string_skill_ids[string_ids]
+        known = skill_ids >= 0
+        met = np.zeros(len(string_ids), dtype=bool)
+        met[known] = analysis.covered_mask()[skill_ids[known]] > 0
+        for idx in np.flatnonzero(~known).tolist():
+            met[idx] = analysis.prerequisite_met(self.lowered[string_ids[idx]])
+
+        missing = ~met & ~self.string_is_none[string_ids]
+        string_ids, owners = string_ids[missing], owners[missing]
+        return self._named_strings(string_ids, owners, _first_per_owner(owners), len(positions))
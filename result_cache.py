@@ -0,0 +1,195 @@
+# result_cache.py
+"""LRU + TTL cache for recommendation results keyed on a profile fingerprint.
+
+Configured through environment variables:
+
+- ``RECOMMENDER_CACHE_SIZE``: maximum entries in the local cache, 0 disables
+  caching (default 1024)
+- ``RECOMMENDER_CACHE_TTL``: entry lifetime in seconds (default 600)
+- ``RECOMMENDER_CACHE_URL``: ``redis://...`` to share the cache between
+  workers instead of keeping it in-process
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# UserProfile fields that influence recommend_courses / generate_learning_timeline
+SCORING_TEXT_FIELDS = ['education', 'major', 'target_domain', 'career_goals', 'level']
+SCORING_LIST_FIELDS = ['technical_skills', 'soft_skills', 'interests']
+# Request constraints that restrict the candidate courses (see constraints.py)
+CONSTRAINT_LIST_FIELDS = ['costs', 'levels', 'providers', 'exclude_titles']
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def profile_fingerprint(user_profile):
+    """Canonical hash of the profile fields that affect scoring.
+
+    TF-IDF, level, prerequisite and domain matching are all case-insensitive
+    and ignore list order, so text fields are lowercased and skill lists are
+    lowercased and sorted. None and '' stay distinct because the profile text
+    renders them differently. Constraints, matched case-insensitively too,
+    are only part of the hash when set, so unconstrained keys don't change.
+    """
+    canonical = {field: _lower(user_profile.get(field)) for field in SCORING_TEXT_FIELDS}
+    for field in SCORING_LIST_FIELDS:
+        canonical[field] = sorted(_lower(item) for item in user_profile.get(field) or [])
+
+    constraints = user_profile.get('constraints') or {}
+    canonical_constraints = {field: sorted({_lower(item).strip() for item in constraints.get(field) or []})
+                             for field in CONSTRAINT_LIST_FIELDS if constraints.get(field)}
+    if constraints.get('max_duration_weeks') is not None:
+        canonical_constraints['max_duration_weeks'] = float(constraints['max_duration_weeks'])
+    if canonical_constraints:
+        canonical['constraints'] = canonical_constraints
+
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def rationale_fingerprint(user_profile, scoring_key):
+    """Key for rationales, which also depend on the order of technical skills.
+
+    generate_rationale reports the first matching skills in the order the
+    user listed them, so it can't share the order-insensitive scoring key.
+    """
+    ordered = [_lower(skill) for skill in user_profile.get('technical_skills') or []]
+    payload = json.dumps(ordered, separators=(',', ':'))
+    return scoring_key + ':' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LocalCacheBackend:
+    """In-process LRU store with per-entry expiry"""
+
+    def __init__(self, max_size=1024, ttl=600, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Shared store backed by Redis, so several workers reuse each other's results.
+
+    Expiry uses Redis TTLs; size-bounded eviction is left to the server's
+    ``maxmemory-policy allkeys-lru``. Values are pickled, so only point this
+    at a trusted Redis instance.
+    """
+
+    def __init__(self, url, ttl=600, prefix='recommender:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.setex(self.prefix + key, self.ttl, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def clear(self):
+        # Entries are namespaced by catalog version, so stale ones simply
+        # stop being read and expire through their TTL
+        pass
+
+
+class ResultCache:
+    """Front end over a cache backend with hit/miss counters"""
+
+    def __init__(self, backend=None, enabled=True):
+        self.backend = backend if backend is not None else LocalCacheBackend()
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from the RECOMMENDER_CACHE_* environment variables"""
+        size = int(os.environ.get('RECOMMENDER_CACHE_SIZE', 1024))
+        ttl = float(os.environ.get('RECOMMENDER_CACHE_TTL', 600))
+        url = os.environ.get('RECOMMENDER_CACHE_URL')
+
+        if url:
+            backend = RedisCacheBackend(url, ttl=int(ttl))
+        else:
+            backend = LocalCacheBackend(max_size=size, ttl=ttl)
+        return cls(backend, enabled=size > 0)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.enabled:
+            self.backend.set(key, value)
+
+    def invalidate(self):
+        """Drop every cached result, e.g. after the catalog was reloaded"""
+        self.backend.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'size': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.backend.evictions,
+            'expirations': self.backend.expirations,
+            'invalidations': self.invalidations,
+        }
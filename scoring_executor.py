@@ -0,0 +1,116 @@
+# scoring_executor.py
+"""Run CPU-bound recommendation scoring off the asyncio event loop.
+
+Configured through environment variables:
+
+- ``RECOMMENDER_EXECUTOR``: ``thread`` (default) or ``process``
+- ``RECOMMENDER_WORKERS``: pool size (defaults to the executor's own default)
+- ``RECOMMENDER_MAX_PENDING``: maximum queued + running jobs before new
+  requests are rejected (default 32)
+- ``RECOMMENDER_RETRY_AFTER``: seconds suggested to rejected clients (default 1)
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+EXECUTOR_KINDS = ('thread', 'process')
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the scoring queue is full"""
+
+
+class ScoringExecutor:
+    """Bounded thread or process pool for scoring jobs.
+
+    In process mode ``initializer`` runs once in every child, which is where
+    the matching engine is preloaded. The pool is created on first use so
+    importing the backend never forks.
+    """
+
+    def __init__(self, kind='thread', max_workers=None, max_pending=32, retry_after=1,
+                 initializer=None, initargs=()):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind {kind!r}, expected one of {EXECUTOR_KINDS}")
+
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self._executor = None
+        # Only touched from the event loop thread
+        self._pending = 0
+
+    @classmethod
+    def from_env(cls, initializer=None, initargs=()):
+        """Build an executor from the RECOMMENDER_* environment variables"""
+        workers = os.environ.get('RECOMMENDER_WORKERS')
+        return cls(
+            kind=os.environ.get('RECOMMENDER_EXECUTOR', 'thread').lower(),
+            max_workers=int(workers) if workers else None,
+            max_pending=int(os.environ.get('RECOMMENDER_MAX_PENDING', 32)),
+            retry_after=int(os.environ.get('RECOMMENDER_RETRY_AFTER', 1)),
+            initializer=initializer,
+            initargs=initargs,
+        )
+
+    @property
+    def queue_depth(self):
+        """Number of jobs queued or running"""
+        return self._pending
+
+    @property
+    def saturated(self):
+        return self._pending >= self.max_pending
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=self.initializer,
+                    initargs=self.initargs,
+                )
+            else:
+                # Threads share the parent's engine, no preloading needed
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='scoring',
+                )
+        return self._executor
+
+    async def submit(self, fn, *args, reject=True):
+        """Run fn(*args) in the pool and await its result.
+
+        Raises ExecutorSaturated when the queue is full, unless reject is
+        False (used for follow-up chunks of an already admitted request).
+        """
+        if reject and self.saturated:
+            raise ExecutorSaturated(f"{self._pending} scoring jobs pending")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    def recycle(self, initargs=None):
+        """Replace the pool so later jobs run in freshly initialized workers.
+
+        Jobs already submitted finish in the old pool. Used in process mode
+        after a catalog reload, since each child holds its own engine.
+        """
+        if initargs is not None:
+            self.initargs = initargs
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,256 @@
+# serve.py
+"""Pre-forking server for backend.py with one shared, read-only catalog.
+
+``uvicorn backend:app --workers N`` starts N separate interpreters, and each
+one parses the catalog, fits TF-IDF and builds its indexes on its own, so
+memory grows with workers x catalog size. Here the parent process loads the
+catalog and builds every per-snapshot index once, freezes the garbage
+collector and then forks the workers:
+
+- arrays loaded from the catalog artifact are memory-mapped, so all workers
+  read the same page cache
+- everything else is inherited copy-on-write; with the collector frozen,
+  pages are only copied when a worker actually writes to them
+
+Workers accept connections on one listening socket opened by the parent.
+A worker that exits, whether it crashed or served ``--max-requests``, is
+replaced. Signals to the parent:
+
+- ``SIGHUP``: reload the catalog, then replace the workers one at a time;
+  each old worker finishes its in-flight requests before exiting
+- ``SIGTERM`` / ``SIGINT``: stop the workers gracefully and exit
+
+With ``RECOMMENDER_WATCH_CATALOG=1`` the parent polls the catalog file (every
+``RECOMMENDER_WATCH_INTERVAL`` seconds) and reloads the same way, and
+``POST /admin/reload`` on any worker signals the parent. POSIX only.
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+# Workers exiting sooner than this after starting are restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+class PreforkServer:
+    """Parent process: owns the catalog and the listening socket, and supervises the workers"""
+
+    def __init__(self, host='0.0.0.0', port=8000, workers=2, csv_path='courses.csv', max_requests=0,
+                 max_requests_jitter=0, graceful_timeout=30, log_level='info'):
+        self.host = host
+        self.port = port
+        self.n_workers = workers
+        self.csv_path = csv_path
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+
+        self.workers = {}    # pid -> start time
+        self.retiring = set()
+        self.stopping = False
+        self._reload_requested = False
+        self.backend = None
+        self.socket = None
+
+    def prepare(self):
+        """Import the backend and load the catalog, before any worker exists"""
+        import backend
+
+        self.backend = backend
+        engine = backend.matching_engine
+        # The parent watches the catalog and reloads it for every worker
+        watcher, backend.catalog_watcher = backend.catalog_watcher, None
+        self.watch_interval = watcher.interval if watcher is not None else None
+        parent_pid = os.getpid()
+        backend.catalog_reloader = lambda: os.kill(parent_pid, signal.SIGHUP)
+
+        engine.load_courses(self.csv_path)
+        self._freeze(engine.snapshot)
+
+    def _freeze(self, snapshot):
+        """Build everything workers would otherwise build lazily, then move it out of the collector's way"""
+        snapshot.candidate_index()
+        snapshot.course_store().preload()
+        snapshot.dependency_graph()
+        snapshot.rationale_templates()
+        gc.collect()
+        # Collections in a worker would touch (and so copy) every tracked
+        # object's header; frozen objects are never scanned
+        gc.freeze()
+        logger.info("Catalog %s loaded (%d courses), serving with %d workers",
+                    snapshot.catalog_version[:12], len(snapshot), self.n_workers)
+
+    def run(self):
+        self.prepare()
+        self.socket = socket.create_server((self.host, self.port), backlog=2048)
+        self.socket.set_inheritable(True)
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for _ in range(self.n_workers):
+            self.spawn()
+
+        next_check = time.monotonic() + (self.watch_interval or 0)
+        try:
+            while not self.stopping:
+                self.reap()
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.reload(force=True)
+                elif self.watch_interval is not None and time.monotonic() >= next_check:
+                    next_check = time.monotonic() + self.watch_interval
+                    self.reload(force=False)
+                time.sleep(0.2)
+        finally:
+            self.stop()
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def spawn(self):
+        """Fork one worker serving on the shared socket"""
+        max_requests = None
+        if self.max_requests:
+            # Jitter keeps workers started together from recycling together
+            max_requests = self.max_requests + random.randint(0, self.max_requests_jitter)
+
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._serve(max_requests)
+            except BaseException:
+                logger.exception("Worker %d failed", os.getpid())
+                status = 1
+            finally:
+                os._exit(status)
+
+        self.workers[pid] = time.monotonic()
+        return pid
+
+    def _serve(self, max_requests):
+        import uvicorn
+
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        random.seed()
+        config = uvicorn.Config(self.backend.app, limit_max_requests=max_requests,
+                                timeout_graceful_shutdown=self.graceful_timeout, log_level=self.log_level)
+        uvicorn.Server(config).run(sockets=[self.socket])
+
+    def reap(self):
+        """Collect exited workers and start replacements for unexpected exits"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == 0:
+                logger.info("Worker %d exited, starting a replacement", pid)
+            else:
+                logger.warning("Worker %d exited with status %d, starting a replacement", pid, exit_code)
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn()
+
+    def reload(self, force=True):
+        """Reload the catalog (if it changed, unless forced) and replace every worker"""
+        engine = self.backend.matching_engine
+        # Let the collector free the old snapshot's reference cycles
+        gc.unfreeze()
+        try:
+            if force:
+                engine.load_courses(engine.snapshot.source_path)
+                reloaded = True
+            else:
+                reloaded = engine.reload_if_changed()
+        except Exception:
+            logger.exception("Catalog reload failed, workers keep the current catalog")
+            reloaded = False
+
+        if reloaded:
+            self._freeze(engine.snapshot)
+            self.replace_workers()
+        else:
+            gc.freeze()
+
+    def replace_workers(self):
+        """Rolling restart: start each new worker before asking an old one to finish and exit"""
+        for pid in list(self.workers):
+            self.spawn()
+            self.retire(pid)
+
+    def retire(self, pid):
+        self.workers.pop(pid, None)
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.retiring.discard(pid)
+
+    def stop(self):
+        """Stop every worker, killing those still busy after the graceful timeout"""
+        self.stopping = True
+        for pid in list(self.workers):
+            self.retire(pid)
+
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.retiring and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.retiring:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        if self.socket is not None:
+            self.socket.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('RECOMMENDER_SERVE_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--catalog', default='courses.csv', help='catalog file loaded by the parent')
+    parser.add_argument('--max-requests', type=int, default=int(os.environ.get('RECOMMENDER_MAX_REQUESTS', 0)),
+                        help='replace a worker after this many requests (0 never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=0,
+                        help='random extra requests per worker, so workers are not replaced all at once')
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help='seconds an exiting worker gets to finish its requests')
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s %(process)d %(levelname)s %(message)s')
+    PreforkServer(args.host, args.port, args.workers, args.catalog, args.max_requests,
+                  args.max_requests_jitter, args.graceful_timeout, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
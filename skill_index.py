@@ -0,0 +1,139 @@
+# skill_index.py
+from functools import lru_cache
+
+import numpy as np
+
+# Substrings shorter than this are looked up in a dedicated index instead
+# of the n-gram postings
+NGRAM_SIZE = 3
+
+
+class SkillVocabulary:
+    """Canonical skill vocabulary with integer IDs and lookup indexes.
+
+    Reproduces the matching rules of ``AlternativeMatchingEngine.skill_similarity``
+    (exact match, substring in either direction, word overlap ratio) without
+    comparing a user skill against every catalog skill string.
+    """
+
+    def __init__(self, skills=(), cache_size=4096):
+        self.skills = []
+        self.skill_ids = {}
+        self._token_sets = []
+
+        # token -> skill ids containing that word (word overlap rule)
+        self.token_index = {}
+        # n-gram -> skill ids containing it, and short substring -> skill ids
+        # (the "user skill is inside catalog skill" rule)
+        self._ngram_index = {}
+        self._short_index = {}
+        self._max_length = 0
+
+        for skill in skills:
+            self.add(skill)
+
+        self.matching_ids = lru_cache(maxsize=cache_size)(self._matching_ids)
+
+    def __len__(self):
+        return len(self.skills)
+
+    def __contains__(self, skill):
+        return skill in self.skill_ids
+
+    def add(self, skill):
+        """Register a (lowercased) skill and return its ID"""
+        skill_id = self.skill_ids.get(skill)
+        if skill_id is not None:
+            return skill_id
+
+        skill_id = len(self.skills)
+        self.skills.append(skill)
+        self.skill_ids[skill] = skill_id
+
+        tokens = set(skill.split())
+        self._token_sets.append(tokens)
+        for token in tokens:
+            self.token_index.setdefault(token, []).append(skill_id)
+
+        for size in range(NGRAM_SIZE):
+            for start in range(len(skill) - size + 1):
+                self._add_posting(self._short_index, skill[start:start + size], skill_id)
+        for start in range(len(skill) - NGRAM_SIZE + 1):
+            self._add_posting(self._ngram_index, skill[start:start + NGRAM_SIZE], skill_id)
+
+        self._max_length = max(self._max_length, len(skill))
+        if hasattr(self, 'matching_ids'):
+            self.matching_ids.cache_clear()
+
+        return skill_id
+
+    @staticmethod
+    def _add_posting(index, key, skill_id):
+        postings = index.setdefault(key, [])
+        if not postings or postings[-1] != skill_id:
+            postings.append(skill_id)
+
+    def get_id(self, skill):
+        """Return the ID of a skill, or None if it is not in the vocabulary"""
+        return self.skill_ids.get(skill)
+
+    def _matching_ids(self, user_skill, overlap_threshold):
+        """IDs of vocabulary skills whose similarity to user_skill exceeds the threshold.
+
+        user_skill must already be lowercased. Equality and substring matches
+        always qualify (similarity 1.0 / 0.8); word overlap qualifies when
+        common words / max(word counts) is above overlap_threshold.
+        """
+        matches = set()
+
+        # Vocabulary skill contained in the user skill: look up every substring
+        max_length = min(len(user_skill), self._max_length)
+        for start in range(len(user_skill) + 1):
+            for end in range(start, min(start + max_length, len(user_skill)) + 1):
+                skill_id = self.skill_ids.get(user_skill[start:end])
+                if skill_id is not None:
+                    matches.add(skill_id)
+
+        # User skill contained in a vocabulary skill
+        if len(user_skill) < NGRAM_SIZE:
+            matches.update(self._short_index.get(user_skill, ()))
+        else:
+            candidates = None
+            for start in range(len(user_skill) - NGRAM_SIZE + 1):
+                postings = self._ngram_index.get(user_skill[start:start + NGRAM_SIZE])
+                if postings is None:
+                    candidates = set()
+                    break
+                candidates = set(postings) if candidates is None else candidates.intersection(postings)
+                if not candidates:
+                    break
+            for skill_id in candidates or ():
+                if user_skill in self.skills[skill_id]:
+                    matches.add(skill_id)
+
+        # Common words
+        user_tokens = set(user_skill.split())
+        candidates = set()
+        for token in user_tokens:
+            candidates.update(self.token_index.get(token, ()))
+        for skill_id in candidates.difference(matches):
+            tokens = self._token_sets[skill_id]
+            if len(user_tokens & tokens) / max(len(user_tokens), len(tokens)) > overlap_threshold:
+                matches.add(skill_id)
+
+        return frozenset(matches)
+
+    def covered_ids(self, user_skills, overlap_threshold=0.7):
+        """Union of matching IDs over a list of lowercased user skills"""
+        covered = set()
+        for user_skill in user_skills:
+            covered.update(self.matching_ids(user_skill, overlap_threshold))
+        return covered
+
+    def covered_mask(self, user_skills, overlap_threshold=0.7):
+        """Boolean mask over the vocabulary of skills covered by the user"""
+        mask = np.zeros(len(self.skills), dtype=bool)
+        covered = self.covered_ids(user_skills, overlap_threshold)
+        if covered:
+            mask[list(covered)] = True
+        return mask
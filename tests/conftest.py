@@ -0,0 +1,37 @@
+# conftest.py
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture
+def catalog_csv(tmp_path):
+    """Copy of the sample catalog, so artifacts and embeddings are written under tmp_path"""
+    path = tmp_path / 'courses.csv'
+    shutil.copy(os.path.join(REPO_ROOT, 'courses.csv'), path)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def synthetic_courses():
+    """Seeded synthetic catalog in the courses.csv format, as a DataFrame"""
+    from course_data import generate_synthetic_catalog
+    return generate_synthetic_catalog(1500, seed=0)
+
+
+@pytest.fixture
+def synthetic_csv(tmp_path, synthetic_courses):
+    path = tmp_path / 'synthetic.csv'
+    synthetic_courses.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def synthetic_profiles():
+    from course_data import generate_user_profiles
+    return generate_user_profiles(40, seed=1)
@@ -0,0 +1,52 @@
+# test_bulk_score.py
+"""bulk_score.run: every profile is reported, scored or with its error, in both output formats"""
+import json
+
+import pytest
+
+import bulk_score
+
+PROFILES = [
+    {'id': 'a', 'technical_skills': ['python', 'sql'], 'interests': ['data'], 'target_domain': 'Data Science'},
+    {'id': 'b', 'technical_skills': 'python', 'level': 7},
+    'not an object',
+    {'id': 'c', 'technical_skills': ['javascript'], 'interests': ['web development'], 'level': 'intermediate'},
+]
+
+
+@pytest.fixture
+def profiles_jsonl(tmp_path):
+    path = tmp_path / 'profiles.jsonl'
+    path.write_text(''.join(json.dumps(profile) + '\n' for profile in PROFILES), encoding='utf-8')
+    return str(path)
+
+
+def score(profiles_jsonl, catalog_csv, output, output_format):
+    return bulk_score.run(profiles_jsonl, output, catalog_path=catalog_csv, output_format=output_format,
+                          chunk_size=3, top_k=3, diversity_lambda=1.0, rationales=False)
+
+
+def test_jsonl_reports_invalid_profiles_with_their_id(tmp_path, profiles_jsonl, catalog_csv):
+    output = str(tmp_path / 'rankings.jsonl')
+    summary = score(profiles_jsonl, catalog_csv, output, 'jsonl')
+    with open(output, encoding='utf-8') as f:
+        results = [json.loads(line) for line in f]
+
+    assert summary['profiles'] == 4 and summary['invalid_profiles'] == 2
+    assert [result['index'] for result in results] == [0, 1, 2, 3]
+    assert results[1] == {'index': 1, 'id': 'b', 'error': 'level: expected a string'}
+    assert results[2] == {'index': 2, 'id': None, 'error': 'profile must be an object'}
+    assert [result['id'] for result in (results[0], results[3])] == ['a', 'c']
+
+
+def test_parquet_writes_invalid_profiles_to_errors(tmp_path, profiles_jsonl, catalog_csv):
+    pq = pytest.importorskip('pyarrow.parquet')
+    output = str(tmp_path / 'rankings')
+    summary = score(profiles_jsonl, catalog_csv, output, 'parquet')
+
+    assert summary['invalid_profiles'] == 2
+    rankings = pq.read_table(output).to_pydict()
+    assert set(rankings['profile_index']) <= {0, 3}
+    errors = pq.read_table(f"{output}/_errors").to_pydict()
+    assert errors == {'profile_index': [1, 2], 'profile_id': ['b', None],
+                      'error': ['level: expected a string', 'profile must be an object']}
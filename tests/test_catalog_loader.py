@@ -0,0 +1,52 @@
+# test_catalog_loader.py
+"""List cell parsing of catalog_loader: strict literals, empty cells and unquoted lists"""
+import pytest
+
+from catalog_loader import UNQUOTED_LIST_WARNING, CatalogValidationError, read_catalog
+
+HEADER = "title,provider,duration,prerequisites,skill_tags,level,link,domain,cost\n"
+
+
+def write_catalog(tmp_path, rows):
+    path = tmp_path / 'catalog.csv'
+    path.write_text(HEADER + ''.join(row + '\n' for row in rows), encoding='utf-8')
+    return str(path)
+
+
+def test_empty_list_cells_load_as_empty_lists(tmp_path):
+    path = write_catalog(tmp_path, [
+        "A,Coursera,6 weeks,['none'],\"['python', 'c, c++']\",beginner,https://a,Data,free",
+        "B,edX,4 weeks,,\"['sql']\",beginner,https://b,Data,paid",
+        "C,edX,4 weeks,['python'],,advanced,https://c,Data,paid",
+    ])
+    courses_df, report = read_catalog(path)
+
+    assert report.rows_loaded == 3 and report.rows_rejected == 0
+    assert report.rows_with_warnings == 0
+    assert courses_df['prerequisites'].tolist() == [['none'], [], ['python']]
+    assert courses_df['skill_tags'].tolist() == [['python', 'c, c++'], ['sql'], []]
+
+
+def test_unquoted_list_cells_are_split_on_commas_with_a_warning(tmp_path):
+    path = write_catalog(tmp_path, [
+        "A,Coursera,6 weeks,['none'],\"['python']\",beginner,https://a,Data,free",
+        "B,edX,4 weeks,\"[python, statistics]\",\"[python, sql]\",intermediate,https://b,Data,paid",
+    ])
+    courses_df, report = read_catalog(path)
+
+    assert report.rows_loaded == 2 and report.rows_rejected == 0
+    assert courses_df['prerequisites'].tolist() == [['none'], ['python', 'statistics']]
+    assert courses_df['skill_tags'].tolist() == [['python'], ['python', 'sql']]
+    assert report.rows_with_warnings == 1
+    assert report.summary()['warnings'] == [
+        {'row': 2, 'column': 'prerequisites', 'reason': UNQUOTED_LIST_WARNING},
+        {'row': 2, 'column': 'skill_tags', 'reason': UNQUOTED_LIST_WARNING},
+    ]
+
+
+def test_strict_mode_still_rejects_invalid_rows(tmp_path):
+    path = write_catalog(tmp_path, [
+        "A,Coursera,6 weeks,,[python],expert,https://a,Data,free",
+    ])
+    with pytest.raises(CatalogValidationError):
+        read_catalog(path, strict=True)
@@ -0,0 +1,137 @@
+# test_embedding_engine.py
+"""EmbeddingMatchingEngine and vector_index, with HashingEncoder only (no model download)"""
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from embedding_engine import EmbeddingMatchingEngine, HashingEncoder, ProfileEmbeddingCache
+from vector_index import BruteForceIndex, IVFIndex
+
+# Keys of every recommend_courses result, as for the TF-IDF engine
+RECOMMENDATION_KEYS = {'title', 'provider', 'duration', 'level', 'fit_score', 'link', 'domain', 'cost',
+                       'prerequisites', 'skill_tags', 'similarity_score', 'level_score', 'prerequisite_score'}
+
+PROFILES = [
+    {'education': "Bachelor's", 'major': 'Computer Science', 'technical_skills': ['python', 'sql'],
+     'soft_skills': ['communication'], 'interests': ['machine learning', 'data'],
+     'target_domain': 'Data Science', 'career_goals': 'Become a data scientist', 'level': 'beginner'},
+    {'education': "Master's", 'major': 'Statistics', 'technical_skills': ['python', 'statistics', 'machine learning'],
+     'soft_skills': [], 'interests': ['deep learning'], 'target_domain': 'Artificial Intelligence',
+     'career_goals': 'Research engineer', 'level': 'advanced'},
+    {'education': 'High School', 'major': 'None', 'technical_skills': [], 'soft_skills': ['teamwork'],
+     'interests': ['web development'], 'target_domain': 'Web Development', 'career_goals': None,
+     'level': 'beginner'},
+]
+
+
+class CountingEncoder(HashingEncoder):
+    """HashingEncoder recording how many texts it embedded"""
+
+    def __init__(self, dim=384):
+        super().__init__(dim)
+        self.encoded = 0
+
+    def encode(self, texts):
+        texts = list(texts)
+        self.encoded += len(texts)
+        return super().encode(texts)
+
+
+def make_engine(catalog_csv, **kwargs):
+    engine = EmbeddingMatchingEngine(diversity_lambda=1.0, **kwargs)
+    engine.load_courses(catalog_csv)
+    return engine
+
+
+@pytest.mark.parametrize('profile', PROFILES)
+def test_recommendations_keep_fit_score_contract(catalog_csv, profile):
+    engine = make_engine(catalog_csv)
+    recommendations = engine.recommend_courses(profile, top_k=5)
+
+    assert 0 < len(recommendations) <= 5
+    fit_scores = [course['fit_score'] for course in recommendations]
+    assert fit_scores == sorted(fit_scores, reverse=True)
+
+    target = (profile.get('target_domain') or '').lower()
+    for course in recommendations:
+        assert set(course.keys()) == RECOMMENDATION_KEYS
+        assert 20 < course['fit_score'] <= 100
+        assert 0.0 <= course['similarity_score'] <= 1.0
+        bonus = 1.2 if target and target in course['domain'].lower() else 1.0
+        combined = (0.5 * course['similarity_score'] + 0.25 * course['level_score']
+                    + 0.25 * course['prerequisite_score']) * bonus
+        assert course['fit_score'] == min(100, int(combined * 100))
+
+
+def test_exact_and_ivf_search_agree_on_small_catalog(catalog_csv):
+    exact = make_engine(catalog_csv)
+    approximate = make_engine(catalog_csv, exact_threshold=1)
+    assert isinstance(exact.course_index(exact.snapshot), BruteForceIndex)
+    assert isinstance(approximate.course_index(approximate.snapshot), IVFIndex)
+
+    for profile in PROFILES:
+        assert approximate.recommend_courses(profile, top_k=5) == exact.recommend_courses(profile, top_k=5)
+
+
+def test_ivf_probing_every_list_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:5] + 0.1 * rng.standard_normal((5, 32)).astype(np.float32)
+
+    ivf = IVFIndex(vectors, n_lists=8, n_probe=8)
+    ivf_positions, ivf_scores = ivf.search(queries, 10)
+    exact_positions, exact_scores = BruteForceIndex(vectors).search(queries, 10)
+    np.testing.assert_array_equal(ivf_positions, exact_positions)
+    np.testing.assert_allclose(ivf_scores, exact_scores, rtol=1e-5)
+
+
+def test_stored_course_embeddings_are_reused(catalog_csv):
+    first = make_engine(catalog_csv, encoder=CountingEncoder())
+    assert first.encoder.encoded == len(first.snapshot)
+    stored = glob.glob(os.path.join(os.path.dirname(catalog_csv), 'courses.embeddings', '*.npy'))
+    assert len(stored) == 1
+
+    second = make_engine(catalog_csv, encoder=CountingEncoder())
+    vectors = second.course_index(second.snapshot).vectors
+    assert second.encoder.encoded == 0
+    assert isinstance(vectors, np.memmap)
+    np.testing.assert_array_equal(vectors, first.course_index(first.snapshot).vectors)
+    assert second.recommend_courses(PROFILES[0]) == first.recommend_courses(PROFILES[0])
+
+
+def test_profile_embedding_cache_is_bounded():
+    encoder = CountingEncoder(dim=16)
+    cache = ProfileEmbeddingCache(encoder, max_size=3)
+    texts = [f"profile {idx}" for idx in range(5)]
+
+    embeddings = cache.encode(texts)
+    assert embeddings.shape == (5, 16)
+    assert len(cache) == 3
+    assert encoder.encoded == 5
+
+    # The three most recent texts are hits; evicted ones are encoded again
+    np.testing.assert_array_equal(cache.encode(texts[2:]), embeddings[2:])
+    assert encoder.encoded == 5
+    cache.encode(texts[:1])
+    assert encoder.encoded == 6
+    assert len(cache) == 3
+
+
+def test_stored_ivf_index_is_memory_mapped_and_not_retrained(catalog_csv, monkeypatch):
+    first = make_engine(catalog_csv, exact_threshold=1)
+    stored = glob.glob(os.path.join(os.path.dirname(catalog_csv), 'courses.embeddings', '*.ivf'))
+    assert len(stored) == 1
+
+    def no_training(*args, **kwargs):
+        raise AssertionError("IVF lists were retrained")
+
+    monkeypatch.setattr(IVFIndex, '_train', no_training)
+    second = make_engine(catalog_csv, exact_threshold=1)
+    index = second.course_index(second.snapshot)
+    assert isinstance(index, IVFIndex)
+    assert isinstance(index.list_vectors, np.memmap)
+    for profile in PROFILES:
+        assert second.recommend_courses(profile, top_k=5) == first.recommend_courses(profile, top_k=5)
@@ -0,0 +1,71 @@
+# test_incremental_updates.py
+"""Incremental add/remove/update against a full rebuild of the same catalog"""
+import numpy as np
+import pytest
+
+from matching_engine import AlternativeMatchingEngine
+
+UPDATED_FIELDS = {'level': 'advanced', 'skill_tags': ['quantum basket weaving', 'python']}
+
+
+def apply_updates(engine, courses_df, initial):
+    """Load the first `initial` courses, then add the rest, remove some and update one.
+
+    Returns the catalog frame a full rebuild should match.
+    """
+    engine.add_courses(courses_df.iloc[initial:].to_dict('records'))
+    removed = list(courses_df['title'].iloc[100:110])
+    engine.remove_courses(removed)
+    expected = courses_df[~courses_df['title'].isin(removed)].reset_index(drop=True).copy()
+
+    title = expected['title'].iloc[5]
+    engine.update_course(title, UPDATED_FIELDS)
+    expected.at[5, 'level'] = UPDATED_FIELDS['level']
+    expected.at[5, 'skill_tags'] = str(UPDATED_FIELDS['skill_tags'])
+    return expected
+
+
+def rankings(engine, profiles, top_k=10):
+    return [[(course['title'], course['fit_score']) for course in engine.recommend_courses(profile, top_k=top_k)]
+            for profile in profiles]
+
+
+def updated_and_rebuilt(tmp_path, courses_df, drift_threshold):
+    initial = len(courses_df) - 40
+    part_csv = tmp_path / 'part.csv'
+    courses_df.iloc[:initial].to_csv(part_csv, index=False)
+    engine = AlternativeMatchingEngine(refit_drift_threshold=drift_threshold, diversity_lambda=1.0)
+    engine.load_courses(str(part_csv), use_artifact=False)
+    expected = apply_updates(engine, courses_df, initial)
+
+    rebuilt_csv = tmp_path / 'rebuilt.csv'
+    expected.to_csv(rebuilt_csv, index=False)
+    rebuilt = AlternativeMatchingEngine(diversity_lambda=1.0)
+    rebuilt.load_courses(str(rebuilt_csv), use_artifact=False)
+    return engine, rebuilt
+
+
+def test_updates_keep_the_catalog_in_step_with_a_rebuild(tmp_path, synthetic_courses):
+    engine, rebuilt = updated_and_rebuilt(tmp_path, synthetic_courses, 0.05)
+    assert list(engine.snapshot.courses_df['title']) == list(rebuilt.snapshot.courses_df['title'])
+    np.testing.assert_array_equal(engine.snapshot.level_codes, rebuilt.snapshot.level_codes)
+
+
+def test_default_drift_threshold_stays_close_to_a_rebuild(tmp_path, synthetic_courses, synthetic_profiles):
+    engine, rebuilt = updated_and_rebuilt(tmp_path, synthetic_courses, 0.05)
+    assert not engine.snapshot.refitted and engine.snapshot.vocabulary_drift > 0
+
+    overlaps = []
+    for updated, reference in zip(rankings(engine, synthetic_profiles), rankings(rebuilt, synthetic_profiles)):
+        updated, reference = {title for title, _ in updated}, {title for title, _ in reference}
+        overlaps.append(len(updated & reference) / max(len(reference), 1))
+
+    # Top-10 overlap; individual fit scores may move by a few points
+    assert np.mean(overlaps) >= 0.9
+    assert min(overlaps) >= 0.7
+
+
+def test_zero_drift_threshold_matches_a_rebuild_exactly(tmp_path, synthetic_courses, synthetic_profiles):
+    engine, rebuilt = updated_and_rebuilt(tmp_path, synthetic_courses, 0)
+    assert engine.snapshot.refitted
+    assert rankings(engine, synthetic_profiles) == rankings(rebuilt, synthetic_profiles)
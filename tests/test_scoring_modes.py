@@ -0,0 +1,45 @@
+# test_scoring_modes.py
+"""Scoring modes of AlternativeMatchingEngine agree with the row-by-row reference"""
+import pytest
+
+from candidate_index import sample_profiles
+from matching_engine import AlternativeMatchingEngine
+
+EDGE_PROFILES = [
+    {'education': 'High School', 'major': 'None', 'technical_skills': [], 'soft_skills': [],
+     'interests': [], 'target_domain': None, 'career_goals': None, 'level': 'beginner'},
+    {'education': "Master's", 'major': 'Physics', 'technical_skills': ['Python', 'Statistics'],
+     'soft_skills': ['writing'], 'interests': ['deep learning'], 'target_domain': 'data',
+     'career_goals': 'Research engineer', 'level': 'Advanced'},
+    {'education': "Bachelor's", 'major': 'Design', 'technical_skills': ['figma'], 'soft_skills': [],
+     'interests': ['web development'], 'target_domain': 'Web Development', 'career_goals': '',
+     'level': 'expert'},
+]
+
+
+@pytest.fixture
+def sample_engine(catalog_csv):
+    engine = AlternativeMatchingEngine(diversity_lambda=1.0)
+    engine.load_courses(catalog_csv, use_artifact=False)
+    return engine
+
+
+@pytest.mark.parametrize('top_k', [5, 10, 1000])
+def test_vectorized_matches_loop_on_sample_catalog(sample_engine, synthetic_profiles, top_k):
+    for profile in EDGE_PROFILES + synthetic_profiles:
+        loop = sample_engine.recommend_courses(profile, top_k=top_k, scoring_mode='loop')
+        vectorized = sample_engine.recommend_courses(profile, top_k=top_k, scoring_mode='vectorized')
+        assert vectorized == loop
+
+
+@pytest.mark.parametrize('top_k', [1, 10, 50])
+def test_pruned_matches_exhaustive_when_candidates_fit(synthetic_csv, synthetic_profiles, top_k):
+    engine = AlternativeMatchingEngine(max_candidates=2000, diversity_lambda=1.0)
+    engine.load_courses(synthetic_csv, use_artifact=False)
+    profiles = EDGE_PROFILES + synthetic_profiles + sample_profiles(engine.snapshot, count=40, seed=2)
+
+    for profile in profiles:
+        analysis = engine.analyze_profile(profile)
+        pruned = engine.recommend_courses(profile, top_k=top_k, scoring_mode='pruned', analysis=analysis)
+        assert analysis.retrieval_stats['exact']
+        assert pruned == engine.recommend_courses(profile, top_k=top_k, scoring_mode='vectorized')
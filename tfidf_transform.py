@@ -0,0 +1,123 @@
+# tfidf_transform.py
+"""Fitted TF-IDF transform and cosine similarity without scikit-learn.
+
+Serving only ever transforms profile text with an already fitted
+vectorizer and compares it with the catalog matrix. ``TfidfTransform`` and
+``cosine_similarities`` repeat what ``TfidfVectorizer.transform`` and
+``cosine_similarity`` do, operation for operation and in the same order, so
+scores are bit-identical. A snapshot restored from an artifact therefore
+never has to import scikit-learn.
+
+Only the settings the engine uses are reproduced (word unigrams, default
+token pattern, lowercasing); ``TfidfTransform.from_fitted`` returns None for
+anything else and callers fall back to the vectorizer itself.
+"""
+import re
+
+import numpy as np
+from scipy import sparse
+
+# scikit-learn's default token pattern
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# Settings, as vectorizer_signature reprs, that transform() depends on and
+# reproduces. Stop words and fit-only settings (max_features, min_df, ...)
+# only shape the vocabulary, which is given.
+REQUIRED_SETTINGS = {
+    'analyzer': "'word'",
+    'binary': 'False',
+    'dtype': "<class 'numpy.float64'>",
+    'input': "'content'",
+    'lowercase': 'True',
+    'ngram_range': '(1, 1)',
+    'preprocessor': 'None',
+    'strip_accents': 'None',
+    'token_pattern': repr(TOKEN_PATTERN),
+    'tokenizer': 'None',
+    'vocabulary': 'None',
+}
+SUPPORTED_NORMS = {"'l2'": 'l2', 'None': None}
+
+
+def l2_normalize_rows(matrix):
+    """CSR copy with unit-length rows, rounded exactly as sklearn.preprocessing.normalize.
+
+    scikit-learn sums each row's squares left to right; np.add.reduceat sums
+    pairwise and can differ in the last bit, so rows are summed one column
+    position at a time instead, longest rows first.
+    """
+    matrix = sparse.csr_matrix(matrix, dtype=np.float64, copy=True)
+    data, indptr = matrix.data, matrix.indptr
+    lengths = np.diff(indptr)
+    squares = data * data
+
+    order = np.argsort(-lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    norms = np.zeros(len(lengths))
+    for step in range(int(sorted_lengths[0]) if len(lengths) else 0):
+        rows = order[:np.searchsorted(-sorted_lengths, -step, side='left')]
+        norms[rows] += squares[indptr[rows] + step]
+
+    norms = np.sqrt(norms)
+    # All-zero rows are left as they are
+    norms[norms == 0.0] = 1.0
+    data /= np.repeat(norms, lengths)
+    return matrix
+
+
+def cosine_similarities(profile_matrix, normalized_courses_t):
+    """Profiles x courses cosine similarity, as sklearn's cosine_similarity(profiles, courses).
+
+    normalized_courses_t is l2_normalize_rows(courses).T, as CSR or CSC.
+    """
+    return (l2_normalize_rows(profile_matrix) @ normalized_courses_t).toarray()
+
+
+class TfidfTransform:
+    """transform() of a fitted TfidfVectorizer, from its vocabulary and idf"""
+
+    def __init__(self, terms, idf, norm='l2', use_idf=True, sublinear_tf=False):
+        self.vocabulary = {term: idx for idx, term in enumerate(terms)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.norm = norm
+        self.use_idf = use_idf
+        self.sublinear_tf = sublinear_tf
+        self.tokenize = re.compile(TOKEN_PATTERN).findall
+
+    @classmethod
+    def from_fitted(cls, signature, terms, idf):
+        """Transform for a vectorizer with this vectorizer_signature, or None if it can't be reproduced"""
+        if any(signature.get(name) != value for name, value in REQUIRED_SETTINGS.items()):
+            return None
+        if signature.get('norm') not in SUPPORTED_NORMS:
+            return None
+        return cls(terms, idf, norm=SUPPORTED_NORMS[signature['norm']], use_idf=signature.get('use_idf') == 'True',
+                   sublinear_tf=signature.get('sublinear_tf') == 'True')
+
+    def transform(self, texts):
+        """Documents x terms TF-IDF matrix, equal to TfidfVectorizer.transform(texts)"""
+        vocabulary = self.vocabulary
+        indptr, indices, counts = [0], [], []
+        for text in texts:
+            term_counts = {}
+            for token in self.tokenize(text.lower()):
+                term_id = vocabulary.get(token)
+                if term_id is not None:
+                    term_counts[term_id] = term_counts.get(term_id, 0) + 1
+            indices.extend(term_counts)
+            counts.extend(term_counts.values())
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, len(vocabulary))
+        )
+        matrix.sort_indices()
+        if self.sublinear_tf:
+            np.log(matrix.data, matrix.data)
+            matrix.data += 1.0
+        if self.use_idf:
+            matrix.data *= self.idf[matrix.indices]
+        if self.norm == 'l2':
+            matrix = l2_normalize_rows(matrix)
+        return matrix
@@ -0,0 +1,184 @@
+# vector_index.py
+"""CPU nearest-neighbour search over L2-normalized embedding matrices.
+
+- ``BruteForceIndex`` scores every vector with blocked matrix products. It
+  is exact and is used for catalogs up to a few tens of thousands of courses.
+- ``IVFIndex`` clusters the vectors with spherical k-means and only scans the
+  ``n_probe`` clusters closest to the query, trading a little recall for
+  sublinear search on large catalogs.
+
+Both accept float16 or float32 (possibly memory-mapped) matrices and compute
+in float32. A trained ``IVFIndex`` can be saved as ``.npy`` files and loaded
+memory-mapped, so processes share its lists instead of retraining and
+copying them.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Catalog size above which build_vector_index switches to IVF
+DEFAULT_EXACT_THRESHOLD = 50000
+
+# Arrays of a trained IVFIndex, stored as <name>.npy by IVFIndex.save
+IVF_ARRAYS = ('centroids', 'list_members', 'list_offsets', 'list_vectors')
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores per row, highest first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1)
+
+
+def blocked_similarities(vectors, queries, block_size=32768):
+    """Dot products of each query with every vector, shape (queries, vectors)"""
+    queries = np.asarray(queries, dtype=np.float32)
+    scores = np.empty((queries.shape[0], vectors.shape[0]), dtype=np.float32)
+    for start in range(0, vectors.shape[0], block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        scores[:, start:start + len(block)] = queries @ block.T
+    return scores
+
+
+class BruteForceIndex:
+    """Exact search with blocked matrix products"""
+
+    exact = True
+
+    def __init__(self, vectors, block_size=32768):
+        self.vectors = vectors
+        self.block_size = block_size
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def similarities(self, queries):
+        """Dot products of each query with every vector, shape (queries, vectors)"""
+        return blocked_similarities(self.vectors, queries, self.block_size)
+
+    def search(self, queries, k):
+        """(indices, scores) of the k nearest vectors per query, best first"""
+        scores = self.similarities(queries)
+        top = _top_k(scores, k)
+        return top, np.take_along_axis(scores, top, axis=1)
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means lists, probed nearest first"""
+
+    exact = False
+
+    def __init__(self, vectors, n_lists=None, n_probe=8, iterations=10, train_size=20000, seed=0, arrays=None):
+        self.vectors = vectors
+        n_vectors = vectors.shape[0]
+        if arrays is not None:
+            # Lists trained earlier, see load
+            for name in IVF_ARRAYS:
+                setattr(self, name, arrays[name])
+            self.n_lists = len(self.centroids)
+            self.n_probe = min(n_probe, self.n_lists)
+            return
+
+        self.n_lists = n_lists or max(1, int(np.sqrt(n_vectors)))
+        self.n_probe = min(n_probe, self.n_lists)
+
+        self.centroids = self._train(iterations, train_size, np.random.default_rng(seed))
+
+        # Assign every vector to its closest centroid, stored CSR-style
+        assignments = np.empty(n_vectors, dtype=np.intp)
+        for start in range(0, n_vectors, 32768):
+            block_scores = blocked_similarities(self.centroids, vectors[start:start + 32768])
+            assignments[start:start + 32768] = np.argmax(block_scores, axis=1)
+        self.list_members = np.argsort(assignments, kind='stable')
+        self.list_offsets = np.searchsorted(assignments[self.list_members], np.arange(self.n_lists + 1))
+        # Vectors regrouped list by list (in the stored dtype), so a probe
+        # reads one contiguous slice instead of gathering rows
+        self.list_vectors = np.ascontiguousarray(vectors[self.list_members])
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def save(self, directory):
+        """Store the trained lists as .npy files in directory, replacing it atomically"""
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.ivf-', dir=parent)
+        try:
+            for name in IVF_ARRAYS:
+                np.save(os.path.join(tmp_dir, name + '.npy'), np.asarray(getattr(self, name)))
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+            os.replace(tmp_dir, directory)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, vectors, directory, n_probe=8):
+        """Index over vectors with the lists stored by save, memory-mapped; None if missing or not matching"""
+        try:
+            arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in IVF_ARRAYS}
+        except (OSError, ValueError):
+            return None
+        n_lists = len(arrays['centroids'])
+        if (arrays['list_vectors'].shape != vectors.shape or arrays['list_vectors'].dtype != vectors.dtype
+                or arrays['list_members'].shape != (vectors.shape[0],)
+                or arrays['list_offsets'].shape != (n_lists + 1,)):
+            return None
+        return cls(vectors, n_probe=n_probe, arrays=arrays)
+
+    def _train(self, iterations, train_size, rng):
+        n_vectors = self.vectors.shape[0]
+        sample = np.sort(rng.choice(n_vectors, size=min(train_size, n_vectors), replace=False))
+        train = np.asarray(self.vectors[sample], dtype=np.float32)
+
+        centroids = train[rng.choice(len(train), size=self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, train)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        return centroids
+
+    def similarities(self, queries):
+        """Exact dot products with every vector, bypassing the lists"""
+        return blocked_similarities(self.vectors, queries)
+
+    def search(self, queries, k):
+        """(indices, scores) of the (approximately) k nearest vectors per query, best first.
+
+        Rows are padded with index -1 and score -inf when the probed lists
+        hold fewer than k vectors.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        probed = _top_k(queries @ self.centroids.T, self.n_probe)
+
+        indices = np.full((len(queries), k), -1, dtype=np.intp)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for row, (query, lists) in enumerate(zip(queries, probed)):
+            slices = [slice(self.list_offsets[lst], self.list_offsets[lst + 1]) for lst in lists]
+            members = np.concatenate([self.list_members[part] for part in slices])
+            member_scores = np.concatenate([
+                np.asarray(self.list_vectors[part], dtype=np.float32) @ query for part in slices
+            ])
+            top = _top_k(member_scores[np.newaxis, :], k)[0]
+            indices[row, :len(top)] = members[top]
+            scores[row, :len(top)] = member_scores[top]
+        return indices, scores
+
+
+def build_vector_index(vectors, exact_threshold=DEFAULT_EXACT_THRESHOLD):
+    """Exact brute-force search for small catalogs, IVF above exact_threshold vectors"""
+    if vectors.shape[0] <= exact_threshold:
+        return BruteForceIndex(vectors)
+    return IVFIndex(vectors)